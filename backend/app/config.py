@@ -18,5 +18,87 @@ class Settings(BaseModel):
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     MONGODB_DB: str = os.getenv("MONGODB_DB", "loan_risk")
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "true").lower() == "true"
+
+    # Server / worker settings (used by `python -m app.server`)
+    HOST: str = os.getenv("HOST", "127.0.0.1")
+    PORT: int = int(os.getenv("PORT", "8080"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+
+    # Connection pools, sized per worker process
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "20000"))
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "20000"))
+
+    # Per-user exposure limits checked by apply_loan (0 = no limit)
+    MAX_PENDING_LOANS: int = int(os.getenv("MAX_PENDING_LOANS", "2"))
+    MAX_PENDING_AMOUNT: float = float(os.getenv("MAX_PENDING_AMOUNT", "0"))
+
+    # Amortization (GET /loans/{id}/schedule, /loans/portfolio/schedule)
+    ANNUAL_INTEREST_RATE: float = float(os.getenv("ANNUAL_INTEREST_RATE", "0.08"))  # used when a request doesn't pass one
+    AMORTIZATION_CACHE_SIZE: int = int(os.getenv("AMORTIZATION_CACHE_SIZE", "4096"))  # cached (amount, rate, term) schedules
+
+    # Portfolio stress test (POST /loans/stress-test)
+    STRESS_LOSS_GIVEN_DEFAULT: float = float(os.getenv("STRESS_LOSS_GIVEN_DEFAULT", "0.45"))
+    STRESS_CHUNK_ELEMENTS: int = int(os.getenv("STRESS_CHUNK_ELEMENTS", "4000000"))  # scenarios x loans per batch
+
+    # Risk percentile index (LoanOut.risk_percentile, GET /loans/risk-distribution), per worker
+    RISK_INDEX_BUCKETS: int = int(os.getenv("RISK_INDEX_BUCKETS", "10000"))  # score resolution 1/buckets
+    RISK_INDEX_REFRESH_SECONDS: int = int(os.getenv("RISK_INDEX_REFRESH_SECONDS", "300"))  # rebuild from the DB; 0 = off
+
+    # Columnar loan snapshot behind GET /loans/all filters and sorts (per worker, in memory)
+    LOAN_SNAPSHOT_ENABLED: bool = os.getenv("LOAN_SNAPSHOT_ENABLED", "true").lower() == "true"  # false = filter in SQL
+
+    # Group commit for apply_loan (per worker): concurrent applications share one transaction
+    GROUP_COMMIT_ENABLED: bool = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_WINDOW_MS: float = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))  # max wait for more writes
+    GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+
+    # Login throttling (token buckets per client IP and per email, per worker, in memory)
+    LOGIN_THROTTLE_ENABLED: bool = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() == "true"
+    LOGIN_IP_BURST: int = int(os.getenv("LOGIN_IP_BURST", "30"))  # attempts allowed back to back
+    LOGIN_IP_PER_MINUTE: float = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))  # sustained rate
+    LOGIN_EMAIL_BURST: int = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+    LOGIN_EMAIL_PER_MINUTE: float = float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "2"))
+    LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))  # per bucket kind
+
+    # Duplicate / velocity checks in apply_loan (per worker, in memory)
+    APPLICATION_GUARD_MODE: str = os.getenv("APPLICATION_GUARD_MODE", "reject")  # reject | flag | off
+    DUPLICATE_WINDOW_SECONDS: int = int(os.getenv("DUPLICATE_WINDOW_SECONDS", "600"))
+    VELOCITY_WINDOW_SECONDS: int = int(os.getenv("VELOCITY_WINDOW_SECONDS", "3600"))
+    VELOCITY_MAX_APPLICATIONS: int = int(os.getenv("VELOCITY_MAX_APPLICATIONS", "5"))  # 0 = no velocity check
+    GUARD_MAX_KEYS: int = int(os.getenv("GUARD_MAX_KEYS", "100000"))
+
+    # Loan event stream (GET /loans/events), per worker process
+    LOAN_EVENTS_BUFFER: int = int(os.getenv("LOAN_EVENTS_BUFFER", "1000"))  # events kept for Last-Event-ID resume
+    LOAN_EVENTS_QUEUE_SIZE: int = int(os.getenv("LOAN_EVENTS_QUEUE_SIZE", "100"))  # per client, before it is dropped
+    LOAN_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("LOAN_EVENTS_KEEPALIVE_SECONDS", "15"))
+    LOAN_EVENTS_MAX_STREAM_SECONDS: float = float(os.getenv("LOAN_EVENTS_MAX_STREAM_SECONDS", "300"))  # then the client reconnects
+
+    # Loan list response cache (per worker; invalidated through the data_versions table)
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))  # cached list bodies
+    GZIP_MIN_BYTES: int = int(os.getenv("GZIP_MIN_BYTES", "1024"))  # compress responses at least this large
+
+    # Idempotency-Key store for write endpoints (per worker, in memory)
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+    # Audit log backend: "mongo", "sqlite" or "segment" (local append-only files)
+    AUDIT_BACKEND: str = os.getenv("AUDIT_BACKEND", "mongo")
+    AUDIT_SQLITE_PATH: str = os.getenv("AUDIT_SQLITE_PATH", "./audit.db")
+    AUDIT_SEGMENT_DIR: str = os.getenv("AUDIT_SEGMENT_DIR", "./audit_segments")
+    AUDIT_SEGMENT_MAX_BYTES: int = int(os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Audit log retention (activities, calculations, risk_logs)
+    AUDIT_RETENTION_DAYS: int = int(os.getenv("AUDIT_RETENTION_DAYS", "0"))  # TTL on raw events; 0 = keep
+    AUDIT_COMPACT_AFTER_DAYS: int = int(os.getenv("AUDIT_COMPACT_AFTER_DAYS", "30"))
+    AUDIT_COMPACTION_INTERVAL_SECONDS: int = int(os.getenv("AUDIT_COMPACTION_INTERVAL_SECONDS", "0"))  # 0 = off
+    AUDIT_ARCHIVE_DIR: str = os.getenv("AUDIT_ARCHIVE_DIR", "")  # empty = archive into Mongo
 
 settings = Settings()
@@ -1,29 +1,47 @@
 
 # app/deps.py
-from fastapi import Depends, HTTPException, status
+from typing import Optional, Sequence
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_db
 from .models import User
 from .auth import decode_token
+from .services.serialization import InvalidFields, parse_fields
 
 bearer_scheme = HTTPBearer(auto_error=True)
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     token = credentials.credentials  # raw token string
     payload = decode_token(token)
     email = payload.get("sub")
     if not email:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalars().first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
-def require_admin(user: User = Depends(get_current_user)) -> User:
+async def require_admin(user: User = Depends(get_current_user)) -> User:
     if user.role != "ADMIN":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin required")
     return user
+
+def sparse_fields(allowed: Sequence[str]):
+    """
+    Dependency for a `fields=` query parameter restricted to `allowed`.
+    """
+    def dependency(
+        fields: Optional[str] = Query(
+            default=None, description=f"Comma-separated subset of: {', '.join(allowed)}"
+        ),
+    ) -> tuple[str, ...]:
+        try:
+            return parse_fields(fields, allowed)
+        except InvalidFields as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return dependency
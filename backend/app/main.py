@@ -1,10 +1,15 @@
 
 # app/main.py
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import Base, engine
+from fastapi.middleware.gzip import GZipMiddleware
+from .database import Base, engine, async_engine
+from . import migrations, mongo
+from .config import settings
+from .services import audit, group_commit, loan_snapshot, retention, response_cache, risk_index
 from .routers.auth_routes import router as auth_router
 from .routers.loan_routes import router as loan_router
 from .routers.logs_routes import router as logs_router
@@ -16,11 +21,39 @@ logger = logging.getLogger("loan-app")
 async def lifespan(app: FastAPI):
     # Startup: ensure tables
     Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    response_cache.ensure_version_rows(engine)
     logger.info("Database tables ensured")
+    risk_index.build_book(engine)
+    if settings.LOAN_SNAPSHOT_ENABLED:
+        loan_snapshot.build(engine)
+    # Build audit indexes in the background so a slow/missing Mongo can't block startup
+    background = [asyncio.create_task(audit.get_sink().ensure_indexes())]
+    if settings.AUDIT_BACKEND == "mongo" and settings.AUDIT_COMPACTION_INTERVAL_SECONDS > 0:
+        background.append(asyncio.create_task(
+            retention.run_periodically(settings.AUDIT_COMPACTION_INTERVAL_SECONDS)
+        ))
+    if settings.GROUP_COMMIT_ENABLED:
+        background.append(asyncio.create_task(group_commit.coalescer.run()))
+    if settings.RISK_INDEX_REFRESH_SECONDS > 0:
+        background.append(asyncio.create_task(
+            risk_index.refresh_periodically(settings.RISK_INDEX_REFRESH_SECONDS)
+        ))
     yield
-    # Shutdown: dispose engine (helps on Windows file locks)
+    for task in background:
+        if not task.done():
+            task.cancel()
+    # Shutdown runs after uvicorn has drained in-flight requests, so any
+    # audit writes they issued have completed before the pools go away.
+    try:
+        await audit.close_sink()
+        await mongo.close()
+    except Exception as e:
+        logger.warning(f"Audit/Mongo client close failed: {e}")
+    # Dispose engine (helps on Windows file locks)
     try:
         engine.dispose()
+        await async_engine.dispose()
         logger.info("Database engine disposed")
     except Exception as e:
         logger.warning(f"Engine dispose failed: {e}")
@@ -33,7 +66,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_BYTES)
 
 app.include_router(auth_router)
 app.include_router(loan_router)
@@ -0,0 +1,207 @@
+
+# app/migrations.py
+"""
+In-place schema upgrades for databases created before a column existed.
+
+`Base.metadata.create_all` only creates missing tables. `upgrade()` runs
+right after it at startup and adds any missing columns and indexes. It is
+idempotent and only adds things. `python -m app.server` runs it once in the
+parent before forking. It also tolerates workers started some other way
+running it concurrently.
+
+Backfilling loan timestamps from the audit log is a separate, one-off step:
+
+    python -m app.migrations backfill
+
+created_at comes from the loan's "apply_loan" activity or its calculation
+log. decided_at comes from its "loan_decision" activity. With the "mongo"
+audit backend the scan also reads events that retention.py has compacted
+into the archive. Loans without a matching event keep NULL and are left out
+of the SLA figures. The same step then seeds loan_status_history for loans
+that have no history yet, from their created_at / decided_at, so it should
+run after the timestamps are filled.
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import Column, DateTime, bindparam, func, inspect, select, update
+from sqlalchemy.exc import DBAPIError
+
+from .config import settings
+from .database import AsyncSessionLocal, Base, engine
+from .models import LoanApplication
+from .services import audit, retention, status_history
+
+logger = logging.getLogger("loan-app.migrations")
+
+# Columns added to existing tables after their first release
+ADDED_COLUMNS: dict[str, list[Column]] = {
+    "loan_applications": [Column("created_at", DateTime), Column("decided_at", DateTime)],
+}
+
+# Activities per page while scanning a user's audit timeline
+BACKFILL_PAGE = 500
+
+
+def _apply(bind, ddl: Callable, applied: Callable[[], bool]) -> bool:
+    """
+    Run one DDL step in its own transaction; False if another process applied it first.
+    """
+    try:
+        with bind.begin() as conn:
+            ddl(conn)
+        return True
+    except DBAPIError:
+        # Raced with another worker starting up: fine if the change is there now
+        if applied():
+            return False
+        raise
+
+
+def upgrade(bind=engine) -> list[str]:
+    """
+    Add missing columns and indexes; returns what was added. Safe to run from
+    several processes at once: a step another process applied first is skipped.
+    """
+    added = []
+    tables = set(inspect(bind).get_table_names())
+    for table, columns in ADDED_COLUMNS.items():
+        if table not in tables:
+            continue
+        existing = {c["name"] for c in inspect(bind).get_columns(table)}
+        for column in columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=bind.dialect)}"
+            if _apply(
+                bind,
+                lambda conn, ddl=ddl: conn.exec_driver_sql(ddl),
+                lambda table=table, name=column.name: name in {c["name"] for c in inspect(bind).get_columns(table)},
+            ):
+                added.append(f"{table}.{column.name}")
+    for table in Base.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {i["name"] for i in inspect(bind).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if _apply(
+                bind,
+                lambda conn, index=index: index.create(conn),
+                lambda table=table, name=index.name: name in {i["name"] for i in inspect(bind).get_indexes(table.name)},
+            ):
+                added.append(index.name)
+    if added:
+        logger.info(f"Schema upgraded: {', '.join(added)}")
+    return added
+
+
+def _loan_times(activities: list[dict], calculations: list[dict]) -> dict[int, dict[str, datetime]]:
+    """
+    loan_id -> {"created_at": ..., "decided_at": ...} from one user's events.
+    """
+    times: dict[int, dict[str, datetime]] = {}
+    for doc in calculations:
+        if doc.get("loan_id") is not None:
+            times.setdefault(doc["loan_id"], {}).setdefault("created_at", doc["timestamp"])
+    for doc in activities:
+        if doc.get("action") == "apply_loan":
+            loan_id = (doc.get("details") or {}).get("loan_id")
+            if loan_id is not None:
+                # The activity is the canonical creation event; it wins over the calculation log
+                times.setdefault(loan_id, {})["created_at"] = doc["timestamp"]
+        elif doc.get("action") == "loan_decision" and doc.get("loan_id") is not None:
+            entry = times.setdefault(doc["loan_id"], {})
+            # Earliest decision, in case of duplicate logs
+            if "decided_at" not in entry or doc["timestamp"] < entry["decided_at"]:
+                entry["decided_at"] = doc["timestamp"]
+    return times
+
+
+async def _all_events(stream: str, user_id: int, fields: tuple[str, ...]) -> list[dict]:
+    """
+    One user's events, newest first, including compacted ones on the "mongo" backend.
+    """
+    docs, cursor = [], None
+    while True:
+        page, cursor = await audit.user_timeline(stream, user_id, cursor, BACKFILL_PAGE, fields)
+        docs += page
+        if not cursor:
+            break
+    if settings.AUDIT_BACKEND == "mongo":
+        docs += reversed(await retention.archived_events(stream, user_id))
+    return docs
+
+
+async def backfill_timestamps(user_id: Optional[int] = None) -> int:
+    """
+    Fill NULL created_at / decided_at from the audit log; returns loans updated.
+    """
+    async with AsyncSessionLocal() as db:
+        q = select(LoanApplication.id, LoanApplication.user_id, LoanApplication.status).where(
+            (LoanApplication.created_at.is_(None))
+            | ((LoanApplication.status != "PENDING") & LoanApplication.decided_at.is_(None))
+        )
+        if user_id is not None:
+            q = q.where(LoanApplication.user_id == user_id)
+        missing = (await db.execute(q)).all()
+
+        by_user: dict[int, list[tuple[int, str]]] = {}
+        for loan_id, owner, status in missing:
+            by_user.setdefault(owner, []).append((loan_id, status))
+
+        updates = []
+        for owner, loans in by_user.items():
+            activities = await _all_events(audit.ACTIVITIES, owner, ("action", "details", "loan_id"))
+            calculations = await _all_events(audit.CALCULATIONS, owner, ("loan_id",))
+            times = _loan_times(activities, calculations)
+            for loan_id, status in loans:
+                found = times.get(loan_id, {})
+                if found:
+                    updates.append({
+                        "loan_id": loan_id,
+                        "b_created_at": found.get("created_at"),
+                        "b_decided_at": found.get("decided_at") if status != "PENDING" else None,
+                    })
+
+        if updates:
+            # One executemany; COALESCE keeps anything the app has written meanwhile
+            table = LoanApplication.__table__
+            await db.execute(
+                update(table)
+                .where(table.c.id == bindparam("loan_id"))
+                .values(
+                    created_at=func.coalesce(table.c.created_at, bindparam("b_created_at")),
+                    decided_at=func.coalesce(table.c.decided_at, bindparam("b_decided_at")),
+                ),
+                updates,
+            )
+            await db.commit()
+    return len(updates)
+
+
+async def backfill_status_history() -> int:
+    """
+    Seed history rows for loans without any; returns rows inserted.
+    Loans still missing created_at are skipped.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = []
+        for loan_id, status, created_at, decided_at in await status_history.without_history(db):
+            if created_at is not None:
+                rows += status_history.rows_from_loan(loan_id, status, created_at, decided_at)
+        inserted = await status_history.bulk_load(db, rows)
+        await db.commit()
+    return inserted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    upgrade()
+    if sys.argv[1:] == ["backfill"]:
+        print(f"Backfilled {asyncio.run(backfill_timestamps())} loans")
+        print(f"Added {asyncio.run(backfill_status_history())} status history rows")
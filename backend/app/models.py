@@ -1,6 +1,6 @@
 
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -30,5 +30,54 @@ class LoanApplication(Base):
     term_months = Column(Integer, nullable=False)
     status = Column(String, default="PENDING", nullable=False)
     risk_score = Column(Float, default=0.0)
+    # Naive UTC; NULL for loans from before these columns existed (see app/migrations.py backfill)
+    created_at = Column(DateTime, index=True)
+    decided_at = Column(DateTime, index=True)
 
     applicant = relationship("User", back_populates="loans")
+
+    __table_args__ = (
+        # Pending queue by age (GET /loans/sla)
+        Index("ix_loan_applications_status_created_at", "status", "created_at"),
+    )
+
+class LoanStatusHistory(Base):
+    """
+    One row per status a loan has been in, over [valid_from, valid_to).
+    Written by services/status_history.py in the transaction that changes the status.
+    """
+    __tablename__ = "loan_status_history"
+
+    id = Column(Integer, primary_key=True)
+    loan_id = Column(Integer, ForeignKey("loan_applications.id"), nullable=False)
+    status = Column(String, nullable=False)
+    valid_from = Column(DateTime, nullable=False)  # naive UTC
+    valid_to = Column(DateTime)  # NULL = current status
+    changed_by = Column(Integer, ForeignKey("users.id"))  # applicant for PENDING, admin for decisions
+
+    __table_args__ = (
+        # State of one loan at time T
+        Index("ix_loan_status_history_loan_id_valid_from", "loan_id", "valid_from"),
+        # All loans in a status at time T
+        Index("ix_loan_status_history_status_valid_from", "status", "valid_from", "valid_to"),
+    )
+
+class UserExposure(Base):
+    """
+    Running per-user totals maintained by services/exposure.py.
+    """
+    __tablename__ = "user_exposure"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    pending_count = Column(Integer, default=0, nullable=False)
+    pending_total = Column(Float, default=0.0, nullable=False)
+    approved_total = Column(Float, default=0.0, nullable=False)
+
+class DataVersion(Base):
+    """
+    Monotonic change counters; bumped with each write that invalidates cached responses.
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
@@ -1,17 +1,125 @@
 
 # app/mongo.py
-from pymongo import MongoClient
+import inspect
+import logging
+import os
+from pymongo import ASCENDING, DESCENDING, AsyncMongoClient
+from pymongo.errors import OperationFailure
 from .config import settings
 
-client = MongoClient(settings.MONGODB_URL)
-mongo_db = client[settings.MONGODB_DB]
+logger = logging.getLogger("loan-app.mongo")
 
-# Collections we use
-risk_logs = mongo_db["risk_logs"]
+# MONGODB_URL=memory:// runs against an in-process stand-in (tests / offline dev)
+MEMORY_URL = "memory://"
+
+client = None
+mongo_db = None
+
+# Per-user, newest-first reads; _id breaks timestamp ties for cursor pagination
+USER_TIMELINE = [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+# Raw audit event collections subject to retention/compaction
+AUDIT_COLLECTIONS = ("activities", "calculations", "risk_logs")
+TTL_INDEX = "timestamp_ttl"
+
+# collection -> [(keys, options)]
+INDEXES = {
+    "activities": [(USER_TIMELINE, {})],
+    "calculations": [(USER_TIMELINE, {})],
+    "risk_logs": [(USER_TIMELINE, {})],
+    "users": [([("user_id", ASCENDING), ("registration_timestamp", DESCENDING)], {})],
+    "activity_rollups": [
+        ([("granularity", ASCENDING), ("bucket", ASCENDING), ("action", ASCENDING), ("role", ASCENDING)],
+         {"unique": True}),
+    ],
+}
+# Compacted daily batches written by services/retention.py
+for _collection in AUDIT_COLLECTIONS:
+    INDEXES[f"{_collection}_archive"] = [([("day", ASCENDING)], {}), ([("user_ids", ASCENDING), ("day", DESCENDING)], {})]
+
+
+def _make_client():
+    if settings.MONGODB_URL == MEMORY_URL:
+        from mongomock_motor import AsyncMongoMockClient  # optional dev dependency
+        return AsyncMongoMockClient()
+    # The async client is lazy: it binds to the running event loop on first use
+    return AsyncMongoClient(
+        settings.MONGODB_URL,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+    )
+
+
+def connect():
+    """
+    (Re)create the Mongo client with pool limits and timeouts from settings.
+    """
+    global client, mongo_db
+    client = _make_client()
+    mongo_db = client[settings.MONGODB_DB]
+
+
+async def close():
+    """
+    Close the client; called on shutdown after in-flight requests have finished.
+    The next get_mongo_db() call reconnects lazily. The in-process stand-in is
+    kept so its data survives for the life of the process.
+    """
+    global client, mongo_db
+    if client is None or settings.MONGODB_URL == MEMORY_URL:
+        return
+    result = client.close()
+    if inspect.isawaitable(result):
+        await result
+    client = None
+    mongo_db = None
+
+
+connect()
+
+# Mongo clients are not fork-safe: every worker gets its own client
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=connect)
 
 
 def get_mongo_db():
     """
-    Return the MongoDB database instance for storing audit logs.
+    Return the (async) MongoDB database instance for storing audit logs.
     """
+    if mongo_db is None:
+        connect()
     return mongo_db
+
+
+async def _ensure_ttl(db, collection: str, seconds: int):
+    """
+    TTL index on `timestamp`; an existing TTL with a different period is updated in place.
+    """
+    try:
+        await db[collection].create_index(
+            [("timestamp", ASCENDING)], name=TTL_INDEX, expireAfterSeconds=seconds
+        )
+    except OperationFailure:
+        await db.command("collMod", collection, index={"name": TTL_INDEX, "expireAfterSeconds": seconds})
+
+
+async def ensure_indexes():
+    """
+    Create the audit collection indexes (idempotent). Failures are logged,
+    not raised, so the API still starts when Mongo is unavailable.
+    """
+    db = get_mongo_db()
+    try:
+        for collection, indexes in INDEXES.items():
+            for keys, options in indexes:
+                await db[collection].create_index(keys, **options)
+        if settings.AUDIT_RETENTION_DAYS > 0:
+            if settings.AUDIT_RETENTION_DAYS <= settings.AUDIT_COMPACT_AFTER_DAYS:
+                logger.warning("AUDIT_RETENTION_DAYS <= AUDIT_COMPACT_AFTER_DAYS: raw events expire before compaction")
+            for collection in AUDIT_COLLECTIONS:
+                await _ensure_ttl(db, collection, settings.AUDIT_RETENTION_DAYS * 86400)
+        logger.info("Mongo indexes ensured")
+    except Exception as e:
+        logger.warning(f"Failed to ensure Mongo indexes: {e}")
@@ -1,97 +1,158 @@
 
 # app/routers/auth_routes.py
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from ..database import get_db
+from ..config import settings
+from ..database import get_async_db
 from ..models import User
-from ..schemas import UserRegister, UserOut, TokenOut, LoginRequest, Role
+from ..schemas import UserRegister, UserOut, TokenOut, LoginRequest, LoginThrottleOut, Role
 from ..auth import hash_password, verify_password, create_access_token
-from ..mongo import get_mongo_db
-from ..deps import get_current_user
+from ..deps import get_current_user, require_admin
+from ..services import login_throttle
+from ..services.audit import record, record_activity, USERS
+from ..services.idempotency import idempotent
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+IDEMPOTENCY_KEY_DESCRIPTION = "Optional: retries with the same key return the first response"
+
 @router.post("/register", response_model=UserOut)
-def register(payload: UserRegister, db: Session = Depends(get_db)):
+async def register(
+    payload: UserRegister,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(default=None, description=IDEMPOTENCY_KEY_DESCRIPTION),
+):
     """
     Register a new user with full_name, email, password/confirm_password, and role (USER or ADMIN).
     NOTE: Allowing self-selected ADMIN is insecure for production; keep it only for learning/demo.
-    Also stores user data in MongoDB for audit trail.
+    Also stores user data in the audit log.
     """
+    # Anonymous: scope keys by the email being registered so unrelated clients can't collide
+    return await idempotent(
+        request, idempotency_key, lambda: _register(payload, db), model=UserOut, scope=payload.email.lower()
+    )
+
+
+async def _register(payload: UserRegister, db: AsyncSession) -> User:
     # Basic duplicate check; we also handle unique constraint on commit
-    existing = db.query(User).filter(User.email == payload.email).first()
+    existing = (await db.execute(select(User).where(User.email == payload.email))).scalars().first()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
+    # pbkdf2 is CPU bound; keep it off the event loop
+    hashed = await run_in_threadpool(hash_password, payload.password)
+
     # Create user in SQLite
     user = User(
         full_name=payload.full_name,
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=hashed,
         role=payload.role.value  # store as string in DB
     )
     db.add(user)
     try:
-        db.commit()
+        await db.commit()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    db.refresh(user)
+    await db.refresh(user)
     
-    # Also store in MongoDB for audit trail
+    # Also store in the audit log
     try:
-        mongo_db = get_mongo_db()
+        now = datetime.utcnow()
         user_doc = {
             "user_id": user.id,
             "email": user.email,
             "full_name": user.full_name,
             "role": user.role,
-            "registration_timestamp": datetime.utcnow(),
-            "registration_action": "user_registered"
+            "registration_timestamp": now,
+            "registration_action": "user_registered",
+            "timestamp": now
         }
-        mongo_db.users.insert_one(user_doc)
+        await record(USERS, user_doc)
     except Exception as e:
-        # Log MongoDB error but don't fail registration
-        print(f"Warning: Failed to log user registration to MongoDB: {str(e)}")
+        # Log audit error but don't fail registration
+        print(f"Warning: Failed to log user registration to the audit log: {str(e)}")
     
     return user
 
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(
+    payload: LoginRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Login with email + password. Returns a bearer JWT token.
-    Also logs login activity to MongoDB.
+    Also logs login activity to the audit log.
+    Attempts are rate limited per client IP and per email (429 + Retry-After).
+    Not idempotent-keyed: a retry simply logs in again, and tokens are never
+    kept server-side (a replayed one could outlive ACCESS_TOKEN_EXPIRE_MINUTES).
+    """
+    _throttle_login(request, payload.email)
+    return await _login(payload, db)
+
+
+def _throttle_login(request: Request, email: str) -> None:
+    """
+    Token-bucket check (in memory) before any query or password hashing.
+    """
+    if not settings.LOGIN_THROTTLE_ENABLED:
+        return
+    client_ip = request.client.host if request.client else "unknown"
+    limited = login_throttle.throttle.check(client_ip, email)
+    if limited:
+        scope, retry_after = limited
+        detail = (
+            "Too many login attempts from this address" if scope == login_throttle.IP
+            else "Too many login attempts for this account"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{detail}; please wait before trying again",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+@router.get("/login-throttle", response_model=LoginThrottleOut)
+async def login_throttle_stats(admin=Depends(require_admin)):
+    """
+    Admin-only: allowed / throttled login attempt counts of this worker.
     """
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    return login_throttle.throttle.stats()
+
+
+async def _login(payload: LoginRequest, db: AsyncSession) -> TokenOut:
+    user = (await db.execute(select(User).where(User.email == payload.email))).scalars().first()
+    if not user or not await run_in_threadpool(verify_password, payload.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     token = create_access_token(subject=user.email)
     
-    # Log login activity to MongoDB
+    # Log login activity to the audit log
     try:
-        mongo_db = get_mongo_db()
         activity_log = {
             "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
-            "role": user.role,
             "action": "login",
             "timestamp": datetime.utcnow()
         }
-        mongo_db.activities.insert_one(activity_log)
+        await record_activity(activity_log, role=user.role)
     except Exception as e:
         # Log error but don't fail login
-        print(f"Warning: Failed to log login activity to MongoDB: {str(e)}")
+        print(f"Warning: Failed to log login activity to the audit log: {str(e)}")
     
     return TokenOut(
         access_token=token,
@@ -103,28 +164,30 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout(
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user)
+async def logout(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(default=None, description=IDEMPOTENCY_KEY_DESCRIPTION),
 ):
     """
-    Logout endpoint. Logs logout activity to MongoDB.
+    Logout endpoint. Logs logout activity to the audit log.
     Note: JWT tokens don't have server-side revocation, but we log the action.
     """
+    return await idempotent(request, idempotency_key, lambda: _logout(user), scope=user.id)
+
+
+async def _logout(user) -> dict:
     try:
-        mongo_db = get_mongo_db()
         activity_log = {
             "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
-            "role": user.role,
             "action": "logout",
             "timestamp": datetime.utcnow()
         }
-        mongo_db.activities.insert_one(activity_log)
+        await record_activity(activity_log, role=user.role)
     except Exception as e:
         # Log error but don't fail logout
-        print(f"Warning: Failed to log logout activity to MongoDB: {str(e)}")
+        print(f"Warning: Failed to log logout activity to the audit log: {str(e)}")
     
     return {
         "success": True,
@@ -1,133 +1,338 @@
 
 # app/routers/loan_routes.py
 
-from typing import Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-
-from ..database import get_db
-from ..models import LoanApplication
-from ..schemas import LoanCreate, LoanOut, DecisionRequest
-from ..deps import get_current_user, require_admin
-from ..services.risk import compute_risk, approval_decision
-from ..mongo import get_mongo_db
+from typing import NamedTuple, Optional
+from datetime import datetime, timedelta
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_async_db
+from ..models import LoanApplication, User
+from ..schemas import (
+    LoanCreate, LoanOut, LoanOutWithUser, DecisionRequest, ExposureOut, ScheduleOut, PortfolioScheduleOut,
+    StressTestRequest, StressTestOut, ThresholdSimulationOut, RiskDistributionOut, SlaOut, StatusHistoryOut,
+    LoansAtOut,
+)
+from ..deps import get_current_user, require_admin, sparse_fields
+from ..services.risk import (
+    APPROVAL_THRESHOLD, RiskBreakdown, risk_breakdown, log_risk, approval_decision, payment_to_income,
+)
+from ..services.audit import record, record_activity, CALCULATIONS
+from ..services import (
+    amortization, application_guard, exposure, group_commit, idempotency, loan_events, loan_snapshot,
+    response_cache, risk_index, sla, status_history, stress,
+)
+from ..services.serialization import dump_rows, keys
 
 router = APIRouter(prefix="/loans", tags=["loans"])
 
+# List endpoints select these columns directly, in LoanOut / LoanOutWithUser field order
+LOAN_COLUMNS = (
+    LoanApplication.id,
+    LoanApplication.user_id,
+    LoanApplication.amount,
+    LoanApplication.income,
+    LoanApplication.credit_score,
+    LoanApplication.term_months,
+    LoanApplication.status,
+    LoanApplication.risk_score,
+    LoanApplication.created_at,
+    LoanApplication.decided_at,
+)
+# Not stored: computed from risk_index.book when requested
+PERCENTILE_KEY = "risk_percentile"
+LOAN_KEYS = keys(LOAN_COLUMNS) + (PERCENTILE_KEY,)
+LOAN_WITH_USER_COLUMNS = (
+    LoanApplication.id,
+    LoanApplication.user_id,
+    func.coalesce(User.email, "unknown").label("user_email"),
+    func.coalesce(User.full_name, "unknown").label("user_name"),
+    *LOAN_COLUMNS[2:],
+)
+LOAN_WITH_USER_KEYS = keys(LOAN_WITH_USER_COLUMNS) + (PERCENTILE_KEY,)
+LOAN_COLUMN_BY_KEY = dict(zip(LOAN_WITH_USER_KEYS, LOAN_WITH_USER_COLUMNS))
+USER_KEYS = ("user_email", "user_name")
+STATUSES = ("PENDING", "APPROVED", "REJECTED")
+
+
+def _status(status_filter: Optional[str]) -> Optional[str]:
+    # Unknown values are ignored (no filter), as before
+    return status_filter if status_filter in STATUSES else None
+
+
+def _select_loans(fields: tuple[str, ...]):
+    """
+    SELECT only the requested columns; join users only when user fields are asked for.
+    """
+    columns = [LOAN_COLUMN_BY_KEY[k] for k in fields if k != PERCENTILE_KEY]
+    if PERCENTILE_KEY in fields:
+        # Last in schema order: its score goes last and is swapped for the percentile
+        columns.append(LoanApplication.risk_score.label("percentile_of"))
+    q = select(*columns).select_from(LoanApplication)
+    if any(k in USER_KEYS for k in fields):
+        q = q.outerjoin(User, User.id == LoanApplication.user_id)
+    return q
+
+
+async def _loan_list_body(db: AsyncSession, q, fields: tuple[str, ...]) -> bytes:
+    # Column tuples straight to JSON; the columns already match the response schema
+    rows = (await db.execute(q)).all()
+    if PERCENTILE_KEY in fields:
+        percentiles = risk_index.book.percentiles([row[-1] for row in rows]).tolist()
+        rows = [(*row[:-1], p) for row, p in zip(rows, percentiles)]
+    return dump_rows(fields, rows)
+
+
+def _list_key(*parts, fields: tuple[str, ...]) -> tuple:
+    """
+    Response cache key. Percentiles change with the book, not with the data
+    version, so bodies containing them are also keyed on the book's contents.
+    """
+    if PERCENTILE_KEY in fields:
+        return (*parts, fields, risk_index.book.tag)
+    return (*parts, fields)
+
+
+def _loan_out(loan: LoanApplication) -> LoanOut:
+    out = LoanOut.model_validate(loan)
+    out.risk_percentile = risk_index.book.percentile(loan.risk_score)
+    return out
+
+
+IDEMPOTENCY_KEY_DESCRIPTION = "Optional: retries with the same key return the first response instead of repeating the write"
+
 
 @router.post("/", response_model=LoanOut)
-def apply_loan(
+async def apply_loan(
     payload: LoanCreate,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(default=None, description=IDEMPOTENCY_KEY_DESCRIPTION),
 ):
     """
     Create a new loan application for the current user.
     Computes a risk score and stores status='PENDING'.
-    Also logs calculation details to MongoDB.
+    Rejected with 400 when it would exceed the user's exposure limits
+    (MAX_PENDING_LOANS / MAX_PENDING_AMOUNT).
+    Also logs calculation details to the audit log.
+    With an Idempotency-Key, a retried request returns the original loan.
     """
-    risk = compute_risk(
+    return await idempotency.idempotent(
+        request, idempotency_key, lambda: _apply_loan(payload, db, user), model=LoanOut, scope=user.id
+    )
+
+
+def _screen_application(payload: LoanCreate, user) -> Optional[application_guard.Admission]:
+    """
+    Duplicate / velocity check (in memory, no query). Raises 409 / 429 in "reject" mode.
+    """
+    mode = settings.APPLICATION_GUARD_MODE
+    if mode == "off":
+        return None
+    digest = application_guard.fingerprint(
+        user.id, payload.amount, payload.income, payload.credit_score, payload.term_months
+    )
+    admission = application_guard.guard.admit(user.id, digest, reject=mode == "reject")
+    if admission.flags and mode == "reject":
+        headers = {"Retry-After": str(admission.retry_after)}
+        if application_guard.DUPLICATE in admission.flags:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Duplicate application: the same application was submitted recently",
+                headers=headers,
+            )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many applications; please wait before applying again",
+            headers=headers,
+        )
+    return admission
+
+
+async def _apply_loan(payload: LoanCreate, db: AsyncSession, user) -> LoanOut:
+    admission = _screen_application(payload, user)
+    try:
+        loan, risk = await _create_loan(payload, db, user)
+    except BaseException:
+        # Not created: don't count it as a duplicate / towards velocity
+        if admission:
+            application_guard.guard.release(admission)
+        raise
+    out = _loan_out(loan)
+    loan_events.broadcaster.publish(loan_events.LOAN_CREATED, {
+        "loan": LoanOutWithUser(
+            **out.model_dump(), user_email=user.email, user_name=user.full_name
+        ).model_dump(mode="json")
+    })
+    await _log_application(payload, user, loan, risk, admission.flags if admission else ())
+    return out
+
+
+async def _create_loan(payload: LoanCreate, db: AsyncSession, user) -> tuple[LoanApplication, RiskBreakdown]:
+    risk = risk_breakdown(
         payload.amount,
         payload.income,
         payload.credit_score,
         payload.term_months
     )
-    loan = LoanApplication(
-        user_id=user.id,
-        amount=payload.amount,
-        income=payload.income,
-        credit_score=payload.credit_score,
-        term_months=payload.term_months,
-        risk_score=risk,
-        status="PENDING"  # store as string in DB
-    )
-    db.add(loan)
-    db.commit()
-    db.refresh(loan)
-    
-    # Calculate intermediate factors for logging
-    debt_ratio = payload.amount / payload.income
-    credit_factor = (850 - payload.credit_score) / 550
-    term_factor = payload.term_months / 360
-    
-    # Log calculation details to MongoDB
+
+    async def write(session: AsyncSession) -> tuple[LoanApplication, int]:
+        try:
+            await exposure.reserve(session, user.id, payload.amount)
+        except exposure.ExposureLimitExceeded as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # Every column but id is known here, so one INSERT ... RETURNING gives
+        # the complete row; no flush/refresh SELECT afterwards
+        loan = (await session.execute(
+            insert(LoanApplication)
+            .values(
+                user_id=user.id,
+                amount=payload.amount,
+                income=payload.income,
+                credit_score=payload.credit_score,
+                term_months=payload.term_months,
+                risk_score=risk.score,
+                status="PENDING",  # store as string in DB
+                created_at=datetime.utcnow(),
+            )
+            .returning(LoanApplication)
+        )).scalar_one()
+        await status_history.opened(session, loan.id, "PENDING", loan.created_at, user.id)
+        return loan, await response_cache.bump_version(session)
+
+    if group_commit.coalescer.running:
+        # Shares a transaction with other concurrent applications. Release this
+        # request's connection (and its SQLite read lock) while waiting, or
+        # waiters would block the batch's commit and exhaust the pool.
+        await db.close()
+        loan, version = await group_commit.coalescer.submit(write)
+    else:
+        try:
+            loan, version = await write(db)
+        except HTTPException:
+            await db.rollback()
+            raise
+        await db.commit()
+    risk_index.book.add(risk.score)
+    loan_snapshot.snapshot.inserted(loan, user.email, user.full_name, version)
+    return loan, risk
+
+
+async def _log_application(
+    payload: LoanCreate, user, loan: LoanApplication, risk: RiskBreakdown, flags: tuple[str, ...]
+) -> None:
+    # Log risk and calculation details to the audit log
     try:
-        mongo_db = get_mongo_db()
+        await log_risk(user.id, payload.amount, payload.income, payload.credit_score, payload.term_months, risk.score)
         calculation_log = {
             "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
             "loan_id": loan.id,
             "amount": payload.amount,
             "income": payload.income,
             "credit_score": payload.credit_score,
             "term_months": payload.term_months,
-            "debt_ratio": debt_ratio,
-            "credit_factor": credit_factor,
-            "term_factor": term_factor,
-            "risk_score": risk,
+            "debt_ratio": risk.debt_ratio,
+            "credit_factor": risk.credit_factor,
+            "term_factor": risk.term_factor,
+            "risk_score": risk.score,
+            "payment_to_income": payment_to_income(payload.amount, payload.income, payload.term_months),
             "timestamp": datetime.utcnow(),
             "action": "loan_calculation"
         }
-        mongo_db.calculations.insert_one(calculation_log)
+        await record(CALCULATIONS, calculation_log)
         
         # Also log as activity
         activity_log = {
             "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
-            "role": user.role,
             "action": "apply_loan",
             "details": {
                 "loan_id": loan.id,
                 "amount": payload.amount,
-                "risk_score": risk
+                "risk_score": risk.score
             },
             "timestamp": datetime.utcnow()
         }
-        mongo_db.activities.insert_one(activity_log)
+        if flags:
+            # APPLICATION_GUARD_MODE=flag: accepted, but marked for review
+            activity_log["details"]["flags"] = list(flags)
+        await record_activity(activity_log, role=user.role)
     except Exception as e:
         # Log error but don't fail loan creation
-        print(f"Warning: Failed to log loan calculation to MongoDB: {str(e)}")
-    
-    return loan
+        print(f"Warning: Failed to log loan calculation to the audit log: {str(e)}")
 
 
 @router.get("/pending", response_model=list[LoanOut])
-def list_pending(
-    db: Session = Depends(get_db),
-    admin=Depends(require_admin)
+async def list_pending(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+    fields: tuple[str, ...] = Depends(sparse_fields(LOAN_KEYS)),
 ):
     """
     Admin-only: list all PENDING loan applications.
+    Cached until the next loan write; supports If-None-Match.
     """
-    items = (
-        db.query(LoanApplication)
-        .filter(LoanApplication.status == "PENDING")
+    q = (
+        _select_loans(fields)
+        .where(LoanApplication.status == "PENDING")
         .order_by(LoanApplication.id.desc())
-        .all()
     )
-    return items
+    return await response_cache.cached_response(
+        request, db, _list_key("pending", "ADMIN", fields=fields), lambda: _loan_list_body(db, q, fields)
+    )
+
+
+@router.get("/events")
+async def loan_event_stream(
+    last_event_id: Optional[str] = Header(default=None, description="Resume after this event id (sent by EventSource on reconnect)"),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+):
+    """
+    Admin-only: Server-Sent Events stream of loan lifecycle deltas
+    (loan_created, loan_decided) for the pending/all screens.
+    A fresh stream starts with `ready`; `reset` means events were missed
+    and the lists should be re-fetched once.
+    """
+    # The stream can stay open for minutes; don't hold a pooled connection for it
+    await db.close()
+    return StreamingResponse(
+        loan_events.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/{loan_id}/decision", response_model=LoanOut)
-def decide(
+async def decide(
     loan_id: int,
     payload: DecisionRequest,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(require_admin),
+    idempotency_key: Optional[str] = Header(default=None, description=IDEMPOTENCY_KEY_DESCRIPTION),
 ):
     """
     Admin-only: decide a loan application.
     - If `payload.action` is provided (APPROVED/REJECTED), it forces that status.
     - Otherwise, auto-decides based on risk score via approval_decision().
     Prevent re-deciding an already decided loan.
-    Also logs decision to MongoDB.
+    Also logs decision to the audit log.
+    With an Idempotency-Key, a retried decision returns the original result
+    instead of "Loan already ...".
     """
-    from ..models import User
-    
-    loan = db.query(LoanApplication).filter(LoanApplication.id == loan_id).first()
+    return await idempotency.idempotent(
+        request, idempotency_key, lambda: _decide(loan_id, payload, db, admin), model=LoanOut, scope=admin.id
+    )
+
+
+async def _decide(loan_id: int, payload: DecisionRequest, db: AsyncSession, admin) -> LoanOut:
+    loan = await db.get(LoanApplication, loan_id)
     if not loan:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan not found")
 
@@ -135,66 +340,112 @@ def decide(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Loan already {loan.status}")
 
     if payload.action in ("APPROVED", "REJECTED"):
-        loan.status = payload.action
+        new_status = payload.action
     else:
-        loan.status = approval_decision(loan.risk_score)  # returns "APPROVED"/"REJECTED"
+        new_status = approval_decision(loan.risk_score)  # returns "APPROVED"/"REJECTED"
 
-    db.commit()
-    db.refresh(loan)
-    
-    # Get user info to log decision
-    user = db.query(User).filter(User.id == loan.user_id).first()
+    # Conditional on PENDING so two concurrent decisions can't both settle the exposure
+    decided_at = datetime.utcnow()
+    result = await db.execute(
+        update(LoanApplication)
+        .where(LoanApplication.id == loan.id, LoanApplication.status == "PENDING")
+        .values(status=new_status, decided_at=decided_at)
+    )
+    if not result.rowcount:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Loan already decided")
+    await status_history.transition(db, loan.id, new_status, decided_at, admin.id)
+    await exposure.settle(db, loan.user_id, loan.amount, approved=new_status == "APPROVED")
+    version = await response_cache.bump_version(db)
+    await db.commit()
+    await db.refresh(loan)
+    loan_snapshot.snapshot.decided(loan.id, new_status, loan.decided_at, version)
+    out = _loan_out(loan)
+    email, full_name = await _applicant(db, loan.user_id)
+    loan_events.broadcaster.publish(loan_events.LOAN_DECIDED, {
+        # Same shape as loan_created, so the /all screen can replace the row in place
+        "loan": LoanOutWithUser(**out.model_dump(), user_email=email, user_name=full_name).model_dump(mode="json")
+    })
     
-    # Log decision to MongoDB
+    # Log decision to the audit log
     try:
-        mongo_db = get_mongo_db()
         decision_log = {
             "admin_id": admin.id,
-            "admin_email": admin.email,
             "user_id": loan.user_id,
-            "user_email": user.email if user else "unknown",
             "loan_id": loan.id,
             "decision": loan.status,
             "risk_score": loan.risk_score,
             "timestamp": datetime.utcnow(),
             "action": "loan_decision"
         }
-        mongo_db.activities.insert_one(decision_log)
+        await record_activity(decision_log, role=admin.role)
     except Exception as e:
         # Log error but don't fail decision
-        print(f"Warning: Failed to log loan decision to MongoDB: {str(e)}")
+        print(f"Warning: Failed to log loan decision to the audit log: {str(e)}")
     
-    return loan
+    return out
+
+
+async def _applicant(db: AsyncSession, user_id: int) -> tuple[str, str]:
+    """
+    (email, full_name) of a loan's applicant, from the snapshot when it has them.
+    """
+    known = loan_snapshot.snapshot.users.get(user_id)
+    if known:
+        return known
+    user = await db.get(User, user_id)
+    return (user.email, user.full_name) if user else ("unknown", "unknown")
+
+
+async def _my_loans_response(
+    request: Request, db: AsyncSession, user, status_filter: Optional[str], fields: tuple[str, ...]
+):
+    status_filter = _status(status_filter)
+    q = _select_loans(fields).where(LoanApplication.user_id == user.id)
+    if status_filter:
+        q = q.where(LoanApplication.status == status_filter)
+    return await response_cache.cached_response(
+        request, db, _list_key("my", user.id, status_filter, fields=fields),
+        lambda: _loan_list_body(db, q.order_by(LoanApplication.id.desc()), fields),
+    )
 
 
 @router.get("/my", response_model=list[LoanOut])
-def my_loans(
-    db: Session = Depends(get_db),
+async def my_loans(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
     status_filter: Optional[str] = Query(
         default=None,
         description="Optional: filter by status (PENDING, APPROVED, REJECTED)"
-    )
+    ),
+    fields: tuple[str, ...] = Depends(sparse_fields(LOAN_KEYS)),
 ):
     """
     List loans belonging to the current user.
     Optional filter: status_filter (PENDING/APPROVED/REJECTED).
+    Cached until the next loan write; supports If-None-Match.
     """
-    q = db.query(LoanApplication).filter(LoanApplication.user_id == user.id)
-    if status_filter in ("PENDING", "APPROVED", "REJECTED"):
-        q = q.filter(LoanApplication.status == status_filter)
+    return await _my_loans_response(request, db, user, status_filter, fields)
 
-    items = (
-        q.order_by(LoanApplication.id.desc())
-         .all()
-    )
-    return items
+
+@router.get("/my/summary", response_model=ExposureOut)
+async def my_summary(
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user)
+):
+    """
+    The current user's exposure (pending count, pending total, approved total)
+    and the limits apply_loan enforces. One primary key lookup.
+    Declared before /my/{loan_id} so "summary" isn't parsed as an id.
+    """
+    return await exposure.summary(db, user.id)
 
 
 @router.get("/my/{loan_id}", response_model=LoanOut)
-def my_loan_detail(
+async def my_loan_detail(
     loan_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user)
 ):
     """
@@ -202,79 +453,390 @@ def my_loan_detail(
     Returns 404 if not found or doesn't belong to the user (no data leakage).
     """
     loan = (
-        db.query(LoanApplication)
-        .filter(
-            LoanApplication.id == loan_id,
-            LoanApplication.user_id == user.id
+        await db.scalars(
+            select(LoanApplication)
+            .where(
+                LoanApplication.id == loan_id,
+                LoanApplication.user_id == user.id
+            )
         )
-        .first()
-    )
+    ).first()
     if not loan:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan not found")
-    return loan
+    return _loan_out(loan)
 
 
 @router.get("/my-loans", response_model=list[LoanOut])
-def my_loans_alias(
-    db: Session = Depends(get_db),
+async def my_loans_alias(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(get_current_user),
     status_filter: Optional[str] = Query(
         default=None,
         description="Optional: filter by status (PENDING, APPROVED, REJECTED)"
-    )
+    ),
+    fields: tuple[str, ...] = Depends(sparse_fields(LOAN_KEYS)),
 ):
     """
     Alias for /loans/my endpoint.
     List loans belonging to the current user.
     Optional filter: status_filter (PENDING/APPROVED/REJECTED).
+    Cached until the next loan write; supports If-None-Match.
     """
-    q = db.query(LoanApplication).filter(LoanApplication.user_id == user.id)
-    if status_filter in ("PENDING", "APPROVED", "REJECTED"):
-        q = q.filter(LoanApplication.status == status_filter)
+    return await _my_loans_response(request, db, user, status_filter, fields)
+
+
+class LoanFilters(NamedTuple):
+    ranges: tuple[tuple[str, Optional[float], Optional[float]], ...]  # (column, min, max), inclusive
+    sort: str
+    descending: bool
+
+
+def loan_filters(
+    min_amount: Optional[float] = Query(default=None),
+    max_amount: Optional[float] = Query(default=None),
+    min_income: Optional[float] = Query(default=None),
+    max_income: Optional[float] = Query(default=None),
+    min_credit_score: Optional[int] = Query(default=None),
+    max_credit_score: Optional[int] = Query(default=None),
+    min_risk: Optional[float] = Query(default=None),
+    max_risk: Optional[float] = Query(default=None),
+    sort: str = Query(
+        default="-id",
+        description=f"Column to sort by, '-' prefix for descending: {', '.join(loan_snapshot.SORTABLE)}"
+    ),
+) -> LoanFilters:
+    descending = sort.startswith("-")
+    column = sort.removeprefix("-")
+    if column not in loan_snapshot.SORTABLE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sort column: {column}. Allowed: {', '.join(loan_snapshot.SORTABLE)}"
+        )
+    bounds = (
+        ("amount", min_amount, max_amount),
+        ("income", min_income, max_income),
+        ("credit_score", min_credit_score, max_credit_score),
+        ("risk_score", min_risk, max_risk),
+    )
+    return LoanFilters(tuple(b for b in bounds if b[1] is not None or b[2] is not None), column, descending)
+
 
-    items = (
-        q.order_by(LoanApplication.id.desc())
-         .all()
+def _snapshot_body(snap: loan_snapshot.LoanSnapshot, status_filter, filters: LoanFilters, fields) -> bytes:
+    positions = snap.select(
+        status_filter, {name: (low, high) for name, low, high in filters.ranges}, filters.sort, filters.descending
     )
-    return items
+    columns = []
+    for key in fields:
+        if key == PERCENTILE_KEY:
+            columns.append(risk_index.book.percentiles(snap.column("risk_score")[positions]).tolist())
+        else:
+            columns.append(snap.values(key, positions))
+    return dump_rows(fields, zip(*columns))
 
 
-@router.get("/all", response_model=list[dict])
-def all_loans(
-    db: Session = Depends(get_db),
+@router.get("/all", response_model=list[LoanOutWithUser])
+async def all_loans(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     admin=Depends(require_admin),
     status_filter: Optional[str] = Query(
         default=None,
         description="Optional: filter by status (PENDING, APPROVED, REJECTED)"
-    )
+    ),
+    filters: LoanFilters = Depends(loan_filters),
+    fields: tuple[str, ...] = Depends(sparse_fields(LOAN_WITH_USER_KEYS)),
 ):
     """
-    Admin-only: Get all loans in the system with user details and optional status filter.
+    Admin-only: Get all loans in the system with user details, optionally
+    filtered by status and inclusive min_/max_ ranges on amount, income,
+    credit_score and risk, sorted by any column (default newest first).
+    Served from the in-memory columnar snapshot (LOAN_SNAPSHOT_ENABLED),
+    otherwise in SQL. Cached until the next loan write; supports If-None-Match.
     """
-    from ..models import User
-    
-    q = db.query(LoanApplication)
-    if status_filter in ("PENDING", "APPROVED", "REJECTED"):
-        q = q.filter(LoanApplication.status == status_filter)
+    status_filter = _status(status_filter)
+    key = _list_key("all", "ADMIN", status_filter, filters, fields=fields)
+    if settings.LOAN_SNAPSHOT_ENABLED:
+        async def build() -> bytes:
+            snap = await loan_snapshot.ensure_current(db)
+            return _snapshot_body(snap, status_filter, filters, fields)
+        return await response_cache.cached_response(request, db, key, build)
 
-    loans = q.order_by(LoanApplication.id.desc()).all()
-    
-    # Build response with user info
-    result = []
-    for loan in loans:
-        user = db.query(User).filter(User.id == loan.user_id).first()
-        loan_dict = {
-            "id": loan.id,
-            "user_id": loan.user_id,
-            "user_email": user.email if user else "unknown",
-            "user_name": user.full_name if user else "unknown",
-            "amount": loan.amount,
-            "income": loan.income,
-            "credit_score": loan.credit_score,
-            "term_months": loan.term_months,
-            "status": loan.status,
-            "risk_score": loan.risk_score
-        }
-        result.append(loan_dict)
-    
-    return result
+    # User info is joined in the same query (when requested)
+    q = _select_loans(fields)
+    if status_filter:
+        q = q.where(LoanApplication.status == status_filter)
+    for name, low, high in filters.ranges:
+        column = getattr(LoanApplication, name)
+        if low is not None:
+            q = q.where(column >= low)
+        if high is not None:
+            q = q.where(column <= high)
+    sort_column = getattr(LoanApplication, filters.sort)
+    if filters.descending:
+        q = q.order_by(sort_column.desc(), LoanApplication.id.desc())
+    else:
+        q = q.order_by(sort_column, LoanApplication.id)
+
+    return await response_cache.cached_response(request, db, key, lambda: _loan_list_body(db, q, fields))
+
+
+SCHEDULE_KEYS = ("month", "payment", "principal", "interest", "balance")
+PORTFOLIO_LOAN_KEYS = ("loan_id", "monthly_payment", "total_interest", "payment_to_income")
+ANNUAL_RATE_QUERY = Query(
+    default=None, ge=0, le=1,
+    description="Optional: annual interest rate as a fraction (default ANNUAL_INTEREST_RATE)"
+)
+
+
+def _schedule_rows(payment, principal, interest, balance) -> list[dict]:
+    months = range(1, len(payment) + 1)
+    columns = (months, payment.tolist(), principal.tolist(), interest.tolist(), balance.tolist())
+    return [dict(zip(SCHEDULE_KEYS, row)) for row in zip(*columns)]
+
+
+@router.get("/portfolio/schedule", response_model=PortfolioScheduleOut)
+async def portfolio_schedule(
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+    status_filter: Optional[str] = Query(
+        default=None,
+        description="Optional: filter by status (PENDING, APPROVED, REJECTED)"
+    ),
+    loan_id: Optional[list[int]] = Query(default=None, description="Optional: only these loans (repeatable)"),
+    annual_rate: Optional[float] = ANNUAL_RATE_QUERY,
+):
+    """
+    Admin-only: payment figures for every selected loan and the portfolio's
+    combined monthly cash flow, computed with array math in one pass.
+    Declared before /{loan_id}/schedule so "portfolio" isn't parsed as an id.
+    """
+    status_filter = _status(status_filter)
+    q = select(
+        LoanApplication.id, LoanApplication.amount, LoanApplication.income, LoanApplication.term_months
+    ).order_by(LoanApplication.id)
+    if status_filter:
+        q = q.where(LoanApplication.status == status_filter)
+    if loan_id:
+        q = q.where(LoanApplication.id.in_(loan_id))
+    rows = (await db.execute(q)).all()
+    ids, amounts, incomes, terms = zip(*rows) if rows else ((), (), (), ())
+
+    p = amortization.portfolio(amounts, incomes, terms, amortization.resolve_rate(annual_rate))
+    body = {
+        "annual_rate": p.annual_rate,
+        "loan_count": len(ids),
+        "principal": float(sum(amounts)),
+        "monthly_payment": float(p.monthly_payment.sum()),
+        "total_interest": float(p.total_interest.sum()),
+        "max_payment_to_income": float(p.payment_to_income.max()) if ids else None,
+        "loans": [
+            dict(zip(PORTFOLIO_LOAN_KEYS, row)) for row in zip(
+                ids, p.monthly_payment.tolist(), p.total_interest.tolist(), p.payment_to_income.tolist()
+            )
+        ],
+        "cash_flow": _schedule_rows(p.payment, p.principal, p.interest, p.balance),
+    }
+    return Response(orjson.dumps(body), media_type="application/json")
+
+
+@router.post("/stress-test", response_model=StressTestOut)
+async def stress_test(
+    payload: StressTestRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+):
+    """
+    Admin-only: expected loss of the portfolio (approved loans by default)
+    under each scenario, plus an unstressed baseline first. The portfolio is
+    loaded into arrays once per data version and all scenarios run in one
+    batched computation.
+    """
+    portfolio = await stress.load_portfolio(db, payload.status.value)
+    lgd = settings.STRESS_LOSS_GIVEN_DEFAULT if payload.loss_given_default is None else payload.loss_given_default
+    scenarios = [stress.BASELINE] + [
+        stress.Scenario(sc.name, sc.credit_score_shift, sc.income_change) for sc in payload.scenarios
+    ]
+    results = stress.run(portfolio, scenarios, lgd)
+    return {
+        "status": payload.status,
+        "loan_count": len(portfolio.amount),
+        "exposure": float(portfolio.amount.sum()),
+        "loss_given_default": lgd,
+        "results": [r._asdict() for r in results],
+    }
+
+
+MAX_THRESHOLD_POINTS = 1001
+
+
+@router.get("/threshold-simulation", response_model=ThresholdSimulationOut)
+async def threshold_simulation(
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+    threshold: Optional[list[float]] = Query(
+        default=None, description="Optional: thresholds to evaluate (repeatable); overrides start/stop/step"
+    ),
+    start: float = Query(default=0.3, ge=0, le=1),
+    stop: float = Query(default=0.7, ge=0, le=1),
+    step: float = Query(default=0.05, gt=0, le=1),
+    status_filter: Optional[str] = Query(
+        default=None,
+        description="Optional: only loans with this status (PENDING, APPROVED, REJECTED); default all"
+    ),
+):
+    """
+    Admin-only: what approval_decision would approve at each threshold
+    (approve when risk < threshold). Every point comes from one sorted
+    risk index with prefix sums; nothing is re-queried per threshold.
+    """
+    if threshold:
+        thresholds = sorted(set(threshold))
+    else:
+        if stop < start:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="stop must be >= start")
+        count = int(round((stop - start) / step)) + 1
+        thresholds = [round(start + i * step, 10) for i in range(min(count, MAX_THRESHOLD_POINTS + 1))]
+    if len(thresholds) > MAX_THRESHOLD_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_THRESHOLD_POINTS} thresholds per request"
+        )
+
+    index = await risk_index.load_index(db, _status(status_filter))
+    return {
+        "loan_count": len(index),
+        "current_threshold": APPROVAL_THRESHOLD,
+        "points": [p._asdict() for p in index.simulate(thresholds)],
+    }
+
+
+QUANTILES = {"p10": 0.1, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9}
+
+
+@router.get("/risk-distribution", response_model=RiskDistributionOut)
+async def risk_distribution(
+    user=Depends(get_current_user),
+    bins: int = Query(default=20, ge=1, le=100, description="Equal-width bins over [0, 1]"),
+):
+    """
+    Histogram and quartiles of the risk scores of every stored loan, from the
+    in-memory percentile index (no query).
+    """
+    book = risk_index.book
+    counts = book.histogram(bins)
+    return {
+        "loan_count": book.total,
+        "quantiles": {name: book.quantile(q) for name, q in QUANTILES.items()},
+        "bins": [
+            {"lower": i / bins, "upper": (i + 1) / bins, "count": count} for i, count in enumerate(counts)
+        ],
+    }
+
+
+SLA_DEFAULT_DAYS = 30
+
+
+@router.get("/sla", response_model=SlaOut)
+async def loan_sla(
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+    since: Optional[datetime] = Query(default=None, description=f"UTC; default {SLA_DEFAULT_DAYS} days before `until`"),
+    until: Optional[datetime] = Query(default=None, description="UTC; default now"),
+):
+    """
+    Admin-only: queue-time percentiles (application to decision) for loans
+    decided in [since, until), the age of the current pending queue, and
+    applications / approvals / rejections per day. Each figure is one
+    indexed range scan over created_at / decided_at.
+    """
+    until = sla.naive_utc(until) if until else datetime.utcnow()
+    since = sla.naive_utc(since) if since else until - timedelta(days=SLA_DEFAULT_DAYS)
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must be before until")
+    return {
+        "since": since,
+        "until": until,
+        "queue_time": sla.summarize(await sla.queue_times(db, since, until)),
+        "pending_age": sla.summarize(await sla.pending_ages(db, datetime.utcnow())),
+        "throughput": await sla.throughput(db, since, until),
+        "missing_timestamps": await sla.missing_timestamps(db),
+    }
+
+
+@router.get("/status-at", response_model=LoansAtOut)
+async def loans_status_at(
+    at: datetime = Query(description="UTC point in time"),
+    status_filter: str = Query(default="PENDING", description="PENDING, APPROVED or REJECTED"),
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(require_admin),
+):
+    """
+    Admin-only: ids of the loans that were in `status_filter` (default PENDING)
+    at `at`, from the status history.
+    """
+    wanted = _status(status_filter)
+    if wanted is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown status")
+    at = sla.naive_utc(at)
+    loan_ids = await status_history.loans_in_status_at(db, wanted, at)
+    return {"at": at, "status": wanted, "count": len(loan_ids), "loan_ids": loan_ids}
+
+
+@router.get("/{loan_id}/history", response_model=list[StatusHistoryOut])
+async def loan_history(
+    loan_id: int,
+    at: Optional[datetime] = Query(default=None, description="UTC; only the status in effect then"),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    """
+    Status history of a loan, oldest first (owner or admin). With `at`,
+    just the entry in effect at that time (empty if the loan didn't exist yet).
+    Returns 404 if not found or not visible to the user.
+    """
+    q = select(LoanApplication.id).where(LoanApplication.id == loan_id)
+    if user.role != "ADMIN":
+        q = q.where(LoanApplication.user_id == user.id)
+    if (await db.execute(q)).first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan not found")
+    if at is None:
+        return await status_history.history(db, loan_id)
+    entry = await status_history.state_at(db, loan_id, sla.naive_utc(at))
+    return [entry] if entry else []
+
+
+@router.get("/{loan_id}/schedule", response_model=ScheduleOut)
+async def loan_schedule(
+    loan_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+    annual_rate: Optional[float] = ANNUAL_RATE_QUERY,
+):
+    """
+    Month-by-month amortization schedule for a loan (owner or admin).
+    Returns 404 if not found or not visible to the user.
+    """
+    q = select(
+        LoanApplication.amount, LoanApplication.income, LoanApplication.term_months
+    ).where(LoanApplication.id == loan_id)
+    if user.role != "ADMIN":
+        q = q.where(LoanApplication.user_id == user.id)
+    row = (await db.execute(q)).first()
+    if not row:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan not found")
+
+    amount, income, term_months = row
+    s = amortization.schedule(amount, amortization.resolve_rate(annual_rate), term_months)
+    body = {
+        "loan_id": loan_id,
+        "amount": s.amount,
+        "annual_rate": s.annual_rate,
+        "term_months": s.term_months,
+        "monthly_payment": s.monthly_payment,
+        "total_payment": s.total_payment,
+        "total_interest": s.total_interest,
+        "payment_to_income": s.monthly_payment / (max(income, 1.0) / 12),
+        "schedule": _schedule_rows(s.payment, s.principal, s.interest, s.balance),
+    }
+    return Response(orjson.dumps(body), media_type="application/json")
@@ -1,63 +1,81 @@
 # app/routers/logs_routes.py
 
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from pydantic import Field
 
-from ..database import get_db
-from ..deps import get_current_user
-from ..mongo import get_mongo_db
+from ..deps import get_current_user, require_admin, sparse_fields
+from ..schemas import CalculationEvent, ActivityEvent, MAX_LOG_BATCH
+from ..services import audit, sla
+from ..services.audit import record, record_many, record_activity, record_activities, ACTIVITIES, CALCULATIONS
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
+# Only fetch the fields the read endpoints return. Events are stored in compact
+# form (user_id only); identity is joined from the current user at read time.
+ACTIVITY_FIELDS = ("user_id", "action", "details", "loan_id", "decision", "risk_score")
+CALCULATION_FIELDS = (
+    "user_id", "loan_id", "amount", "income", "credit_score", "term_months",
+    "debt_ratio", "credit_factor", "term_factor", "risk_score", "payment_to_income", "action",
+)
+# `fields=` choices: stored fields plus the joined identity (_id and timestamp always come back)
+ACTIVITY_OUT_FIELDS = ACTIVITY_FIELDS + ("email", "full_name", "role")
+CALCULATION_OUT_FIELDS = CALCULATION_FIELDS + ("email", "full_name")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+async def _fetch_page(
+    stream: str, user_id: int, before: Optional[str], limit: int, fields: tuple, identity: dict
+) -> tuple[list, Optional[str]]:
+    # Only stored fields go into the backend projection; identity is filled in here
+    identity = {k: v for k, v in identity.items() if k in fields}
+    stored = tuple(f for f in fields if f not in identity)
+    try:
+        docs, next_cursor = await audit.user_timeline(stream, user_id, before, limit, stored)
+    except audit.InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    for doc in docs:
+        # datetime -> string for JSON serialization
+        doc["timestamp"] = doc["timestamp"].isoformat()
+        doc.update(identity)
+    return docs, next_cursor
+
+
+def _calculation_doc(user, event: CalculationEvent, timestamp: datetime) -> dict:
+    return {
+        "user_id": user.id,
+        **event.model_dump(),
+        "timestamp": timestamp,
+        "action": "loan_calculation"
+    }
+
+
+def _activity_doc(user, event: ActivityEvent, timestamp: datetime) -> dict:
+    return {
+        "user_id": user.id,
+        "action": event.action,
+        "details": event.details,
+        "timestamp": timestamp,
+    }
+
 
 @router.post("/calculation")
-def log_calculation(
-    payload: dict,
-    db: Session = Depends(get_db),
+async def log_calculation(
+    payload: CalculationEvent,
     user=Depends(get_current_user),
 ):
     """
-    Log calculation details for a loan application to MongoDB.
-    
-    Expected payload:
-    {
-        "loan_id": int,
-        "amount": float,
-        "income": float,
-        "credit_score": int,
-        "term_months": int,
-        "debt_ratio": float,
-        "credit_factor": float,
-        "term_factor": float,
-        "risk_score": float
-    }
+    Log calculation details for a loan application to the audit log.
     """
     try:
-        mongo_db = get_mongo_db()
-        
-        calculation_log = {
-            "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
-            "loan_id": payload.get("loan_id"),
-            "amount": payload.get("amount"),
-            "income": payload.get("income"),
-            "credit_score": payload.get("credit_score"),
-            "term_months": payload.get("term_months"),
-            "debt_ratio": payload.get("debt_ratio"),
-            "credit_factor": payload.get("credit_factor"),
-            "term_factor": payload.get("term_factor"),
-            "risk_score": payload.get("risk_score"),
-            "timestamp": datetime.utcnow(),
-            "action": "loan_calculation"
-        }
-        
-        result = mongo_db.calculations.insert_one(calculation_log)
+        calculation_log = _calculation_doc(user, payload, datetime.utcnow())
+        log_id = await record(CALCULATIONS, calculation_log)
         
         return {
             "success": True,
-            "log_id": str(result.inserted_id),
+            "log_id": log_id,
             "message": "Calculation logged successfully"
         }
     except Exception as e:
@@ -67,39 +85,47 @@ def log_calculation(
         )
 
 
-@router.post("/activity")
-def log_activity(
-    payload: dict,
-    db: Session = Depends(get_db),
+@router.post("/calculations/batch")
+async def log_calculations_batch(
+    payload: Annotated[list[CalculationEvent], Field(min_length=1, max_length=MAX_LOG_BATCH)],
     user=Depends(get_current_user),
 ):
     """
-    Log user activity (login, logout, apply, etc.) to MongoDB.
-    
-    Expected payload:
-    {
-        "action": "login" | "logout" | "apply_loan" | "approve_loan" | "reject_loan",
-        "details": {} (optional additional details)
-    }
+    Log up to MAX_LOG_BATCH calculation events in one request and one backend write.
     """
     try:
-        mongo_db = get_mongo_db()
+        now = datetime.utcnow()
+        docs = [_calculation_doc(user, event, now) for event in payload]
+        log_ids = await record_many(CALCULATIONS, docs)
         
-        activity_log = {
-            "user_id": user.id,
-            "email": user.email,
-            "full_name": user.full_name,
-            "role": user.role,
-            "action": payload.get("action"),
-            "details": payload.get("details", {}),
-            "timestamp": datetime.utcnow(),
+        return {
+            "success": True,
+            "count": len(log_ids),
+            "log_ids": log_ids,
+            "message": "Calculations logged successfully"
         }
-        
-        result = mongo_db.activities.insert_one(activity_log)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to log calculations: {str(e)}"
+        )
+
+
+@router.post("/activity")
+async def log_activity(
+    payload: ActivityEvent,
+    user=Depends(get_current_user),
+):
+    """
+    Log user activity (login, logout, apply, etc.) to the audit log.
+    """
+    try:
+        activity_log = _activity_doc(user, payload, datetime.utcnow())
+        log_id = await record_activity(activity_log, role=user.role, rollup=False)
         
         return {
             "success": True,
-            "log_id": str(result.inserted_id),
+            "log_id": log_id,
             "message": "Activity logged successfully"
         }
     except Exception as e:
@@ -109,33 +135,60 @@ def log_activity(
         )
 
 
-@router.get("/user/activities")
-def get_user_activities(
-    db: Session = Depends(get_db),
+@router.post("/activities/batch")
+async def log_activities_batch(
+    payload: Annotated[list[ActivityEvent], Field(min_length=1, max_length=MAX_LOG_BATCH)],
     user=Depends(get_current_user),
 ):
     """
-    Retrieve all activities for the current user from MongoDB.
+    Log up to MAX_LOG_BATCH UI/activity events in one request and one backend write.
+    Events share a timestamp; their _ids (assigned in order) keep them ordered.
     """
     try:
-        mongo_db = get_mongo_db()
+        now = datetime.utcnow()
+        docs = [_activity_doc(user, event, now) for event in payload]
+        log_ids = await record_activities(docs, role=user.role, rollup=False)
         
-        activities = list(
-            mongo_db.activities.find(
-                {"user_id": user.id}
-            ).sort("timestamp", -1).limit(100)
+        return {
+            "success": True,
+            "count": len(log_ids),
+            "log_ids": log_ids,
+            "message": "Activities logged successfully"
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to log activities: {str(e)}"
+        )
+
+
+@router.get("/user/activities")
+async def get_user_activities(
+    user=Depends(get_current_user),
+    before: Optional[str] = Query(default=None, description="Cursor: pass next_cursor from the previous page"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: tuple[str, ...] = Depends(sparse_fields(ACTIVITY_OUT_FIELDS)),
+):
+    """
+    Retrieve the current user's activities from the audit log, newest first.
+    Page further back with `before=<next_cursor>`.
+    When compaction is on, events older than AUDIT_COMPACT_AFTER_DAYS have moved
+    to the archive and are not returned here.
+    """
+    try:
+        identity = {"email": user.email, "full_name": user.full_name, "role": user.role}
+        activities, next_cursor = await _fetch_page(
+            ACTIVITIES, user.id, before, limit, fields, identity
         )
-        
-        # Convert ObjectId to string for JSON serialization
-        for activity in activities:
-            activity["_id"] = str(activity["_id"])
-            activity["timestamp"] = activity["timestamp"].isoformat()
         
         return {
             "success": True,
             "count": len(activities),
-            "activities": activities
+            "activities": activities,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -144,34 +197,69 @@ def get_user_activities(
 
 
 @router.get("/user/calculations")
-def get_user_calculations(
-    db: Session = Depends(get_db),
+async def get_user_calculations(
     user=Depends(get_current_user),
+    before: Optional[str] = Query(default=None, description="Cursor: pass next_cursor from the previous page"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: tuple[str, ...] = Depends(sparse_fields(CALCULATION_OUT_FIELDS)),
 ):
     """
-    Retrieve all calculation logs for the current user from MongoDB.
+    Retrieve the current user's calculation logs from the audit log, newest first.
+    Page further back with `before=<next_cursor>`.
+    When compaction is on, events older than AUDIT_COMPACT_AFTER_DAYS have moved
+    to the archive and are not returned here.
     """
     try:
-        mongo_db = get_mongo_db()
-        
-        calculations = list(
-            mongo_db.calculations.find(
-                {"user_id": user.id}
-            ).sort("timestamp", -1).limit(100)
+        identity = {"email": user.email, "full_name": user.full_name}
+        calculations, next_cursor = await _fetch_page(
+            CALCULATIONS, user.id, before, limit, fields, identity
         )
         
-        # Convert ObjectId to string for JSON serialization
-        for calc in calculations:
-            calc["_id"] = str(calc["_id"])
-            calc["timestamp"] = calc["timestamp"].isoformat()
-        
         return {
             "success": True,
             "count": len(calculations),
-            "calculations": calculations
+            "calculations": calculations,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve calculations: {str(e)}"
         )
+
+
+@router.get("/stats")
+async def get_activity_stats(
+    admin=Depends(require_admin),
+    granularity: Literal["hour", "day"] = Query(default="day"),
+    since: Optional[datetime] = Query(default=None, description="UTC, inclusive; defaults to 7 days ago"),
+    until: Optional[datetime] = Query(default=None, description="UTC, exclusive; defaults to now"),
+    action: Optional[str] = Query(default=None, description="e.g. login, apply_loan, loan_decision"),
+    role: Optional[str] = Query(default=None, description="USER or ADMIN"),
+):
+    """
+    Admin-only: activity counts per hour/day, action and role, served from the
+    pre-aggregated rollups (cost depends on the range, not on raw log volume).
+    """
+    # Events are stored with naive UTC timestamps
+    until = sla.naive_utc(until) if until else datetime.utcnow()
+    since = sla.naive_utc(since) if since else until - timedelta(days=7)
+    try:
+        buckets = await audit.activity_stats(granularity, since, until, action=action, role=role)
+        for b in buckets:
+            b["bucket"] = b["bucket"].isoformat()
+        
+        return {
+            "success": True,
+            "granularity": granularity,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "buckets": buckets
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve stats: {str(e)}"
+        )
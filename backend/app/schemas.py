@@ -1,5 +1,6 @@
 
 # app/schemas.py
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from pydantic import model_validator
@@ -39,6 +40,14 @@ class UserOut(BaseModel):
     role: Role
     model_config = ConfigDict(from_attributes=True)
 
+class LoginThrottleOut(BaseModel):
+    enabled: bool
+    allowed: int
+    throttled_ip: int
+    throttled_email: int
+    tracked_ips: int
+    tracked_emails: int
+
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -63,6 +72,9 @@ class LoanOut(BaseModel):
     term_months: int
     status: LoanStatus
     risk_score: float
+    created_at: Optional[datetime] = None
+    decided_at: Optional[datetime] = None
+    risk_percentile: Optional[float] = None  # share of stored loans with a lower risk score (0-100)
     model_config = ConfigDict(from_attributes=True)
 
 class LoanOutWithUser(BaseModel):
@@ -76,7 +88,159 @@ class LoanOutWithUser(BaseModel):
     term_months: int
     status: LoanStatus
     risk_score: float
+    created_at: Optional[datetime] = None
+    decided_at: Optional[datetime] = None
+    risk_percentile: Optional[float] = None  # share of stored loans with a lower risk score (0-100)
+    model_config = ConfigDict(from_attributes=True)
+
+class ExposureOut(BaseModel):
+    pending_count: int
+    pending_total: float
+    approved_total: float
+    max_pending_loans: Optional[int] = None
+    max_pending_amount: Optional[float] = None
+
+class ScheduleRow(BaseModel):
+    month: int
+    payment: float
+    principal: float
+    interest: float
+    balance: float
+
+class ScheduleOut(BaseModel):
+    loan_id: int
+    amount: float
+    annual_rate: float
+    term_months: int
+    monthly_payment: float
+    total_payment: float
+    total_interest: float
+    payment_to_income: float
+    schedule: list[ScheduleRow]
+
+class PortfolioLoanOut(BaseModel):
+    loan_id: int
+    monthly_payment: float
+    total_interest: float
+    payment_to_income: float
+
+class PortfolioScheduleOut(BaseModel):
+    annual_rate: float
+    loan_count: int
+    principal: float
+    monthly_payment: float
+    total_interest: float
+    max_payment_to_income: Optional[float] = None
+    loans: list[PortfolioLoanOut]
+    cash_flow: list[ScheduleRow]
+
+MAX_STRESS_SCENARIOS = 100
+
+class StressScenario(BaseModel):
+    name: str = Field(min_length=1, max_length=64)
+    credit_score_shift: int = Field(default=0, ge=-550, le=550, description="Points added to every credit score")
+    income_change: float = Field(default=0.0, ge=-0.99, le=10, description="Fractional income change, e.g. -0.1")
+
+class StressTestRequest(BaseModel):
+    scenarios: list[StressScenario] = Field(min_length=1, max_length=MAX_STRESS_SCENARIOS)
+    loss_given_default: Optional[float] = Field(default=None, ge=0, le=1)
+    status: LoanStatus = LoanStatus.APPROVED
+
+class StressResultOut(BaseModel):
+    name: str
+    credit_score_shift: int
+    income_change: float
+    mean_pd: float
+    expected_loss: float
+    loss_std: float
+    loss_p95: float
+    loss_p99: float
+    would_reject: int
+    pd_histogram: list[int]
+
+class StressTestOut(BaseModel):
+    status: LoanStatus
+    loan_count: int
+    exposure: float
+    loss_given_default: float
+    results: list[StressResultOut]
+
+class ThresholdPointOut(BaseModel):
+    threshold: float
+    approval_count: int
+    approval_rate: float
+    approved_amount: float
+    mean_risk: Optional[float] = None
+
+class ThresholdSimulationOut(BaseModel):
+    loan_count: int
+    current_threshold: float
+    points: list[ThresholdPointOut]
+
+class RiskBinOut(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+class RiskDistributionOut(BaseModel):
+    loan_count: int
+    quantiles: dict[str, Optional[float]]
+    bins: list[RiskBinOut]
+
+class QueueTimeOut(BaseModel):
+    count: int
+    mean_hours: Optional[float] = None
+    p50_hours: Optional[float] = None
+    p90_hours: Optional[float] = None
+    p95_hours: Optional[float] = None
+    p99_hours: Optional[float] = None
+    max_hours: Optional[float] = None
+
+class DailyThroughputOut(BaseModel):
+    day: str
+    applied: int = 0
+    approved: int = 0
+    rejected: int = 0
+
+class SlaOut(BaseModel):
+    since: datetime
+    until: datetime
+    queue_time: QueueTimeOut  # created -> decided, for loans decided in the window
+    pending_age: QueueTimeOut  # loans pending now, by age
+    throughput: list[DailyThroughputOut]
+    missing_timestamps: int  # loans without created_at (not backfilled)
+
+class StatusHistoryOut(BaseModel):
+    status: LoanStatus
+    valid_from: datetime
+    valid_to: Optional[datetime] = None  # None = current status
+    changed_by: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
+class LoansAtOut(BaseModel):
+    at: datetime
+    status: LoanStatus
+    count: int
+    loan_ids: list[int]
+
 class DecisionRequest(BaseModel):
     action: str | None = Field(default=None, description="APPROVED or REJECTED")
+
+# ----- Audit logs -----
+MAX_LOG_BATCH = 200
+
+class CalculationEvent(BaseModel):
+    loan_id: Optional[int] = None
+    amount: float
+    income: float
+    credit_score: int
+    term_months: int
+    debt_ratio: float
+    credit_factor: float
+    term_factor: float
+    risk_score: float
+    payment_to_income: Optional[float] = None
+
+class ActivityEvent(BaseModel):
+    action: str = Field(min_length=1, max_length=64, description="login, logout, apply_loan, ...")
+    details: dict = Field(default_factory=dict)
@@ -0,0 +1,128 @@
+
+# app/server.py
+"""
+Supported production entry point: `python -m app.server`
+
+- Imports (preloads) the app once in the parent process.
+- Binds the listening socket once, then forks WEB_CONCURRENCY workers that share it.
+- Each worker rebuilds its DB/Mongo pools after fork (see database.py / mongo.py)
+  and sizes them from DB_POOL_SIZE / MONGODB_MAX_POOL_SIZE.
+- SIGTERM/SIGINT is forwarded to the workers; uvicorn stops accepting, waits up to
+  GRACEFUL_SHUTDOWN_TIMEOUT for in-flight requests (and their audit writes), then
+  runs the lifespan shutdown which closes the pools.
+
+On platforms without os.fork (Windows) it falls back to a single uvicorn process.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from . import migrations
+from .config import settings
+from .database import Base, engine
+from .main import app
+from .services import response_cache
+
+logger = logging.getLogger("loan-app.server")
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _uvicorn_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        log_level="debug" if settings.DEBUG else "info",
+    )
+
+
+def _run_worker(sock: socket.socket) -> None:
+    # Let uvicorn install its own graceful SIGINT/SIGTERM handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    uvicorn.Server(_uvicorn_config()).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock)
+        except Exception:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(workers: int = settings.WEB_CONCURRENCY, host: str = settings.HOST, port: int = settings.PORT) -> None:
+    if workers > 1 and settings.AUDIT_BACKEND == "segment":
+        # The segment store has a single writer (flock'd); forked workers would contend for it
+        raise SystemExit("AUDIT_BACKEND=segment supports a single worker; set WEB_CONCURRENCY=1")
+    if workers <= 1 or not hasattr(os, "fork"):
+        config = _uvicorn_config()
+        config.host, config.port = host, port
+        uvicorn.Server(config).run()
+        return
+
+    # Create and upgrade tables once in the parent so workers don't race on DDL,
+    # then drop the parent's connections before forking.
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    response_cache.ensure_version_rows(engine)
+    engine.dispose()
+
+    sock = _bind_socket(host, port)
+    children: set[int] = set()
+    stopping = False
+
+    def _shutdown(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    for _ in range(workers):
+        children.add(_spawn(sock))
+    logger.info(f"Started {workers} workers on http://{host}:{port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            # Replace workers that died unexpectedly (back off to avoid a crash loop)
+            logger.warning(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)
+            children.add(_spawn(sock))
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,143 @@
+
+# app/services/amortization.py
+"""
+Amortization schedules and payment burden for fixed-rate, level-payment loans.
+
+Everything is closed form over numpy arrays, with no per-month Python loop.
+For a monthly rate r, payment p and principal P, the balance after month k is
+
+    B_k = P (1+r)^k - p ((1+r)^k - 1) / r
+
+A schedule is also linear in the principal. A portfolio's combined cash flow
+is therefore the sum, over distinct terms, of (principal with that term) x
+(the unit schedule for that term), which is at most 360 unit schedules
+whatever the number of loans.
+
+Schedules are cached per (amount, annual_rate, term_months) in an LRU of
+AMORTIZATION_CACHE_SIZE entries. The cached arrays are read-only.
+
+Loans don't carry a rate. ANNUAL_INTEREST_RATE is used unless the caller
+passes one.
+"""
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ..config import settings
+
+MAX_TERM_MONTHS = 360
+
+
+class Schedule(NamedTuple):
+    amount: float
+    annual_rate: float
+    term_months: int
+    monthly_payment: float
+    # One entry per month (1..term_months)
+    payment: np.ndarray
+    principal: np.ndarray
+    interest: np.ndarray
+    balance: np.ndarray
+
+    @property
+    def total_payment(self) -> float:
+        return self.monthly_payment * self.term_months
+
+    @property
+    def total_interest(self) -> float:
+        return self.total_payment - self.amount
+
+
+def resolve_rate(rate: Optional[float] = None) -> float:
+    return settings.ANNUAL_INTEREST_RATE if rate is None else rate
+
+
+def monthly_payments(amounts, annual_rate: float, terms) -> np.ndarray:
+    """
+    Level monthly payment for each (amount, term), vectorized.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    terms = np.asarray(terms, dtype=np.float64)
+    r = annual_rate / 12
+    if r == 0:
+        return amounts / terms
+    return amounts * r / -np.expm1(-terms * np.log1p(r))
+
+
+def monthly_payment(amount: float, annual_rate: float, term_months: int) -> float:
+    return float(monthly_payments(amount, annual_rate, term_months))
+
+
+def payment_to_income(amounts, incomes, annual_rate: float, terms) -> np.ndarray:
+    """
+    Monthly payment / monthly income (income is annual), vectorized.
+    """
+    monthly_income = np.maximum(np.asarray(incomes, dtype=np.float64), 1.0) / 12
+    return monthly_payments(amounts, annual_rate, terms) / monthly_income
+
+
+@lru_cache(maxsize=settings.AMORTIZATION_CACHE_SIZE)
+def _schedule(amount: float, annual_rate: float, term_months: int) -> Schedule:
+    r = annual_rate / 12
+    months = np.arange(1, term_months + 1, dtype=np.float64)
+    payment = monthly_payment(amount, annual_rate, term_months)
+    if r == 0:
+        balance = amount - payment * months
+    else:
+        growth = np.power(1 + r, months)
+        balance = amount * growth - payment * (growth - 1) / r
+    balance[-1] = 0.0  # absorb float drift in the last payment
+    opening = np.concatenate(([amount], balance[:-1]))
+    interest = opening * r
+    principal = opening - balance
+    payments = interest + principal
+    for a in (payments, principal, interest, balance):
+        a.setflags(write=False)
+    return Schedule(amount, annual_rate, term_months, payment, payments, principal, interest, balance)
+
+
+def schedule(amount: float, annual_rate: float, term_months: int) -> Schedule:
+    if not 1 <= term_months <= MAX_TERM_MONTHS:
+        raise ValueError(f"term_months must be 1-{MAX_TERM_MONTHS}")
+    return _schedule(float(amount), float(annual_rate), int(term_months))
+
+
+def cache_info():
+    return _schedule.cache_info()
+
+
+def clear_cache() -> None:
+    _schedule.cache_clear()
+
+
+class Portfolio(NamedTuple):
+    annual_rate: float
+    monthly_payment: np.ndarray  # per loan, in input order
+    total_interest: np.ndarray
+    payment_to_income: np.ndarray
+    # Combined cash flow, month 1..longest term
+    payment: np.ndarray
+    principal: np.ndarray
+    interest: np.ndarray
+    balance: np.ndarray
+
+
+def portfolio(amounts: Sequence[float], incomes: Sequence[float], terms: Sequence[int], annual_rate: float) -> Portfolio:
+    """
+    Per-loan payment figures plus the portfolio's combined monthly cash flow.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    terms = np.asarray(terms, dtype=np.int64)
+    payments = monthly_payments(amounts, annual_rate, terms)
+    total_interest = payments * terms - amounts
+    pti = payment_to_income(amounts, incomes, annual_rate, terms)
+
+    horizon = int(terms.max()) if len(terms) else 0
+    flows = np.zeros((4, horizon))
+    distinct, inverse = np.unique(terms, return_inverse=True)
+    principal_by_term = np.bincount(inverse, weights=amounts, minlength=len(distinct))
+    for term, principal in zip(distinct.tolist(), principal_by_term.tolist()):
+        unit = schedule(1.0, annual_rate, term)
+        flows[:, :term] += principal * np.stack((unit.payment, unit.principal, unit.interest, unit.balance))
+    return Portfolio(annual_rate, payments, total_interest, pti, *flows)
@@ -0,0 +1,129 @@
+
+# app/services/application_guard.py
+"""
+Duplicate and velocity detection for apply_loan, in memory and O(1) per
+application (no loan_applications query).
+
+- Duplicates: a hash of (user_id, amount, income, credit_score, term_months)
+  seen within DUPLICATE_WINDOW_SECONDS.
+- Velocity: more than VELOCITY_MAX_APPLICATIONS from one user within
+  VELOCITY_WINDOW_SECONDS.
+
+APPLICATION_GUARD_MODE selects "reject" (409 / 429), "flag" (accept and mark
+the apply_loan audit event) or "off". Memory is bounded: GUARD_MAX_KEYS
+hashes and as many users, oldest evicted first. State is per worker process.
+"""
+import hashlib
+import time
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional
+
+from ..config import settings
+
+DUPLICATE = "duplicate"
+VELOCITY = "velocity"
+
+
+class Admission(NamedTuple):
+    user_id: int
+    digest: bytes
+    flags: tuple[str, ...]
+    retry_after: Optional[int]  # seconds until the request would pass
+    recorded: bool
+    previous_seen: Optional[float]
+    admitted_at: float  # what admit() recorded, so release() can find this entry
+
+
+def fingerprint(user_id: int, amount: float, income: float, credit_score: int, term_months: int) -> bytes:
+    key = f"{user_id}|{float(amount)!r}|{float(income)!r}|{credit_score}|{term_months}"
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class ApplicationGuard:
+    def __init__(self, duplicate_window: float, velocity_window: float, velocity_max: int, max_keys: int):
+        self.duplicate_window = duplicate_window
+        self.velocity_window = velocity_window
+        self.velocity_max = velocity_max
+        self.max_keys = max_keys
+        # digest -> last seen; insertion order is time order, so expired entries are at the front
+        self._recent: OrderedDict[bytes, float] = OrderedDict()
+        # user_id -> timestamps of their recent applications (at most velocity_max kept)
+        self._users: OrderedDict[int, deque[float]] = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        while self._recent:
+            digest, seen = next(iter(self._recent.items()))
+            if seen > now - self.duplicate_window and len(self._recent) <= self.max_keys:
+                break
+            del self._recent[digest]
+        while len(self._users) > self.max_keys:
+            self._users.popitem(last=False)
+
+    def admit(self, user_id: int, digest: bytes, reject: bool) -> Admission:
+        """
+        Check an application. It is counted unless it is flagged and `reject`
+        is set, so a rejected retry storm doesn't extend the window. Call
+        release() if a counted application isn't created after all.
+        """
+        now = time.monotonic()
+        self._evict(now)
+        flags, retry_after = [], 0.0
+
+        seen = self._recent.get(digest)
+        if seen is not None:
+            flags.append(DUPLICATE)
+            retry_after = seen + self.duplicate_window - now
+
+        times = self._users.get(user_id)
+        if times is not None:
+            while times and times[0] <= now - self.velocity_window:
+                times.popleft()
+            if self.velocity_max and len(times) >= self.velocity_max:
+                flags.append(VELOCITY)
+                retry_after = max(retry_after, times[0] + self.velocity_window - now)
+
+        record = not (flags and reject)
+        if record:
+            self._recent[digest] = now
+            self._recent.move_to_end(digest)
+            if self.velocity_max:
+                if times is None:
+                    times = self._users[user_id] = deque(maxlen=self.velocity_max)
+                self._users.move_to_end(user_id)
+                times.append(now)
+            self._evict(now)
+        return Admission(
+            user_id, digest, tuple(flags), int(retry_after) + 1 if flags else None, record, seen, now
+        )
+
+    def release(self, admission: Admission) -> None:
+        """
+        Undo a counted admit() for an application that wasn't created. Only
+        this admission's entries are removed: other requests from the same
+        user may have been admitted since.
+        """
+        if not admission.recorded:
+            return
+        if self._recent.get(admission.digest) == admission.admitted_at:
+            if admission.previous_seen is None:
+                del self._recent[admission.digest]
+            else:
+                self._recent[admission.digest] = admission.previous_seen
+        times = self._users.get(admission.user_id)
+        if times is not None:
+            try:
+                times.remove(admission.admitted_at)
+            except ValueError:
+                pass  # already expired out of the window
+
+    def clear(self) -> None:
+        self._recent.clear()
+        self._users.clear()
+
+
+guard = ApplicationGuard(
+    settings.DUPLICATE_WINDOW_SECONDS,
+    settings.VELOCITY_WINDOW_SECONDS,
+    settings.VELOCITY_MAX_APPLICATIONS,
+    settings.GUARD_MAX_KEYS,
+)
@@ -0,0 +1,257 @@
+
+# app/services/audit.py
+"""
+Audit log storage behind a pluggable sink (AUDIT_BACKEND in Settings):
+
+- "mongo"   (default) MongoDB collections via app/mongo.py
+- "sqlite"  a local SQLite file (services/audit_sqlite.py)
+- "segment" local append-only segment files (services/segment_store.py)
+
+Every write path (auth, loans, risk logs, /logs POSTs) and the /logs reads go
+through the helpers at the bottom of this module, never to a backend directly.
+
+Events are stored compactly: only `user_id`, no email/full_name/role copies.
+The role is passed in separately for the rollups.
+"""
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+from ..config import settings
+from .. import mongo
+from . import rollups
+from .rollups import RollupCounts
+
+# Streams (collections) the app writes to
+ACTIVITIES = "activities"
+CALCULATIONS = "calculations"
+RISK_LOGS = "risk_logs"
+USERS = "users"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class AuditSink(ABC):
+    """
+    Storage backend for audit events and activity rollups.
+
+    Every event carries `user_id` and a naive-UTC `timestamp`; sinks assign
+    `_id` and return ids as strings. User timelines are read newest first
+    with (timestamp, _id) keyset pagination.
+    """
+
+    @abstractmethod
+    async def insert(self, stream: str, docs: list[dict]) -> list[str]:
+        ...
+
+    @abstractmethod
+    async def user_events(
+        self,
+        stream: str,
+        user_id: int,
+        before: Optional[tuple[datetime, str]],
+        limit: int,
+        fields: Iterable[str],
+    ) -> list[dict]:
+        """
+        Up to `limit` events strictly older than `before`, newest first, with
+        only `fields` (plus _id and timestamp). Raises InvalidCursor for an id
+        this sink could not have issued.
+        """
+
+    @abstractmethod
+    async def bump_rollups(self, counts: RollupCounts) -> None:
+        ...
+
+    @abstractmethod
+    async def read_rollups(
+        self, granularity: str, since: datetime, until: datetime,
+        action: Optional[str] = None, role: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Rollup rows {bucket, action, role, count} for buckets in [since, until),
+        ordered by bucket, action, role.
+        """
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MongoAuditSink(AuditSink):
+    async def insert(self, stream, docs):
+        collection = mongo.get_mongo_db()[stream]
+        if len(docs) == 1:
+            result = await collection.insert_one(docs[0])
+            return [str(result.inserted_id)]
+        result = await collection.insert_many(docs, ordered=False)
+        return [str(i) for i in result.inserted_ids]
+
+    async def user_events(self, stream, user_id, before, limit, fields):
+        query = {"user_id": user_id}
+        if before:
+            ts, raw_id = before
+            try:
+                oid = ObjectId(raw_id)
+            except InvalidId:
+                raise InvalidCursor(raw_id)
+            query["$or"] = [
+                {"timestamp": {"$lt": ts}},
+                {"timestamp": ts, "_id": {"$lt": oid}},
+            ]
+        projection = {f: 1 for f in fields}
+        projection["timestamp"] = 1
+        # Newest first; matches the (user_id, timestamp, _id) index from mongo.ensure_indexes
+        cursor = mongo.get_mongo_db()[stream].find(query, projection).sort(
+            [("timestamp", DESCENDING), ("_id", DESCENDING)]
+        ).limit(limit)
+        docs = await cursor.to_list(limit)
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+        return docs
+
+    async def bump_rollups(self, counts):
+        collection = mongo.get_mongo_db().activity_rollups
+        for (granularity, bucket, action, role), n in counts.items():
+            await collection.update_one(
+                {"granularity": granularity, "bucket": bucket, "action": action, "role": role},
+                {"$inc": {"count": n}},
+                upsert=True,
+            )
+
+    async def read_rollups(self, granularity, since, until, action=None, role=None):
+        query = {"granularity": granularity, "bucket": {"$gte": since, "$lt": until}}
+        if action:
+            query["action"] = action
+        if role:
+            query["role"] = role
+        cursor = mongo.get_mongo_db().activity_rollups.find(
+            query, {"_id": 0, "bucket": 1, "action": 1, "role": 1, "count": 1}
+        ).sort([("bucket", ASCENDING), ("action", ASCENDING), ("role", ASCENDING)])
+        return await cursor.to_list(None)
+
+    async def ensure_indexes(self):
+        await mongo.ensure_indexes()
+
+
+_sink: Optional[AuditSink] = None
+
+
+def _make_sink() -> AuditSink:
+    backend = settings.AUDIT_BACKEND
+    if backend == "mongo":
+        return MongoAuditSink()
+    if backend == "sqlite":
+        from .audit_sqlite import SQLiteAuditSink
+        return SQLiteAuditSink(settings.AUDIT_SQLITE_PATH)
+    if backend == "segment":
+        from .segment_store import SegmentAuditSink
+        return SegmentAuditSink(settings.AUDIT_SEGMENT_DIR, settings.AUDIT_SEGMENT_MAX_BYTES)
+    raise ValueError(f"Unknown AUDIT_BACKEND: {backend!r}")
+
+
+def get_sink() -> AuditSink:
+    global _sink
+    if _sink is None:
+        _sink = _make_sink()
+    return _sink
+
+
+async def close_sink() -> None:
+    global _sink
+    if _sink is not None:
+        await _sink.close()
+    _sink = None
+
+
+def _forget_sink_after_fork():
+    # Open files, threads and locks belong to the parent
+    global _sink
+    _sink = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_sink_after_fork)
+
+
+# ----- Write helpers -----
+
+async def record(stream: str, doc: dict) -> str:
+    return (await get_sink().insert(stream, [doc]))[0]
+
+
+async def record_many(stream: str, docs: list[dict]) -> list[str]:
+    return await get_sink().insert(stream, docs)
+
+
+def _role(doc: dict, role: Optional[str]) -> str:
+    return role or doc.get("role") or "UNKNOWN"
+
+
+async def record_activity(doc: dict, role: Optional[str] = None, rollup: bool = True) -> str:
+    """
+    Insert one activity document. `role` is the actor's role for the rollups
+    (decisions are stored against the applicant but made by an admin);
+    legacy documents that still carry "role" fall back to it.
+    Pass rollup=False for client-posted events: their action names are free
+    text, so counting them would let any user inflate /logs/stats.
+    """
+    log_id = await record(ACTIVITIES, doc)
+    if rollup:
+        await get_sink().bump_rollups(rollups.fold([(doc["action"], _role(doc, role), doc["timestamp"])]))
+    return log_id
+
+
+async def record_activities(docs: list[dict], role: Optional[str] = None, rollup: bool = True) -> list[str]:
+    """
+    Insert a batch of activity documents with one backend write.
+    """
+    log_ids = await record_many(ACTIVITIES, docs)
+    if rollup:
+        await get_sink().bump_rollups(
+            rollups.fold((doc["action"], _role(doc, role), doc["timestamp"]) for doc in docs)
+        )
+    return log_ids
+
+
+# ----- Read helpers -----
+
+def encode_cursor(doc: dict) -> str:
+    return f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        ts, raw_id = cursor.split("|", 1)
+        return datetime.fromisoformat(ts), raw_id
+    except ValueError:
+        raise InvalidCursor(cursor)
+
+
+async def user_timeline(
+    stream: str, user_id: int, before: Optional[str], limit: int, fields: Iterable[str]
+) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of a user's events, newest first, and the cursor for the next page.
+    """
+    docs = await get_sink().user_events(
+        stream, user_id, decode_cursor(before) if before else None, limit, fields
+    )
+    next_cursor = encode_cursor(docs[-1]) if len(docs) == limit else None
+    return docs, next_cursor
+
+
+async def activity_stats(
+    granularity: str, since: datetime, until: datetime,
+    action: Optional[str] = None, role: Optional[str] = None,
+) -> list[dict]:
+    return await get_sink().read_rollups(granularity, since, until, action=action, role=role)
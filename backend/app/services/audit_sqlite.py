@@ -0,0 +1,145 @@
+
+# app/services/audit_sqlite.py
+"""
+SQLite audit sink: one local file, no server needed.
+
+Events are stored as BSON blobs next to the indexed (stream, user_id, ts, id)
+columns used for timeline reads; rollups live in a WITHOUT ROWID table and are
+bumped with INSERT ... ON CONFLICT DO UPDATE. Timestamps are kept at
+millisecond precision, same as Mongo, so cursors round-trip exactly.
+
+All requests share one connection, so writes take a lock: otherwise one
+request's commit could land in the middle of another's batch.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+import aiosqlite
+import bson
+
+from .audit import AuditSink, InvalidCursor
+
+EPOCH = datetime(1970, 1, 1)
+MS = timedelta(milliseconds=1)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stream TEXT NOT NULL,
+    user_id INTEGER,
+    ts INTEGER NOT NULL,
+    doc BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_audit_events_user_timeline
+    ON audit_events (stream, user_id, ts DESC, id DESC);
+CREATE TABLE IF NOT EXISTS activity_rollups (
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    role TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, action, role)
+) WITHOUT ROWID;
+"""
+
+
+def _to_ms(ts: datetime) -> int:
+    return (ts - EPOCH) // MS
+
+
+def _from_ms(ms: int) -> datetime:
+    return EPOCH + ms * MS
+
+
+class SQLiteAuditSink(AuditSink):
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._connecting = asyncio.Lock()
+        self._writing = asyncio.Lock()
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._connecting:
+                if self._db is None:
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA synchronous=NORMAL")
+                    await db.executescript(SCHEMA)
+                    self._db = db
+        return self._db
+
+    async def insert(self, stream, docs):
+        db = await self._conn()
+        ids = []
+        async with self._writing:
+            for doc in docs:
+                doc["timestamp"] = _from_ms(_to_ms(doc["timestamp"]))
+                body = {k: v for k, v in doc.items() if k != "_id"}
+                cur = await db.execute(
+                    "INSERT INTO audit_events (stream, user_id, ts, doc) VALUES (?, ?, ?, ?)",
+                    (stream, doc.get("user_id"), _to_ms(doc["timestamp"]), bson.encode(body)),
+                )
+                doc["_id"] = str(cur.lastrowid)
+                ids.append(doc["_id"])
+            await db.commit()
+        return ids
+
+    async def user_events(self, stream, user_id, before, limit, fields):
+        db = await self._conn()
+        sql = "SELECT id, doc FROM audit_events WHERE stream = ? AND user_id = ?"
+        params: list = [stream, user_id]
+        if before:
+            ts, raw_id = before
+            try:
+                params += [_to_ms(ts), int(raw_id)]
+            except ValueError:
+                raise InvalidCursor(raw_id)
+            sql += " AND (ts, id) < (?, ?)"
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        keep = set(fields) | {"timestamp"}
+        docs = []
+        async with db.execute(sql, params) as cur:
+            async for row_id, blob in cur:
+                doc = {k: v for k, v in bson.decode(blob).items() if k in keep}
+                doc["_id"] = str(row_id)
+                docs.append(doc)
+        return docs
+
+    async def bump_rollups(self, counts):
+        db = await self._conn()
+        async with self._writing:
+            await db.executemany(
+                "INSERT INTO activity_rollups (granularity, bucket, action, role, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (granularity, bucket, action, role) DO UPDATE SET count = count + excluded.count",
+                [(g, _to_ms(bucket), action, role, n) for (g, bucket, action, role), n in counts.items()],
+            )
+            await db.commit()
+
+    async def read_rollups(self, granularity, since, until, action=None, role=None):
+        db = await self._conn()
+        sql = "SELECT bucket, action, role, count FROM activity_rollups WHERE granularity = ? AND bucket >= ? AND bucket < ?"
+        params: list = [granularity, _to_ms(since), _to_ms(until)]
+        if action:
+            sql += " AND action = ?"
+            params.append(action)
+        if role:
+            sql += " AND role = ?"
+            params.append(role)
+        sql += " ORDER BY bucket, action, role"
+        async with db.execute(sql, params) as cur:
+            return [
+                {"bucket": _from_ms(bucket), "action": a, "role": r, "count": n}
+                async for bucket, a, r, n in cur
+            ]
+
+    async def ensure_indexes(self):
+        await self._conn()
+
+    async def close(self):
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
@@ -0,0 +1,141 @@
+
+# app/services/exposure.py
+"""
+Per-user exposure aggregate (user_exposure table): pending count, pending
+total and approved total, so limits are checked with one conditional UPDATE
+instead of summing the user's loans.
+
+Callers run these inside the loan write's transaction:
+- reserve() before inserting a PENDING loan (enforces the limits atomically)
+- settle() after a loan leaves PENDING
+
+A missing row (user who applied before the table existed) is rebuilt from
+loan_applications once.
+"""
+from typing import Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import LoanApplication, UserExposure
+
+
+class ExposureLimitExceeded(ValueError):
+    pass
+
+
+def limits() -> dict[str, Optional[float]]:
+    # 0 in settings = no limit
+    return {
+        "max_pending_loans": settings.MAX_PENDING_LOANS or None,
+        "max_pending_amount": settings.MAX_PENDING_AMOUNT or None,
+    }
+
+
+async def _totals_from_loans(db: AsyncSession, user_id: int) -> tuple[int, float, float]:
+    """
+    (pending_count, pending_total, approved_total) summed over the user's loans.
+    """
+    pending = LoanApplication.status == "PENDING"
+    return tuple((await db.execute(
+        select(
+            func.coalesce(func.sum(case((pending, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((pending, LoanApplication.amount), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((LoanApplication.status == "APPROVED", LoanApplication.amount), else_=0.0)), 0.0),
+        ).where(LoanApplication.user_id == user_id)
+    )).one())
+
+
+async def _create_from_loans(db: AsyncSession, user_id: int) -> bool:
+    """
+    Build the row from the user's loans; False if it already existed, True
+    if it exists now (created here or by a concurrent request).
+    """
+    if await db.get(UserExposure, user_id) is not None:
+        return False
+    pending_count, pending_total, approved_total = await _totals_from_loans(db, user_id)
+    try:
+        async with db.begin_nested():
+            db.add(UserExposure(
+                user_id=user_id,
+                pending_count=pending_count,
+                pending_total=pending_total,
+                approved_total=approved_total,
+            ))
+    except IntegrityError:
+        # A concurrent request created it first; it exists now all the same
+        pass
+    return True
+
+
+async def reserve(db: AsyncSession, user_id: int, amount: float) -> None:
+    """
+    Count a new PENDING loan against the user's limits, or raise ExposureLimitExceeded.
+    """
+    conditions = [UserExposure.user_id == user_id]
+    if settings.MAX_PENDING_LOANS:
+        conditions.append(UserExposure.pending_count < settings.MAX_PENDING_LOANS)
+    if settings.MAX_PENDING_AMOUNT:
+        conditions.append(UserExposure.pending_total + amount <= settings.MAX_PENDING_AMOUNT)
+    stmt = (
+        update(UserExposure)
+        .where(*conditions)
+        .values(
+            pending_count=UserExposure.pending_count + 1,
+            pending_total=UserExposure.pending_total + amount,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    for _ in range(2):
+        if (await db.execute(stmt)).rowcount:
+            return
+        if not await _create_from_loans(db, user_id):
+            # The row was there, so the UPDATE failed on the limits
+            break
+        # Row just created (here or by a concurrent request): apply the limits to it
+
+    exposure = await db.get(UserExposure, user_id)
+    raise ExposureLimitExceeded(
+        f"Exposure limit reached: {exposure.pending_count} pending application(s) "
+        f"totalling {exposure.pending_total:g} (limits: {settings.MAX_PENDING_LOANS or 'none'} pending, "
+        f"{settings.MAX_PENDING_AMOUNT or 'no'} amount cap)"
+    )
+
+
+async def settle(db: AsyncSession, user_id: int, amount: float, approved: bool) -> None:
+    """
+    Move a decided loan out of the pending figures; call after its status changed.
+    """
+    result = await db.execute(
+        update(UserExposure)
+        .where(UserExposure.user_id == user_id)
+        .values(
+            pending_count=UserExposure.pending_count - 1,
+            pending_total=UserExposure.pending_total - amount,
+            approved_total=UserExposure.approved_total + (amount if approved else 0.0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        # Rebuilt from loans, which already include this decision
+        await _create_from_loans(db, user_id)
+
+
+async def summary(db: AsyncSession, user_id: int) -> dict:
+    exposure = await db.get(UserExposure, user_id)
+    if exposure is None:
+        # Loans from before the table existed: sum them (read-only; the row is
+        # created on the user's next apply or decision)
+        pending_count, pending_total, approved_total = await _totals_from_loans(db, user_id)
+    else:
+        pending_count, pending_total, approved_total = (
+            exposure.pending_count, exposure.pending_total, exposure.approved_total
+        )
+    return {
+        "pending_count": pending_count,
+        "pending_total": pending_total,
+        "approved_total": approved_total,
+        **limits(),
+    }
@@ -0,0 +1,131 @@
+
+# app/services/group_commit.py
+"""
+Group commit: concurrent writes share one transaction and one commit.
+
+On SQLite every commit is an fsync and writers queue on a single lock, so
+committing each application separately caps throughput and, under bursts,
+ends in "database is locked". With GROUP_COMMIT_ENABLED, apply_loan hands
+its write to `coalescer` instead. The coalescer collects writes for up to
+GROUP_COMMIT_WINDOW_MS after the first one, or until GROUP_COMMIT_MAX_BATCH
+are queued, then runs them one after another in a single session and
+commits once.
+
+Each write runs in its own SAVEPOINT. A write that raises is rolled back
+alone, and only its caller gets the exception (e.g. the exposure limit's
+HTTPException). If the commit itself fails, every caller in the batch gets
+that error and nothing in the batch is stored. Callers get their own return
+value, e.g. the new loan with its id, once the commit is done.
+
+The coalescer is per worker process and runs on the app's event loop
+(started in the lifespan). With WEB_CONCURRENCY > 1 each worker batches its
+own requests.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+
+logger = logging.getLogger("loan-app")
+
+Write = Callable[[AsyncSession], Awaitable[Any]]  # called with the batch's session
+
+
+class _Pending(NamedTuple):
+    write: Write
+    future: asyncio.Future
+
+
+class WriteCoalescer:
+    def __init__(self, window_seconds: float, max_batch: int):
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch: list[_Pending] = []  # dequeued, not yet resolved
+        self.batches = 0
+        self.writes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def submit(self, write: Write) -> Any:
+        """
+        Run `write(session)` in the next batch; returns its result after the commit.
+        """
+        if self._queue is None:
+            raise RuntimeError("Write coalescer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Pending(write, future))
+        return await future
+
+    async def _collect(self) -> list[_Pending]:
+        batch = self._batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window_seconds
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _commit(self, batch: list[_Pending]) -> None:
+        results: list[tuple[asyncio.Future, Any]] = []
+        try:
+            async with AsyncSessionLocal() as db:
+                for item in batch:
+                    if item.future.cancelled():
+                        continue
+                    try:
+                        async with db.begin_nested():
+                            results.append((item.future, await item.write(db)))
+                    except Exception as e:
+                        item.future.set_exception(e)
+                if results:
+                    await db.commit()
+        except Exception as e:
+            logger.warning(f"Group commit of {len(results)} write(s) failed: {e}")
+            for future, _ in results:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(results)
+        # In submission order, so callers resume in commit order
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
+
+    async def run(self) -> None:
+        """
+        Batch submitted writes until cancelled (lifespan background task).
+        """
+        self._queue = asyncio.Queue()
+        try:
+            while True:
+                await self._commit(await self._collect())
+                self._batch = []
+        finally:
+            # Cancelled (shutdown): fail whatever is still waiting, including a
+            # batch interrupted mid-commit, so no request hangs
+            queue, self._queue = self._queue, None
+            stranded, self._batch = list(self._batch), []
+            while not queue.empty():
+                stranded.append(queue.get_nowait())
+            for pending in stranded:
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("Write coalescer stopped before the write completed"))
+
+
+coalescer = WriteCoalescer(settings.GROUP_COMMIT_WINDOW_MS / 1000, settings.GROUP_COMMIT_MAX_BATCH)
@@ -0,0 +1,160 @@
+
+# app/services/idempotency.py
+"""
+Idempotency-Key support for write endpoints (apply_loan, decide, auth).
+
+The first request with a given key runs the handler. Its response is kept
+(status code plus JSON bytes) for IDEMPOTENCY_TTL_SECONDS, and retries with
+the same key get that response back with `Idempotent-Replayed: true`.
+Duplicates that arrive while the first one is still running wait for it
+instead of running the handler again. Reusing a key for a different request
+body returns 422.
+
+Keys are scoped to the route and the authenticated user, if there is one.
+Responses with status >= 500, "try again later" answers (409 / 429, which
+carry Retry-After) and unhandled errors are not stored, so a retry runs
+again.
+
+The store is in memory and per process, bounded by IDEMPOTENCY_MAX_KEYS
+(oldest first). With WEB_CONCURRENCY > 1, retries are only deduplicated when
+they reach the same worker.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from ..config import settings
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Temporary refusals: the same request can succeed later, so they aren't final
+RETRYABLE_STATUSES = (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires", "done", "status_code", "body")
+
+    def __init__(self, fingerprint: bytes, expires: float):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.status_code: Optional[int] = None
+        self.body: Optional[bytes] = None
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float, max_keys: int):
+        self.ttl = ttl_seconds
+        self.max_keys = max_keys
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float) -> None:
+        # Insertion order is expiry order (fixed TTL), so expired keys are at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires > now and len(self._entries) <= self.max_keys:
+                break
+            del self._entries[key]
+
+    def claim(self, key: tuple, fingerprint: bytes) -> tuple[_Entry, bool]:
+        """
+        The entry for `key` and whether the caller owns it (must run the handler).
+        """
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry, False
+        entry = self._entries[key] = _Entry(fingerprint, now + self.ttl)
+        self._evict(now)
+        return entry, True
+
+    def complete(self, entry: _Entry, status_code: int, body: bytes) -> None:
+        entry.status_code, entry.body = status_code, body
+        entry.done.set_result(None)
+
+    def abandon(self, key: tuple, entry: _Entry) -> None:
+        """
+        Forget a failed attempt; waiters retry and one of them runs the handler.
+        """
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.done.set_result(None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+store = IdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS, settings.IDEMPOTENCY_MAX_KEYS)
+
+
+def _encode(result: Any, model: Optional[type[BaseModel]]) -> bytes:
+    if model is not None:
+        return model.model_validate(result).model_dump_json().encode()
+    return orjson.dumps(jsonable_encoder(result))
+
+
+def _response(entry: _Entry, replayed: bool) -> Response:
+    headers = {REPLAYED_HEADER: "true"} if replayed else None
+    return Response(entry.body, status_code=entry.status_code, media_type="application/json", headers=headers)
+
+
+async def idempotent(
+    request: Request,
+    idempotency_key: Optional[str],
+    run: Callable[[], Awaitable[Any]],
+    model: Optional[type[BaseModel]] = None,
+    scope: Any = None,
+):
+    """
+    Run `run()` at most once per Idempotency-Key. The result is encoded with
+    `model` (the route's response_model) so replays are byte-identical.
+    Without a key, `run()` is simply awaited.
+    """
+    if idempotency_key is None:
+        return await run()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+
+    key = (request.method, request.url.path, scope, idempotency_key)
+    fingerprint = hashlib.sha256(await request.body()).digest()
+    while True:
+        entry, owner = store.claim(key, fingerprint)
+        if entry.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        if owner:
+            break
+        # Same request in flight or done: wait for it rather than hitting the database again
+        await entry.done
+        if entry.body is not None:
+            return _response(entry, replayed=True)
+
+    try:
+        result = await run()
+    except HTTPException as e:
+        if e.status_code >= 500 or e.status_code in RETRYABLE_STATUSES:
+            store.abandon(key, entry)
+            raise
+        store.complete(entry, e.status_code, orjson.dumps({"detail": e.detail}))
+        raise
+    except BaseException:
+        store.abandon(key, entry)
+        raise
+    store.complete(entry, status.HTTP_200_OK, _encode(result, model))
+    return _response(entry, replayed=False)
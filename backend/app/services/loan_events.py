@@ -0,0 +1,152 @@
+
+# app/services/loan_events.py
+"""
+In-process broadcaster for loan lifecycle events, pushed to admin screens as
+Server-Sent Events by GET /loans/events.
+
+`apply_loan` publishes "loan_created" and `decide` publishes "loan_decided",
+each carrying the loan as serialized by the list endpoints, so clients patch
+their pending/all lists instead of re-fetching them.
+
+Event ids are "<epoch>-<seq>". The last LOAN_EVENTS_BUFFER events are kept,
+and a client reconnecting with Last-Event-ID gets the ones it missed. If
+that id comes from another process or has already been evicted, the client
+gets a single "reset" event and should re-fetch its lists once.
+
+The broadcaster is per process: with WEB_CONCURRENCY > 1 a stream only sees
+loans handled by the worker it is connected to.
+"""
+import asyncio
+import os
+import uuid
+from collections import deque
+from typing import AsyncIterator, NamedTuple, Optional
+
+import orjson
+
+from ..config import settings
+
+LOAN_CREATED = "loan_created"
+LOAN_DECIDED = "loan_decided"
+READY = "ready"
+RESET = "reset"
+
+# Reconnect delay suggested to EventSource clients
+RETRY_MS = 2000
+
+
+class LoanEvent(NamedTuple):
+    id: str
+    type: str
+    data: dict
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[Optional[LoanEvent]] = asyncio.Queue(queue_size)
+
+
+class LoanEventBroadcaster:
+    def __init__(self, buffer_size: int, queue_size: int):
+        self.queue_size = queue_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer: deque[tuple[int, LoanEvent]] = deque(maxlen=buffer_size)
+        self._subscribers: set[Subscription] = set()
+
+    @property
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    def publish(self, event_type: str, data: dict) -> LoanEvent:
+        self._seq += 1
+        event = LoanEvent(self.last_id, event_type, data)
+        self._buffer.append((self._seq, event))
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: end its stream; it reconnects and resumes from its last id
+                self._subscribers.discard(sub)
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait(None)
+        return event
+
+    def _missed(self, last_event_id: str) -> Optional[list[LoanEvent]]:
+        """
+        Buffered events after `last_event_id`, or None if they can't all be replayed.
+        """
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        seq = int(seq)
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if seq < oldest - 1:
+            return None
+        return [event for s, event in self._buffer if s > seq]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> tuple[Subscription, list[LoanEvent]]:
+        """
+        Register a subscriber and return it with the events to send first.
+        Runs without awaiting, so nothing published can fall between the two.
+        """
+        sub = Subscription(self.queue_size)
+        missed = self._missed(last_event_id) if last_event_id else []
+        if missed is None:
+            first = [LoanEvent(self.last_id, RESET, {})]
+        elif last_event_id:
+            first = missed
+        else:
+            first = [LoanEvent(self.last_id, READY, {})]
+        self._subscribers.add(sub)
+        return sub, first
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+
+def format_sse(event: LoanEvent) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (
+        event.id.encode(), event.type.encode(), orjson.dumps(event.data)
+    )
+
+
+async def stream(last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    SSE body: missed events (or ready/reset), then live events with keepalive
+    comments, until LOAN_EVENTS_MAX_STREAM_SECONDS have passed.
+    """
+    sub, first = broadcaster.subscribe(last_event_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LOAN_EVENTS_MAX_STREAM_SECONDS
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        for event in first:
+            yield format_sse(event)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(
+                    sub.queue.get(), min(remaining, settings.LOAN_EVENTS_KEEPALIVE_SECONDS)
+                )
+            except TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(sub)
+
+
+broadcaster = LoanEventBroadcaster(settings.LOAN_EVENTS_BUFFER, settings.LOAN_EVENTS_QUEUE_SIZE)
+
+
+def _reset_after_fork():
+    # Each worker numbers its own events; a new epoch makes cross-worker ids reset
+    global broadcaster
+    broadcaster = LoanEventBroadcaster(settings.LOAN_EVENTS_BUFFER, settings.LOAN_EVENTS_QUEUE_SIZE)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
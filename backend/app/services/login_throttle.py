@@ -0,0 +1,111 @@
+
+# app/services/login_throttle.py
+"""
+Token-bucket throttling for POST /auth/login, checked before the user
+lookup and the pbkdf2 verify, so a flood of attempts is turned away at the
+cost of a dict lookup.
+
+Each client IP and each email address has a bucket of LOGIN_*_BURST tokens
+that refills at LOGIN_*_PER_MINUTE. An attempt takes one token from both;
+when either is empty the attempt gets 429 with Retry-After set to when the
+next token arrives. Unknown emails are limited the same way as real ones.
+
+A bucket is two floats and is refilled lazily when touched. At most
+LOGIN_THROTTLE_MAX_KEYS buckets of each kind are kept. The least recently
+used one is dropped first; that is a bucket that has been idle longest and
+is therefore most likely full already. State and counters are per worker
+process, so with WEB_CONCURRENCY > 1 the effective limits are up to that
+many times higher.
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import settings
+
+IP = "ip"
+EMAIL = "email"
+
+
+class TokenBuckets:
+    def __init__(self, burst: int, per_minute: float, max_keys: int):
+        self.burst = max(1, burst)
+        self.rate = per_minute / 60  # tokens per second
+        self.max_keys = max_keys
+        # key -> (tokens, last refill); least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """
+        Take a token for `key`; None if allowed, else seconds until one is available.
+        """
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate if self.rate else math.inf
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class LoginThrottle:
+    def __init__(self, ip: TokenBuckets, email: TokenBuckets):
+        self.buckets = {IP: ip, EMAIL: email}
+        self.allowed = 0
+        self.throttled = {IP: 0, EMAIL: 0}
+
+    def check(self, client_ip: str, email: str) -> Optional[tuple[str, int]]:
+        """
+        Count a login attempt. None if it may proceed, else (which limit, Retry-After seconds).
+        """
+        ip_wait = self.buckets[IP].take(client_ip)
+        if ip_wait is not None:
+            # Don't let one address drain another user's email bucket
+            self.throttled[IP] += 1
+            return IP, _retry_after(ip_wait)
+        email_wait = self.buckets[EMAIL].take(email.strip().lower())
+        if email_wait is not None:
+            self.throttled[EMAIL] += 1
+            return EMAIL, _retry_after(email_wait)
+        self.allowed += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.LOGIN_THROTTLE_ENABLED,
+            "allowed": self.allowed,
+            "throttled_ip": self.throttled[IP],
+            "throttled_email": self.throttled[EMAIL],
+            "tracked_ips": len(self.buckets[IP]),
+            "tracked_emails": len(self.buckets[EMAIL]),
+        }
+
+    def clear(self) -> None:
+        for buckets in self.buckets.values():
+            buckets.clear()
+        self.allowed = 0
+        self.throttled = {IP: 0, EMAIL: 0}
+
+
+def _retry_after(wait: float) -> int:
+    # Whole seconds, rounded up; capped at a day (a zero refill rate never refills)
+    return int(min(math.ceil(wait), 24 * 3600))
+
+
+throttle = LoginThrottle(
+    TokenBuckets(settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE, settings.LOGIN_THROTTLE_MAX_KEYS),
+    TokenBuckets(settings.LOGIN_EMAIL_BURST, settings.LOGIN_EMAIL_PER_MINUTE, settings.LOGIN_THROTTLE_MAX_KEYS),
+)
@@ -0,0 +1,145 @@
+
+# app/services/response_cache.py
+"""
+Response cache and conditional GET for the loan list endpoints.
+
+Invalidation is driven by a data version stored in the `data_versions`
+table. `apply_loan` and `decide` bump it in the same transaction as the loan
+write, so every worker sees the change. A list request costs one primary key
+lookup when nothing has changed:
+
+- If-None-Match matches the current ETag -> 304, no query, no body
+- cached body for (key, version)         -> served as is (gzip done once)
+- otherwise                              -> query, serialize, cache
+
+The ETag is derived from the version and the cache key (route, user or role,
+filters), so it is the same on every worker and never collides across users.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import DataVersion
+
+LOANS = "loans"
+
+
+def ensure_version_rows(engine) -> None:
+    """
+    Seed the version counters (startup; safe to race between workers).
+    """
+    with engine.begin() as conn:
+        if conn.execute(select(DataVersion.name).where(DataVersion.name == LOANS)).first():
+            return
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(DataVersion).values(name=LOANS, version=0))
+    except IntegrityError:
+        pass
+
+
+async def bump_version(db: AsyncSession, name: str = LOANS) -> int:
+    """
+    Invalidate cached responses for `name`; call before committing the write.
+    Returns the new version.
+    """
+    return await db.scalar(
+        update(DataVersion)
+        .where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1)
+        .returning(DataVersion.version)
+    )
+
+
+async def current_version(db: AsyncSession, name: str = LOANS) -> int:
+    return (await db.scalar(select(DataVersion.version).where(DataVersion.name == name))) or 0
+
+
+class CachedBody(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+    gzipped: Optional[bytes]
+
+
+class ResponseCache:
+    """
+    LRU of serialized bodies, one entry per key; an entry is stale once the
+    data version moves past it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, CachedBody] = OrderedDict()
+
+    def get(self, key: tuple, version: int) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, version: int, etag: str, body: bytes) -> CachedBody:
+        gzipped = gzip.compress(body, 6) if len(body) >= settings.GZIP_MIN_BYTES else None
+        entry = self._entries[key] = CachedBody(version, etag, body, gzipped)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+
+def make_etag(key: tuple, version: int) -> str:
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+async def cached_response(
+    request: Request,
+    db: AsyncSession,
+    key: tuple,
+    build: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """
+    Serve `key` from the cache or from `build()` (JSON bytes), honouring
+    If-None-Match and Accept-Encoding.
+    """
+    version = await current_version(db)
+    etag = make_etag(key, version)
+    headers = {
+        "ETag": etag,
+        # Per-user content: browsers may keep it but must revalidate
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization, Accept-Encoding",
+    }
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    entry = cache.get(key, version)
+    if entry is None:
+        entry = cache.put(key, version, etag, await build())
+
+    if entry.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(entry.gzipped, media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
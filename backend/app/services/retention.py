@@ -0,0 +1,174 @@
+
+# app/services/retention.py
+"""
+Cold-tier compaction for audit collections.
+
+Raw events older than AUDIT_COMPACT_AFTER_DAYS are packed into compressed
+daily batches (zlib over concatenated BSON) and removed from the hot
+collection. Batches go to `<collection>_archive` in Mongo, or to
+AUDIT_ARCHIVE_DIR/<collection>/<day>-<first_id>.bson.z when that is set.
+The TTL index from mongo.ensure_indexes() is only a backstop for raw events.
+Compaction applies to the "mongo" audit backend only.
+
+Compacted events leave the hot collection, so the /logs/user/* timelines stop
+at AUDIT_COMPACT_AFTER_DAYS; archived_events() reads them back for one user.
+Every worker runs the periodic loop, but a lease document in `audit_locks`
+lets only one of them compact at a time.
+
+Run once:  python -m app.services.retention
+"""
+import asyncio
+import logging
+import os
+import socket
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+from ..config import settings
+from ..mongo import AUDIT_COLLECTIONS, get_mongo_db
+
+logger = logging.getLogger("loan-app.retention")
+
+# Events per archive batch; keeps each batch document well under Mongo's 16MB limit
+CHUNK_SIZE = 5000
+
+LOCKS = "audit_locks"
+LEASE_ID = "compaction"
+
+
+def encode_batch(docs: list[dict]) -> bytes:
+    return zlib.compress(b"".join(bson.encode(d) for d in docs), 9)
+
+
+def decode_batch(payload: bytes) -> list[dict]:
+    return bson.decode_all(zlib.decompress(payload))
+
+
+def _archive_file(collection: str, day: str, first_id) -> Path:
+    return Path(settings.AUDIT_ARCHIVE_DIR) / collection / f"{day}-{first_id}.bson.z"
+
+
+def _write_file(path: Path, payload: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(payload)
+    tmp.replace(path)
+
+
+def _read_files(collection: str, user_id: int) -> list[dict]:
+    docs = []
+    for path in (Path(settings.AUDIT_ARCHIVE_DIR) / collection).glob("*.bson.z"):
+        docs += [d for d in decode_batch(path.read_bytes()) if d.get("user_id") == user_id]
+    return docs
+
+
+async def _write_batch(db, collection: str, day: str, docs: list[dict]) -> None:
+    payload = encode_batch(docs)
+    first_id = docs[0]["_id"]
+    if settings.AUDIT_ARCHIVE_DIR:
+        # Plain file I/O: keep it off the event loop
+        await asyncio.to_thread(_write_file, _archive_file(collection, day, first_id), payload)
+        return
+    # Deterministic _id: re-running after a crash overwrites instead of duplicating
+    await db[f"{collection}_archive"].replace_one(
+        {"_id": f"{day}:{first_id}"},
+        {
+            "day": day,
+            "count": len(docs),
+            "user_ids": sorted({d["user_id"] for d in docs if d.get("user_id") is not None}),
+            "first_ts": docs[0]["timestamp"],
+            "last_ts": docs[-1]["timestamp"],
+            "payload": Binary(payload),
+        },
+        upsert=True,
+    )
+
+
+async def compact_collection(collection: str, cutoff: datetime) -> int:
+    """
+    Archive and delete raw events with timestamp < cutoff. Returns events moved.
+    """
+    db = get_mongo_db()
+    moved = 0
+    while True:
+        docs = await db[collection].find(
+            {"timestamp": {"$lt": cutoff}}
+        ).sort([("timestamp", 1), ("_id", 1)]).limit(CHUNK_SIZE).to_list(CHUNK_SIZE)
+        if not docs:
+            return moved
+        by_day = defaultdict(list)
+        for doc in docs:
+            by_day[doc["timestamp"].date().isoformat()].append(doc)
+        for day, day_docs in by_day.items():
+            await _write_batch(db, collection, day, day_docs)
+        # Only delete once the batches are durable
+        await db[collection].delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        moved += len(docs)
+
+
+async def archived_events(collection: str, user_id: int) -> list[dict]:
+    """
+    One user's compacted events, oldest first. With AUDIT_ARCHIVE_DIR this
+    decodes every file of the collection, so it is meant for one-off jobs
+    (migrations.backfill_timestamps), not request handlers.
+    """
+    if settings.AUDIT_ARCHIVE_DIR:
+        docs = await asyncio.to_thread(_read_files, collection, user_id)
+    else:
+        docs = []
+        async for batch in get_mongo_db()[f"{collection}_archive"].find({"user_ids": user_id}):
+            docs += [d for d in decode_batch(batch["payload"]) if d.get("user_id") == user_id]
+    return sorted(docs, key=lambda d: (d["timestamp"], d["_id"]))
+
+
+async def acquire_lease(owner: str, ttl_seconds: int, now: datetime | None = None) -> bool:
+    """
+    Take or renew the compaction lease. False while another owner holds an
+    unexpired one; a crashed holder's lease lapses after ttl_seconds.
+    """
+    now = now or datetime.utcnow()
+    try:
+        await get_mongo_db()[LOCKS].find_one_and_update(
+            {"_id": LEASE_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lease document exists and belongs to someone else
+        return False
+    return True
+
+
+async def compact(now: datetime | None = None) -> dict[str, int]:
+    if settings.AUDIT_BACKEND != "mongo":
+        logger.info(f"Audit compaction skipped: not supported for AUDIT_BACKEND={settings.AUDIT_BACKEND}")
+        return {}
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.AUDIT_COMPACT_AFTER_DAYS)
+    result = {}
+    for collection in AUDIT_COLLECTIONS:
+        result[collection] = await compact_collection(collection, cutoff)
+    logger.info(f"Audit compaction done: {result}")
+    return result
+
+
+async def run_periodically(interval_seconds: int) -> None:
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            # The lease outlives one interval so the holder keeps it between runs
+            if await acquire_lease(owner, interval_seconds * 2):
+                await compact()
+        except Exception as e:
+            logger.warning(f"Audit compaction failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(compact()))
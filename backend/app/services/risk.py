@@ -1,36 +1,83 @@
 
 # app/services/risk.py
-from typing import Dict
-from ..mongo import risk_logs
+from datetime import datetime
+from typing import NamedTuple, Optional
 
-def compute_risk(amount: float, income: float, credit_score: int, term_months: int) -> float:
+import numpy as np
+
+from . import amortization, audit
+
+# approval_decision approves scores strictly below this
+APPROVAL_THRESHOLD = 0.5
+
+
+class RiskBreakdown(NamedTuple):
+    debt_ratio: float
+    credit_factor: float
+    term_factor: float
+    score: float
+
+
+def risk_breakdown(amount: float, income: float, credit_score: int, term_months: int) -> RiskBreakdown:
     """
     Simple rule-based risk model:
     - Higher amount vs income => higher risk
     - Lower credit_score => higher risk
     - Longer term => slightly higher risk
+    Returns the factors along with the score, for the calculation log.
     """
     debt_ratio = amount / max(income, 1.0)
     credit_factor = (850 - credit_score) / 550
     term_factor = min(term_months / 360, 1.0)
 
     raw = (debt_ratio * 0.5) + (credit_factor * 0.4) + (term_factor * 0.1)
-    score = float(min(max(raw, 0.0), 1.0))
+    return RiskBreakdown(debt_ratio, credit_factor, term_factor, float(min(max(raw, 0.0), 1.0)))
+
 
+def compute_risk(amount: float, income: float, credit_score: int, term_months: int) -> float:
+    return risk_breakdown(amount, income, credit_score, term_months).score
 
+
+def compute_risk_array(amounts, incomes, credit_scores, terms) -> np.ndarray:
+    """
+    compute_risk over arrays (broadcasting), for portfolio analytics.
+    Keep in step with compute_risk.
+    """
+    debt_ratio = np.asarray(amounts, dtype=np.float64) / np.maximum(incomes, 1.0)
+    credit_factor = (850 - np.asarray(credit_scores, dtype=np.float64)) / 550
+    term_factor = np.minimum(np.asarray(terms, dtype=np.float64) / 360, 1.0)
+
+    raw = (debt_ratio * 0.5) + (credit_factor * 0.4) + (term_factor * 0.1)
+    return np.clip(raw, 0.0, 1.0)
+
+
+async def log_risk(
+    user_id: int, amount: float, income: float, credit_score: int, term_months: int, score: float
+) -> None:
+    """
+    Record a risk computation in the risk_logs audit stream.
+    """
     try:
-        risk_logs.insert_one({
+        await audit.record(audit.RISK_LOGS, {
+            "user_id": user_id,
             "amount": amount,
             "income": income,
             "credit_score": credit_score,
             "term_months": term_months,
-            "risk_score": score
+            "risk_score": score,
+            "timestamp": datetime.utcnow()
         })
     except Exception:
-        pass  # don't break API if Mongo isn't running in dev
-
+        pass  # don't break API if the audit backend isn't available in dev
 
-    return score
+def payment_to_income(amount: float, income: float, term_months: int, annual_rate: Optional[float] = None) -> float:
+    """
+    Monthly payment as a share of monthly income (income is annual), at
+    ANNUAL_INTEREST_RATE unless a rate is given. Logged with each calculation;
+    not weighted in compute_risk.
+    """
+    rate = amortization.resolve_rate(annual_rate)
+    return float(amortization.payment_to_income(amount, income, rate, term_months))
 
 def approval_decision(risk_score: float) -> str:
-    return "APPROVED" if risk_score < 0.5 else "REJECTED"
+    return "APPROVED" if risk_score < APPROVAL_THRESHOLD else "REJECTED"
@@ -0,0 +1,224 @@
+
+# app/services/risk_index.py
+"""
+Indexes over stored LoanApplication.risk_score.
+
+RiskIndex: for threshold what-ifs.
+
+Loans are sorted by risk once and prefix sums of amount and risk are kept
+alongside. For any threshold t, the loans approval_decision would approve
+(risk < t) are then a prefix of the index. Count, approved amount and mean
+risk each come from one binary search plus a prefix-sum lookup, so a sweep
+over many thresholds costs one vectorized searchsorted.
+
+Indexes are built per status filter and reused until the data version
+(response_cache's "loans" counter) moves.
+
+RiskPercentiles (`book`): where a score ranks against every stored loan.
+Scores are quantized into RISK_INDEX_BUCKETS buckets over [0, 1]. The
+structure is built at startup and updated in place on each insert or
+re-score, so apply_loan reports a percentile without a COUNT query. Single
+lookups go through a Fenwick tree (O(log buckets)). Whole lists use a prefix
+count array that is rebuilt lazily after changes.
+
+The book is per process: with WEB_CONCURRENCY > 1 a worker only sees other
+workers' loans after its next rebuild (every RISK_INDEX_REFRESH_SECONDS).
+Cached responses that contain percentiles include `book.tag`, a digest of
+its contents, in their cache key and ETag, so they change when the book does.
+"""
+import asyncio
+import hashlib
+import logging
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models import LoanApplication
+from . import response_cache
+
+logger = logging.getLogger("loan-app")
+
+
+class ThresholdPoint(NamedTuple):
+    threshold: float
+    approval_count: int
+    approval_rate: float
+    approved_amount: float
+    mean_risk: Optional[float]  # of the approved loans
+
+
+class RiskIndex:
+    def __init__(self, risk: np.ndarray, amount: np.ndarray):
+        order = np.argsort(risk, kind="stable")
+        self.risk = risk[order]
+        # cum_x[k] = sum of x over the k lowest-risk loans
+        self.cum_amount = np.concatenate(([0.0], np.cumsum(amount[order])))
+        self.cum_risk = np.concatenate(([0.0], np.cumsum(self.risk)))
+
+    def __len__(self) -> int:
+        return len(self.risk)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple]) -> "RiskIndex":
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return cls(data[:, 0].copy(), data[:, 1].copy())
+
+    def below(self, thresholds) -> np.ndarray:
+        """
+        Number of loans with risk < each threshold.
+        """
+        return np.searchsorted(self.risk, thresholds, side="left")
+
+    def simulate(self, thresholds: Sequence[float]) -> list[ThresholdPoint]:
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        counts = self.below(thresholds)
+        amounts = self.cum_amount[counts]
+        risk_sums = self.cum_risk[counts]
+        n = len(self)
+        return [
+            ThresholdPoint(t, c, c / n if n else 0.0, a, r / c if c else None)
+            for t, c, a, r in zip(thresholds.tolist(), counts.tolist(), amounts.tolist(), risk_sums.tolist())
+        ]
+
+
+# status filter (None = all loans) -> (data version, index)
+_indexes: dict[Optional[str], tuple[int, RiskIndex]] = {}
+
+
+async def load_index(db: AsyncSession, status: Optional[str] = None) -> RiskIndex:
+    version = await response_cache.current_version(db)
+    cached = _indexes.get(status)
+    if cached and cached[0] == version:
+        return cached[1]
+    q = select(func.coalesce(LoanApplication.risk_score, 0.0), LoanApplication.amount)
+    if status:
+        q = q.where(LoanApplication.status == status)
+    index = RiskIndex.from_rows((await db.execute(q)).all())
+    _indexes[status] = (version, index)
+    return index
+
+
+class RiskPercentiles:
+    def __init__(self, buckets: int):
+        self.buckets = buckets
+        self.total = 0
+        self._counts = np.zeros(buckets, dtype=np.int64)
+        self._tree = [0] * (buckets + 1)  # Fenwick tree over _counts, 1-based
+        self._cumulative: Optional[np.ndarray] = None  # counts below each bucket, rebuilt lazily
+        self._tag: Optional[str] = None  # digest of _counts, recomputed lazily
+
+    def bucket(self, score: float) -> int:
+        return min(max(int(score * self.buckets), 0), self.buckets - 1)
+
+    def _buckets(self, scores) -> np.ndarray:
+        b = (np.asarray(scores, dtype=np.float64) * self.buckets).astype(np.int64)
+        return np.clip(b, 0, self.buckets - 1)
+
+    def rebuild(self, scores: Iterable[float]) -> None:
+        counts = np.bincount(self._buckets(np.fromiter(scores, dtype=np.float64)), minlength=self.buckets)
+        # O(buckets) Fenwick construction: each node adds itself to its parent
+        tree = [0] + counts.tolist()
+        for i in range(1, self.buckets + 1):
+            parent = i + (i & -i)
+            if parent <= self.buckets:
+                tree[parent] += tree[i]
+        self._counts, self._tree, self.total, self._cumulative = counts, tree, int(counts.sum()), None
+        self._tag = None
+
+    def _update(self, b: int, delta: int) -> None:
+        self._counts[b] += delta
+        self.total += delta
+        self._cumulative = self._tag = None
+        i = b + 1
+        while i <= self.buckets:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _below(self, b: int) -> int:
+        """
+        Number of scores in buckets < b.
+        """
+        n, i = 0, b
+        while i > 0:
+            n += self._tree[i]
+            i -= i & -i
+        return n
+
+    @property
+    def tag(self) -> str:
+        """
+        Digest of the contents; equal on every worker whose book holds the same scores.
+        """
+        if self._tag is None:
+            self._tag = hashlib.blake2b(self._counts.tobytes(), digest_size=8).hexdigest()
+        return self._tag
+
+    def add(self, score: float) -> None:
+        self._update(self.bucket(score), 1)
+
+    def percentile(self, score: float) -> Optional[float]:
+        """
+        Share of stored scores below `score`, counting its own bucket half (0-100).
+        """
+        if not self.total:
+            return None
+        b = self.bucket(score)
+        return round(100 * (self._below(b) + int(self._counts[b]) / 2) / self.total, 2)
+
+    def percentiles(self, scores) -> np.ndarray:
+        """
+        percentile() for an array of scores, from the prefix count array.
+        """
+        b = self._buckets(scores)
+        if not self.total:
+            return np.full(len(b), np.nan)
+        if self._cumulative is None:
+            self._cumulative = np.concatenate(([0], np.cumsum(self._counts)[:-1]))
+        return np.round(100 * (self._cumulative[b] + self._counts[b] / 2) / self.total, 2)
+
+    def histogram(self, bins: int) -> list[int]:
+        """
+        Counts in `bins` equal-width bins over [0, 1].
+        """
+        edges = (np.arange(bins) * self.buckets) // bins
+        return np.add.reduceat(self._counts, edges).tolist()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Lower edge of the bucket holding the q-th quantile (0-1).
+        """
+        if not self.total:
+            return None
+        rank = max(1, int(np.ceil(q * self.total)))
+        return float(np.searchsorted(np.cumsum(self._counts), rank) / self.buckets)
+
+
+book = RiskPercentiles(settings.RISK_INDEX_BUCKETS)
+
+
+def build_book(engine) -> None:
+    """
+    Load every stored score into `book` (startup).
+    """
+    with engine.connect() as conn:
+        book.rebuild(conn.execute(select(func.coalesce(LoanApplication.risk_score, 0.0))).scalars())
+
+
+async def refresh_book() -> None:
+    async with AsyncSessionLocal() as db:
+        scores = (await db.execute(select(func.coalesce(LoanApplication.risk_score, 0.0)))).scalars().all()
+    book.rebuild(scores)
+
+
+async def refresh_periodically(interval_seconds: int) -> None:
+    # Picks up loans written by other workers
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await refresh_book()
+        except Exception as e:
+            logger.warning(f"Risk percentile refresh failed: {e}")
@@ -0,0 +1,38 @@
+
+# app/services/rollups.py
+"""
+Pre-aggregated activity counters.
+
+Every server-recorded activity (login, apply, decision, ...) bumps one hourly
+and one daily counter per (action, role) through the audit sink (an upserted $inc on Mongo), so /logs/stats reads a
+handful of rollup rows instead of scanning the raw `activities` stream.
+Client-posted events from /logs/activity are stored but not counted.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Iterable
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+
+# (granularity, bucket, action, role) -> count
+RollupCounts = dict[tuple[str, datetime, str, str], int]
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def fold(events: Iterable[tuple[str, str, datetime]]) -> RollupCounts:
+    """
+    Fold (action, role, timestamp) events into per-bucket increments, so a
+    batch costs one upsert per distinct (granularity, bucket, action, role).
+    """
+    return Counter(
+        (granularity, bucket_start(ts, granularity), action, role)
+        for action, role, ts in events
+        for granularity in GRANULARITIES
+    )
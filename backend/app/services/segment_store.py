@@ -0,0 +1,313 @@
+
+# app/services/segment_store.py
+"""
+Local append-only segment store, used as the "segment" audit sink for dev and
+edge deployments without MongoDB.
+
+Layout under AUDIT_SEGMENT_DIR:
+
+    LOCK                      flock'd by the owning process (single writer)
+    <stream>/000001.seg       concatenated BSON documents (each carries _id = seq)
+    <stream>/000001.idx       fixed 32-byte records: user_id, ts_ms, seq, offset
+    rollups.log               BSON {g, b, a, r, n} increments, compacted on open
+
+A segment is sealed once it would grow past AUDIT_SEGMENT_MAX_BYTES. On open
+the .idx files are loaded into a per-user index sorted by (ts, seq); a
+segment whose .idx is missing or short (crash) is re-scanned. Reads locate
+documents through that index and decode them straight out of an mmap.
+
+The sink runs appends and rollup log writes in a worker thread, one at a
+time, so file I/O and flushes don't stall the event loop. Reads stay on the
+loop: an append only publishes its index entries after the data is flushed.
+"""
+import asyncio
+import bisect
+import mmap
+import os
+import struct
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import bson
+
+from .audit import AuditSink, InvalidCursor
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
+
+EPOCH = datetime(1970, 1, 1)
+MS = timedelta(milliseconds=1)
+IDX_RECORD = struct.Struct("<qqqq")  # user_id, ts_ms, seq, offset
+NO_USER = -1
+
+
+def _to_ms(ts: datetime) -> int:
+    return (ts - EPOCH) // MS
+
+
+def _from_ms(ms: int) -> datetime:
+    return EPOCH + ms * MS
+
+
+class SegmentStore:
+    """
+    One stream's segments plus its in-memory (user_id -> sorted entries) index.
+    Entries are (ts_ms, seq, segment_no, offset) tuples.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.index: dict[int, list[tuple[int, int, int, int]]] = defaultdict(list)
+        self.next_seq = 1
+        self._maps: dict[int, mmap.mmap] = {}
+        self._load()
+        self._open_active()
+
+    # ----- files -----
+
+    def _seg_path(self, n: int) -> Path:
+        return self.dir / f"{n:06d}.seg"
+
+    def _idx_path(self, n: int) -> Path:
+        return self.dir / f"{n:06d}.idx"
+
+    def _segments(self) -> list[int]:
+        return sorted(int(p.stem) for p in self.dir.glob("*.seg"))
+
+    def _load(self) -> None:
+        segments = self._segments()
+        for n in segments:
+            seg_size = self._seg_path(n).stat().st_size
+            covered = self._load_idx(n)
+            if covered < seg_size:
+                self._rescan(n, covered, seg_size)
+        self.active = segments[-1] if segments else 1
+
+    def _load_idx(self, n: int) -> int:
+        """
+        Add a segment's .idx records to the index; returns the segment bytes they cover.
+        """
+        path = self._idx_path(n)
+        if not path.exists():
+            return 0
+        data = path.read_bytes()
+        whole = len(data) - len(data) % IDX_RECORD.size
+        covered = 0
+        for user_id, ts, seq, offset in IDX_RECORD.iter_unpack(data[:whole]):
+            self._add(user_id, ts, seq, n, offset)
+            covered = offset
+        if whole:
+            with open(self._seg_path(n), "rb") as seg:
+                seg.seek(covered)
+                covered += int.from_bytes(seg.read(4), "little")
+        if whole != len(data):
+            with open(path, "r+b") as f:
+                f.truncate(whole)
+        return covered
+
+    def _rescan(self, n: int, start: int, end: int) -> None:
+        """
+        Rebuild index records for seg bytes [start, end); drop a torn trailing write.
+        """
+        with open(self._seg_path(n), "r+b") as seg, open(self._idx_path(n), "ab") as idx:
+            data = seg.read()
+            offset = start
+            while offset + 4 <= end:
+                length = int.from_bytes(data[offset:offset + 4], "little")
+                if length < 5 or offset + length > end:
+                    break
+                doc = bson.decode(data[offset:offset + length])
+                user_id = doc.get("user_id")
+                user_id = NO_USER if user_id is None else user_id
+                ts = _to_ms(doc["timestamp"])
+                idx.write(IDX_RECORD.pack(user_id, ts, doc["_id"], offset))
+                self._add(user_id, ts, doc["_id"], n, offset)
+                offset += length
+            seg.truncate(offset)
+
+    def _add(self, user_id: int, ts: int, seq: int, n: int, offset: int) -> None:
+        entries = self.index[user_id]
+        entry = (ts, seq, n, offset)
+        if not entries or entries[-1] <= entry:
+            entries.append(entry)
+        else:
+            bisect.insort(entries, entry)
+        self.next_seq = max(self.next_seq, seq + 1)
+
+    def _open_active(self) -> None:
+        self._seg = open(self._seg_path(self.active), "ab")
+        self._idx = open(self._idx_path(self.active), "ab")
+
+    def _rotate(self) -> None:
+        self._seg.close()
+        self._idx.close()
+        self.active += 1
+        self._open_active()
+
+    # ----- writes -----
+
+    def append(self, docs: list[dict]) -> list[int]:
+        seqs, entries = [], []
+        for doc in docs:
+            doc["timestamp"] = _from_ms(_to_ms(doc["timestamp"]))
+            doc["_id"] = self.next_seq
+            self.next_seq += 1
+            data = bson.encode(doc)
+            if self._seg.tell() and self._seg.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            offset = self._seg.tell()
+            self._seg.write(data)
+            user_id = doc.get("user_id")
+            user_id = NO_USER if user_id is None else user_id
+            ts = _to_ms(doc["timestamp"])
+            self._idx.write(IDX_RECORD.pack(user_id, ts, doc["_id"], offset))
+            entries.append((user_id, ts, doc["_id"], self.active, offset))
+            seqs.append(doc["_id"])
+        # Data before index, so a crash leaves at worst an un-indexed tail to rescan
+        self._seg.flush()
+        self._idx.flush()
+        # Readers can only find the documents once they are in the file
+        for entry in entries:
+            self._add(*entry)
+        return seqs
+
+    # ----- reads -----
+
+    def _map(self, n: int, need: int) -> mmap.mmap:
+        mm = self._maps.get(n)
+        if mm is None or len(mm) < need:
+            if mm is not None:
+                mm.close()
+            with open(self._seg_path(n), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[n] = mm
+        return mm
+
+    def read(self, n: int, offset: int) -> dict:
+        mm = self._map(n, offset + 4)
+        length = int.from_bytes(mm[offset:offset + 4], "little")
+        mm = self._map(n, offset + length)
+        return bson.decode(mm[offset:offset + length])
+
+    def user_events(self, user_id: int, before: Optional[tuple[int, int]], limit: int) -> list[dict]:
+        entries = self.index.get(user_id, [])
+        end = bisect.bisect_left(entries, before) if before else len(entries)
+        return [self.read(n, offset) for _, _, n, offset in reversed(entries[max(0, end - limit):end])]
+
+    def close(self) -> None:
+        self._seg.close()
+        self._idx.close()
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
+
+
+class RollupLog:
+    """
+    In-memory rollup counters backed by an append-only increment log.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.counts: dict[tuple[str, int, str, str], int] = defaultdict(int)
+        if path.exists():
+            for rec in bson.decode_all(path.read_bytes()):
+                self.counts[(rec["g"], rec["b"], rec["a"], rec["r"])] += rec["n"]
+            # Compact: one record per counter
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(b"".join(self._encode(k, n) for k, n in self.counts.items()))
+            tmp.replace(path)
+        self._log = open(path, "ab")
+
+    @staticmethod
+    def _encode(key, n) -> bytes:
+        g, b, a, r = key
+        return bson.encode({"g": g, "b": b, "a": a, "r": r, "n": n})
+
+    def write(self, increments: dict[tuple[str, int, str, str], int]) -> None:
+        self._log.write(b"".join(self._encode(k, n) for k, n in increments.items()))
+        self._log.flush()
+
+    def add(self, increments: dict[tuple[str, int, str, str], int]) -> None:
+        for key, n in increments.items():
+            self.counts[key] += n
+
+    def close(self) -> None:
+        self._log.close()
+
+
+class SegmentAuditSink(AuditSink):
+    def __init__(self, directory: str, max_bytes: int):
+        self.dir = Path(directory)
+        self.max_bytes = max_bytes
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = open(self.dir / "LOCK", "a+")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock.close()
+                raise RuntimeError(
+                    f"Audit segment store {self.dir} is in use by another process; "
+                    "the segment backend supports a single worker"
+                )
+        self._stores: dict[str, SegmentStore] = {}
+        self._rollups = RollupLog(self.dir / "rollups.log")
+        self._writing = asyncio.Lock()
+
+    def _store(self, stream: str) -> SegmentStore:
+        store = self._stores.get(stream)
+        if store is None:
+            store = self._stores[stream] = SegmentStore(self.dir / stream, self.max_bytes)
+        return store
+
+    async def insert(self, stream, docs):
+        store = self._store(stream)
+        async with self._writing:
+            seqs = await asyncio.to_thread(store.append, docs)
+        return [str(seq) for seq in seqs]
+
+    async def user_events(self, stream, user_id, before, limit, fields):
+        key = None
+        if before:
+            ts, raw_id = before
+            try:
+                key = (_to_ms(ts), int(raw_id))
+            except ValueError:
+                raise InvalidCursor(raw_id)
+        keep = set(fields) | {"timestamp"}
+        docs = []
+        for doc in self._store(stream).user_events(user_id, key, limit):
+            out = {k: v for k, v in doc.items() if k in keep}
+            out["_id"] = str(doc["_id"])
+            docs.append(out)
+        return docs
+
+    async def bump_rollups(self, counts):
+        increments = {(g, _to_ms(b), a, r): n for (g, b, a, r), n in counts.items()}
+        async with self._writing:
+            await asyncio.to_thread(self._rollups.write, increments)
+        # Counters change on the loop, where read_rollups iterates them
+        self._rollups.add(increments)
+
+    async def read_rollups(self, granularity, since, until, action=None, role=None):
+        lo, hi = _to_ms(since), _to_ms(until)
+        rows = sorted(
+            (b, a, r, n) for (g, b, a, r), n in self._rollups.counts.items()
+            if g == granularity and lo <= b < hi
+            and (not action or a == action) and (not role or r == role)
+        )
+        return [{"bucket": _from_ms(b), "action": a, "role": r, "count": n} for b, a, r, n in rows]
+
+    async def close(self):
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+        self._rollups.close()
+        self._lock.close()  # releases the flock
@@ -0,0 +1,47 @@
+
+# app/services/serialization.py
+"""
+Bulk JSON for list endpoints.
+
+List handlers select plain column tuples (no ORM identity map, no per-object
+model validation) and turn them into the response body here in one orjson
+call. The columns selected must match the response schema field for field;
+tests/test_serialization.py checks them against the pydantic models.
+
+`fields=a,b` (sparse fieldsets) is parsed here; handlers then select only
+those columns / project only those document fields.
+"""
+from typing import Iterable, Optional, Sequence
+
+import orjson
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(raw: Optional[str], allowed: Sequence[str]) -> tuple[str, ...]:
+    """
+    "a,b" -> the requested keys in schema order; every allowed key when omitted.
+    """
+    if raw is None:
+        return tuple(allowed)
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}")
+    if not requested:
+        raise InvalidFields(f"No fields requested. Allowed: {', '.join(allowed)}")
+    return tuple(k for k in allowed if k in requested)
+
+
+def keys(columns: Sequence[ColumnElement]) -> tuple[str, ...]:
+    return tuple(c.key for c in columns)
+
+
+def dump_rows(keys: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    """
+    Rows (tuples, in `keys` order) -> JSON array of objects.
+    """
+    return orjson.dumps([dict(zip(keys, row)) for row in rows])
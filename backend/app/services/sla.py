@@ -0,0 +1,105 @@
+
+# app/services/sla.py
+"""
+Loan processing SLA figures from the created_at / decided_at columns.
+
+Each figure comes from one range scan on an index:
+- queue time (created -> decided) for loans decided in the window: decided_at
+- age of the loans pending now: (status, created_at)
+- applications and decisions per day: created_at, decided_at
+
+Only the two timestamp columns are fetched. Percentiles are then taken with
+numpy, so the database never sorts or aggregates durations.
+"""
+from datetime import UTC, datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import LoanApplication
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def naive_utc(ts: datetime) -> datetime:
+    # Columns hold naive UTC
+    return ts.astimezone(UTC).replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
+def summarize(hours: np.ndarray) -> dict:
+    """
+    count / mean / percentiles / max of durations in hours.
+    """
+    if not len(hours):
+        return {"count": 0}
+    p = np.percentile(hours, PERCENTILES)
+    out = {"count": int(len(hours)), "mean_hours": float(hours.mean()), "max_hours": float(hours.max())}
+    out.update({f"p{q}_hours": float(v) for q, v in zip(PERCENTILES, p)})
+    return out
+
+
+def _hours(pairs, end: Optional[datetime] = None) -> np.ndarray:
+    """
+    (start, stop) datetimes -> elapsed hours; stop defaults to `end`.
+    """
+    if not pairs:
+        return np.empty(0)
+    starts = np.array([a for a, _ in pairs], dtype="datetime64[us]")
+    stops = np.array([b if end is None else end for _, b in pairs], dtype="datetime64[us]")
+    return (stops - starts).astype(np.int64) / 3.6e9
+
+
+async def queue_times(db: AsyncSession, since: datetime, until: datetime) -> np.ndarray:
+    rows = (await db.execute(
+        select(LoanApplication.created_at, LoanApplication.decided_at).where(
+            LoanApplication.decided_at >= since,
+            LoanApplication.decided_at < until,
+            LoanApplication.created_at.is_not(None),
+        )
+    )).all()
+    return _hours(rows)
+
+
+async def pending_ages(db: AsyncSession, now: datetime) -> np.ndarray:
+    rows = (await db.execute(
+        select(LoanApplication.created_at, LoanApplication.created_at).where(
+            LoanApplication.status == "PENDING", LoanApplication.created_at.is_not(None)
+        )
+    )).all()
+    return _hours(rows, end=now)
+
+
+async def throughput(db: AsyncSession, since: datetime, until: datetime) -> list[dict]:
+    """
+    Per UTC day in the window: applications, approvals and rejections.
+    """
+    days: dict[str, dict] = {}
+
+    def day(d) -> dict:
+        return days.setdefault(str(d), {"day": str(d), "applied": 0, "approved": 0, "rejected": 0})
+
+    applied_day = func.date(LoanApplication.created_at)
+    for d, n in (await db.execute(
+        select(applied_day, func.count())
+        .where(LoanApplication.created_at >= since, LoanApplication.created_at < until)
+        .group_by(applied_day)
+    )).all():
+        day(d)["applied"] = n
+
+    decided_day = func.date(LoanApplication.decided_at)
+    for d, status, n in (await db.execute(
+        select(decided_day, LoanApplication.status, func.count())
+        .where(LoanApplication.decided_at >= since, LoanApplication.decided_at < until)
+        .group_by(decided_day, LoanApplication.status)
+    )).all():
+        if status in ("APPROVED", "REJECTED"):
+            day(d)[status.lower()] = n
+    return [days[k] for k in sorted(days)]
+
+
+async def missing_timestamps(db: AsyncSession) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(LoanApplication).where(LoanApplication.created_at.is_(None))
+    )
@@ -0,0 +1,117 @@
+
+# app/services/status_history.py
+"""
+Loan status history (loan_status_history table).
+
+Each status a loan has been in is one row covering [valid_from, valid_to);
+the current one has valid_to NULL. Rows are only appended: a transition
+closes the open row's valid_to and adds the new status, inside the same
+transaction as the loan_applications update, so the history can't disagree
+with the loan.
+
+Point-in-time questions are single range scans:
+- state of loan X at T: (loan_id, valid_from) index, latest row with valid_from <= T
+- loans in a status at T: (status, valid_from, valid_to) index,
+  valid_from <= T and (valid_to is NULL or valid_to > T)
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import LoanApplication, LoanStatusHistory
+
+History = LoanStatusHistory.__table__
+
+
+async def opened(db: AsyncSession, loan_id: int, status: str, at: datetime, changed_by: Optional[int] = None) -> None:
+    """
+    First history row of a new loan.
+    """
+    await db.execute(insert(History).values(loan_id=loan_id, status=status, valid_from=at, changed_by=changed_by))
+
+
+async def transition(
+    db: AsyncSession, loan_id: int, status: str, at: datetime, changed_by: Optional[int] = None
+) -> None:
+    """
+    Close the loan's current row at `at` and open one for `status`.
+    """
+    await db.execute(
+        update(History)
+        .where(History.c.loan_id == loan_id, History.c.valid_to.is_(None))
+        .values(valid_to=at)
+    )
+    await opened(db, loan_id, status, at, changed_by)
+
+
+async def bulk_load(db: AsyncSession, rows: Iterable[dict]) -> int:
+    """
+    Insert complete history rows (loan_id, status, valid_from, valid_to,
+    changed_by) with one executemany; the caller commits.
+    """
+    rows = [
+        {"loan_id": r["loan_id"], "status": r["status"], "valid_from": r["valid_from"],
+         "valid_to": r.get("valid_to"), "changed_by": r.get("changed_by")}
+        for r in rows
+    ]
+    if rows:
+        await db.execute(insert(History), rows)
+    return len(rows)
+
+
+def rows_from_loan(loan_id: int, status: str, created_at: datetime, decided_at: Optional[datetime]) -> list[dict]:
+    """
+    History implied by a loan's own columns (for loans from before the table existed).
+    """
+    if status == "PENDING" or decided_at is None:
+        return [{"loan_id": loan_id, "status": status, "valid_from": created_at}]
+    return [
+        {"loan_id": loan_id, "status": "PENDING", "valid_from": created_at, "valid_to": decided_at},
+        {"loan_id": loan_id, "status": status, "valid_from": decided_at},
+    ]
+
+
+async def history(db: AsyncSession, loan_id: int) -> list[LoanStatusHistory]:
+    return (await db.execute(
+        select(LoanStatusHistory).where(LoanStatusHistory.loan_id == loan_id).order_by(LoanStatusHistory.valid_from)
+    )).scalars().all()
+
+
+async def state_at(db: AsyncSession, loan_id: int, at: datetime) -> Optional[LoanStatusHistory]:
+    """
+    The row in effect for the loan at `at`; None if it didn't exist yet.
+    """
+    return (await db.execute(
+        select(LoanStatusHistory)
+        .where(LoanStatusHistory.loan_id == loan_id, LoanStatusHistory.valid_from <= at)
+        .order_by(LoanStatusHistory.valid_from.desc(), LoanStatusHistory.id.desc())
+        .limit(1)
+    )).scalars().first()
+
+
+async def loans_in_status_at(db: AsyncSession, status: str, at: datetime) -> list[int]:
+    """
+    Ids of the loans that were in `status` at `at`.
+    """
+    return (await db.execute(
+        select(LoanStatusHistory.loan_id)
+        .where(
+            LoanStatusHistory.status == status,
+            LoanStatusHistory.valid_from <= at,
+            or_(LoanStatusHistory.valid_to.is_(None), LoanStatusHistory.valid_to > at),
+        )
+        .order_by(LoanStatusHistory.loan_id)
+    )).scalars().all()
+
+
+async def without_history(db: AsyncSession) -> list[tuple]:
+    """
+    (id, status, created_at, decided_at) of loans that have no history rows.
+    """
+    has_history = select(LoanStatusHistory.id).where(LoanStatusHistory.loan_id == LoanApplication.id).exists()
+    return (await db.execute(
+        select(LoanApplication.id, LoanApplication.status, LoanApplication.created_at, LoanApplication.decided_at)
+        .where(~has_history)
+    )).all()
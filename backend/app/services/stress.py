@@ -0,0 +1,151 @@
+
+# app/services/stress.py
+"""
+Portfolio stress testing: expected loss when credit scores and incomes shift.
+
+Each loan's default probability (PD) is its risk score recomputed with
+compute_risk's formula under the scenario. The loss for a scenario is
+the sum over loans of
+
+    amount x LGD x default
+
+where each default is independent with probability PD. The endpoint reports
+the mean of that loss, its standard deviation and normal-approximation
+95th/99th percentiles. It also reports a histogram of PDs and the number of
+loans whose stressed score would fail approval_decision.
+
+The portfolio columns are loaded into numpy arrays once per data version
+(response_cache's "loans" counter) and reused until a loan is written. All
+scenarios are evaluated together as a (scenarios x loans) matrix, in chunks
+of loans so memory stays around STRESS_CHUNK_ELEMENTS floats per temporary.
+"""
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import LoanApplication
+from . import response_cache
+from .risk import APPROVAL_THRESHOLD, compute_risk_array
+
+PD_BINS = 10
+Z_95 = 1.6448536269514722
+Z_99 = 2.3263478740408408
+
+
+class PortfolioArrays(NamedTuple):
+    amount: np.ndarray
+    income: np.ndarray
+    credit_score: np.ndarray
+    term_months: np.ndarray
+
+
+class Scenario(NamedTuple):
+    name: str
+    credit_score_shift: int = 0  # points, clamped to 300-850 after shifting
+    income_change: float = 0.0  # fraction, e.g. -0.1 for a 10% drop
+
+
+BASELINE = Scenario("baseline")
+
+# (status, data version) -> arrays; only the latest version is worth keeping
+_loaded: dict[str, tuple[int, PortfolioArrays]] = {}
+
+
+def to_arrays(rows: Sequence[tuple]) -> PortfolioArrays:
+    if not rows:
+        return PortfolioArrays(*(np.empty(0) for _ in PortfolioArrays._fields))
+    data = np.array(rows, dtype=np.float64)
+    return PortfolioArrays(*data.T.copy())
+
+
+async def load_portfolio(db: AsyncSession, status: str = "APPROVED") -> PortfolioArrays:
+    version = await response_cache.current_version(db)
+    cached = _loaded.get(status)
+    if cached and cached[0] == version:
+        return cached[1]
+    rows = (await db.execute(
+        select(
+            LoanApplication.amount, LoanApplication.income,
+            LoanApplication.credit_score, LoanApplication.term_months,
+        ).where(LoanApplication.status == status)
+    )).all()
+    arrays = to_arrays(rows)
+    _loaded[status] = (version, arrays)
+    return arrays
+
+
+def clear_cache() -> None:
+    _loaded.clear()
+
+
+class ScenarioResult(NamedTuple):
+    name: str
+    credit_score_shift: int
+    income_change: float
+    mean_pd: float
+    expected_loss: float
+    loss_std: float
+    loss_p95: float
+    loss_p99: float
+    would_reject: int  # loans whose stressed score fails approval_decision
+    pd_histogram: list[int]  # PD_BINS equal-width bins over [0, 1]
+
+
+def run(
+    portfolio: PortfolioArrays,
+    scenarios: Sequence[Scenario],
+    loss_given_default: float,
+    approval_threshold: float = APPROVAL_THRESHOLD,
+    chunk_elements: Optional[int] = None,
+) -> list[ScenarioResult]:
+    """
+    Evaluate every scenario over the whole portfolio in one batched pass.
+    """
+    s = len(scenarios)
+    shifts = np.array([sc.credit_score_shift for sc in scenarios], dtype=np.float64)[:, None]
+    income_factors = np.array([1 + sc.income_change for sc in scenarios], dtype=np.float64)[:, None]
+
+    n = len(portfolio.amount)
+    chunk = max(1, (chunk_elements or settings.STRESS_CHUNK_ELEMENTS) // max(s, 1))
+    pd_sum = np.zeros(s)
+    loss = np.zeros(s)
+    variance = np.zeros(s)
+    failing = np.zeros(s, dtype=np.int64)
+    histogram = np.zeros(s * PD_BINS, dtype=np.int64)
+    bin_offsets = (np.arange(s) * PD_BINS)[:, None]
+
+    for start in range(0, n, chunk):
+        part = slice(start, start + chunk)
+        amount = portfolio.amount[part]
+        pd = compute_risk_array(
+            amount,
+            portfolio.income[part] * income_factors,
+            np.clip(portfolio.credit_score[part] + shifts, 300, 850),
+            portfolio.term_months[part],
+        )
+        exposure = amount * loss_given_default
+        pd_sum += pd.sum(axis=1)
+        loss += pd @ exposure
+        variance += (pd * (1 - pd)) @ (exposure * exposure)
+        failing += (pd >= approval_threshold).sum(axis=1)
+        bins = np.minimum((pd * PD_BINS).astype(np.int64), PD_BINS - 1)
+        histogram += np.bincount((bins + bin_offsets).ravel(), minlength=s * PD_BINS)
+
+    std = np.sqrt(variance)
+    histogram = histogram.reshape(s, PD_BINS)
+    return [
+        ScenarioResult(
+            *scenario,
+            float(pd_sum[i] / n) if n else 0.0,
+            float(loss[i]),
+            float(std[i]),
+            float(loss[i] + Z_95 * std[i]),
+            float(loss[i] + Z_99 * std[i]),
+            int(failing[i]),
+            histogram[i].tolist(),
+        )
+        for i, scenario in enumerate(scenarios)
+    ]
@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_audit_storage.py
+"""
+Bytes per audit event: legacy documents (identity copied into every event)
+vs. compact documents (user_id only) vs. compacted daily archive batches.
+
+    cd backend
+    python benchmarks/bench_audit_storage.py --events 50000
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.retention import encode_batch  # noqa: E402
+
+ACTIONS = ["login", "logout", "apply_loan", "loan_decision", "ui_click"]
+
+
+def make_events(n: int, legacy: bool) -> list[dict]:
+    rng = random.Random(42)
+    start = datetime(2026, 1, 1)
+    events = []
+    for i in range(n):
+        user_id = rng.randint(1, 500)
+        doc = {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "action": rng.choice(ACTIONS),
+            "details": {"loan_id": rng.randint(1, 10_000), "amount": rng.randint(1_000, 500_000)},
+            "timestamp": start + timedelta(seconds=i * 7),
+        }
+        if legacy:
+            doc.update(email=f"user{user_id}@example.com", full_name=f"Applicant Number {user_id}",
+                       role="USER")
+        events.append(doc)
+    return events
+
+
+def bytes_per_event(docs: list[dict]) -> float:
+    return sum(len(bson.encode(d)) for d in docs) / len(docs)
+
+
+def archived_bytes_per_event(docs: list[dict]) -> float:
+    by_day: dict = {}
+    for d in docs:
+        by_day.setdefault(d["timestamp"].date(), []).append(d)
+    return sum(len(encode_batch(day_docs)) for day_docs in by_day.values()) / len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+
+    legacy = make_events(args.events, legacy=True)
+    compact = make_events(args.events, legacy=False)
+    rows = [
+        ("legacy document", bytes_per_event(legacy)),
+        ("compact document", bytes_per_event(compact)),
+        ("archived (zlib daily batch)", archived_bytes_per_event(compact)),
+    ]
+    base = rows[0][1]
+    print(f"{'encoding':<30} {'bytes/event':>12} {'vs legacy':>10}")
+    for name, size in rows:
+        print(f"{name:<30} {size:>12.1f} {size / base:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# backend/benchmarks/bench_group_commit.py
+"""
+Loan application writes per second: one commit per request vs. group commit.
+
+Runs apply_loan's write path (`_create_loan`: exposure reserve, insert,
+history row, version bump) from many concurrent tasks against a throwaway
+SQLite file, first committing each application in its own session, then
+through services/group_commit.py. HTTP, auth and audit logging are left out
+so the numbers are the database write path only. Failures (e.g. "database
+is locked") are counted separately.
+
+    cd backend
+    python benchmarks/bench_group_commit.py --seconds 5 --concurrency 1 16 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+_DB_FILE = Path(tempfile.mkdtemp()) / "bench.db"
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_DB_FILE.as_posix()}"
+os.environ.setdefault("SQL_ECHO", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.config import settings  # noqa: E402
+from app.database import AsyncSessionLocal, Base, engine  # noqa: E402
+from app.models import User  # noqa: E402
+from app.routers.loan_routes import _create_loan  # noqa: E402
+from app.schemas import LoanCreate  # noqa: E402
+from app.services import group_commit, response_cache  # noqa: E402
+
+
+def seed(users: int) -> list[User]:
+    Base.metadata.create_all(bind=engine)
+    response_cache.ensure_version_rows(engine)
+    from sqlalchemy.orm import Session
+    with Session(engine, expire_on_commit=False) as db:
+        rows = [User(full_name=f"Bench User {i}", email=f"bench{i}@example.com", hashed_password="x")
+                for i in range(users)]
+        db.add_all(rows)
+        db.commit()
+    return rows
+
+
+async def hammer(users: list[User], seconds: float, concurrency: int) -> Counter:
+    outcomes = Counter()
+    stop_at = time.perf_counter() + seconds
+
+    async def worker(i: int):
+        user = users[i % len(users)]
+        n = 0
+        while time.perf_counter() < stop_at:
+            n += 1
+            payload = LoanCreate(amount=1000 + n, income=80000, credit_score=700, term_months=36)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await _create_loan(payload, db, user)
+                outcomes["ok"] += 1
+            except Exception as e:
+                outcomes[type(e).__name__] += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return outcomes
+
+
+async def run(users: list[User], seconds: float, concurrency: int, grouped: bool) -> Counter:
+    runner = asyncio.create_task(group_commit.coalescer.run()) if grouped else None
+    await asyncio.sleep(0)
+    try:
+        return await hammer(users, seconds, concurrency)
+    finally:
+        if runner:
+            runner.cancel()
+
+
+async def compare(users: list[User], seconds: float, concurrency: list[int]) -> None:
+    print(f"{'tasks':>6} {'per request/s':>14} {'group commit/s':>15} {'batches':>8}  failures")
+    for c in concurrency:
+        direct = await run(users, seconds, c, grouped=False)
+        batches = group_commit.coalescer.batches
+        grouped = await run(users, seconds, c, grouped=True)
+        batches = group_commit.coalescer.batches - batches
+        failures = {k: v for k, v in (direct + grouped).items() if k != "ok"}
+        print(f"{c:>6} {direct['ok'] / seconds:>14.1f} {grouped['ok'] / seconds:>15.1f} "
+              f"{batches:>8}  {failures or ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    settings.MAX_PENDING_LOANS = 0
+    # The async pool is bound to one event loop, so every run shares it
+    asyncio.run(compare(seed(max(args.concurrency)), args.seconds, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/benchmarks/bench_serialization.py
+"""
+List serialization: ORM objects -> LoanOut (from_attributes) -> FastAPI's
+response_model encoding, vs. column tuples -> one orjson call (what the
+/loans list endpoints do now). Both include the SQL query.
+
+    cd backend
+    python benchmarks/bench_serialization.py --rows 1000 10000 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.database import Base  # noqa: E402
+from app.models import LoanApplication, User  # noqa: E402
+from app.routers.loan_routes import LOAN_COLUMNS  # noqa: E402
+from app.schemas import LoanOut  # noqa: E402
+from app.services.serialization import dump_rows, keys  # noqa: E402
+
+
+def seed(engine, n: int) -> None:
+    rng = random.Random(42)
+    with Session(engine) as db:
+        db.add(User(id=1, full_name="Bench User", email="bench@example.com", hashed_password="x"))
+        db.execute(LoanApplication.__table__.insert(), [
+            {
+                "user_id": 1,
+                "amount": rng.randint(1_000, 500_000) + 0.5,
+                "income": rng.randint(20_000, 300_000),
+                "credit_score": rng.randint(300, 850),
+                "term_months": rng.choice([12, 24, 36, 60, 120, 360]),
+                "status": rng.choice(["PENDING", "APPROVED", "REJECTED"]),
+                "risk_score": rng.random(),
+            }
+            for _ in range(n)
+        ])
+        db.commit()
+
+
+def orm_path(db: Session) -> bytes:
+    items = db.scalars(select(LoanApplication).order_by(LoanApplication.id.desc())).all()
+    content = [LoanOut.model_validate(i) for i in items]
+    # What FastAPI does with a response_model before JSONResponse renders it
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def column_path(db: Session) -> bytes:
+    rows = db.execute(select(*LOAN_COLUMNS).order_by(LoanApplication.id.desc())).all()
+    return dump_rows(keys(LOAN_COLUMNS), rows)
+
+
+def best_of(fn, db: Session, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        fn(db)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'orm+response_model':>20} {'columns+orjson':>16} {'speedup':>8}")
+    for n in args.rows:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        seed(engine, n)
+        with Session(engine) as db:
+            assert orm_path(db).count(b'"id"') == column_path(db).count(b'"id"') == n
+            slow = best_of(orm_path, db, args.repeat)
+            fast = best_of(column_path, db, args.repeat)
+        engine.dispose()
+        print(f"{n:>8} {slow * 1000:>18.1f}ms {fast * 1000:>14.1f}ms {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# backend/benchmarks/bench_snapshot.py
+"""
+Loans held in memory: ORM objects vs. the columnar snapshot behind
+/loans/all, plus one filtered, sorted query on each (SQL vs. masks), and
+the cost of bringing a stale snapshot up to date after another worker's
+writes: full reload vs. incremental catch-up.
+
+    cd backend
+    python benchmarks/bench_snapshot.py --rows 100000 500000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.database import Base  # noqa: E402
+from app.models import LoanApplication, User  # noqa: E402
+from app.services.loan_snapshot import LoanSnapshot, _LOAD_COLUMNS, catch_up_queries  # noqa: E402
+
+
+def seed(engine, n: int) -> None:
+    rng = random.Random(42)
+    with Session(engine) as db:
+        db.add(User(id=1, full_name="Bench User", email="bench@example.com", hashed_password="x"))
+        db.execute(LoanApplication.__table__.insert(), [
+            {
+                "user_id": 1,
+                "amount": rng.randint(1_000, 500_000) + 0.5,
+                "income": rng.randint(20_000, 300_000),
+                "credit_score": rng.randint(300, 850),
+                "term_months": rng.choice([12, 24, 36, 60, 120, 360]),
+                "status": rng.choice(["PENDING", "APPROVED", "REJECTED"]),
+                "risk_score": rng.random(),
+            }
+            for _ in range(n)
+        ])
+        db.commit()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--writes", type=int, default=100, help="Foreign inserts and decisions before catch-up")
+    args = parser.parse_args()
+
+    for n in args.rows:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        seed(engine, n)
+
+        with Session(engine) as db:
+            loans, orm_s, orm_bytes, orm_peak = measure(lambda: db.scalars(select(LoanApplication)).all())
+            del loans
+
+        def build():
+            snap = LoanSnapshot()
+            with engine.connect() as conn:
+                snap.load(conn.execute(select(*_LOAD_COLUMNS)).all(), {}, 0)
+            return snap
+        snap, snap_s, snap_bytes, snap_peak = measure(build)
+
+        q = (
+            select(LoanApplication.id)
+            .where(LoanApplication.amount.between(50_000, 200_000), LoanApplication.credit_score >= 650,
+                   LoanApplication.risk_score <= 0.5)
+            .order_by(LoanApplication.income.desc(), LoanApplication.id.desc())
+        )
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            sql_ids = conn.scalars(q).all()
+        sql_s = time.perf_counter() - start
+        start = time.perf_counter()
+        positions = snap.select(
+            ranges={"amount": (50_000, 200_000), "credit_score": (650, None), "risk_score": (None, 0.5)},
+            sort="income", descending=True,
+        )
+        snap_ids = snap.values("id", positions)
+        mask_s = time.perf_counter() - start
+        assert snap_ids == list(sql_ids)
+
+        print(f"{n} loans")
+        print(f"  ORM objects     {orm_bytes / n:8.0f} B/loan retained  (peak {orm_peak / 2**20:7.1f} MiB, load {orm_s:6.2f} s)")
+        print(f"  snapshot        {snap_bytes / n:8.0f} B/loan retained  (peak {snap_peak / 2**20:7.1f} MiB, load {snap_s:6.2f} s)")
+        print(f"  filter + sort   SQL {sql_s * 1000:8.1f} ms   snapshot {mask_s * 1000:8.1f} ms  ({len(snap_ids)} rows)")
+
+        # Another worker inserts and decides `--writes` loans each
+        now = datetime.utcnow()
+        with Session(engine) as db:
+            db.execute(LoanApplication.__table__.insert(), [
+                {"user_id": 1, "amount": 1000.0, "income": 50_000, "credit_score": 700, "term_months": 12,
+                 "status": "PENDING", "risk_score": 0.5, "created_at": now}
+                for _ in range(args.writes)
+            ])
+            db.execute(update(LoanApplication).where(LoanApplication.id <= args.writes)
+                       .values(status="APPROVED", decided_at=now))
+            db.commit()
+
+        def reload():
+            fresh = LoanSnapshot()
+            with engine.connect() as conn:
+                fresh.load(conn.execute(select(*_LOAD_COLUMNS)).all(), {}, 1)
+            return fresh
+        start = time.perf_counter()
+        reloaded = reload()
+        reload_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            rows = [r for q in catch_up_queries(snap) for r in conn.execute(q).all()]
+            assert snap.catch_up(rows, {}, 1)
+            assert conn.scalar(select(func.count()).select_from(LoanApplication)) == len(snap)
+        catch_up_s = time.perf_counter() - start
+        assert snap.values("status", snap.select()) == reloaded.values("status", reloaded.select())
+
+        print(f"  stale after {args.writes} + {args.writes} writes   reload {reload_s * 1000:8.1f} ms   "
+              f"catch-up {catch_up_s * 1000:8.1f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
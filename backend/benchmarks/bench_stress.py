@@ -0,0 +1,73 @@
+# backend/benchmarks/bench_stress.py
+"""
+Stress test throughput: every scenario over a synthetic portfolio held in
+numpy arrays (what POST /loans/stress-test runs after loading the loans),
+vs. calling compute_risk per loan per scenario on a sample.
+
+    cd backend
+    python benchmarks/bench_stress.py --loans 1000000 --scenarios 50
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import stress  # noqa: E402
+from app.services.risk import compute_risk  # noqa: E402
+
+
+def synthetic_portfolio(n: int) -> stress.PortfolioArrays:
+    rng = np.random.default_rng(42)
+    return stress.PortfolioArrays(
+        rng.integers(1_000, 500_000, n).astype(np.float64),
+        rng.integers(20_000, 300_000, n).astype(np.float64),
+        rng.integers(300, 851, n).astype(np.float64),
+        rng.choice([12, 24, 36, 60, 120, 360], n).astype(np.float64),
+    )
+
+
+def scenarios(count: int) -> list[stress.Scenario]:
+    return [
+        stress.Scenario(f"s{i}", credit_score_shift=-10 * (i % 10), income_change=-0.02 * (i // 10))
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--scenarios", type=int, default=50)
+    parser.add_argument("--loop-sample", type=int, default=20_000, help="loans timed for the per-loan loop")
+    args = parser.parse_args()
+
+    portfolio = synthetic_portfolio(args.loans)
+    scs = scenarios(args.scenarios)
+
+    start = time.perf_counter()
+    results = stress.run(portfolio, scs, 0.45)
+    vectorized = time.perf_counter() - start
+
+    sample = min(args.loop_sample, args.loans)
+    start = time.perf_counter()
+    for sc in scs:
+        for i in range(sample):
+            compute_risk(
+                portfolio.amount[i],
+                portfolio.income[i] * (1 + sc.income_change),
+                min(max(portfolio.credit_score[i] + sc.credit_score_shift, 300), 850),
+                portfolio.term_months[i],
+            )
+    loop = (time.perf_counter() - start) * args.loans / sample
+
+    print(f"{args.scenarios} scenarios x {args.loans} loans")
+    print(f"  batched arrays     {vectorized:8.2f} s")
+    print(f"  per-loan loop      {loop:8.2f} s (extrapolated from {sample} loans)")
+    worst = max(results, key=lambda r: r.expected_loss)
+    print(f"  worst scenario     {worst.name}: expected loss {worst.expected_loss:,.0f}, p99 {worst.loss_p99:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
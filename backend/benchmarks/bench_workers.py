@@ -0,0 +1,96 @@
+# backend/benchmarks/bench_workers.py
+"""
+Throughput vs. worker count for `python -m app.server`.
+
+Starts the pre-fork server with 1..N workers against a throwaway SQLite file and
+hammers POST /auth/login (pbkdf2 verify, i.e. CPU bound) from a thread pool.
+
+    cd backend
+    python benchmarks/bench_workers.py --max-workers 4 --seconds 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+USER = {"full_name": "Bench User", "email": "bench@example.com", "password": "secret123",
+        "confirm_password": "secret123", "role": "USER"}
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base}/docs", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _hammer(base: str, seconds: float, concurrency: int) -> int:
+    done = [0] * concurrency
+    stop_at = time.time() + seconds
+
+    def worker(i: int):
+        with httpx.Client(base_url=base, timeout=30.0) as c:
+            while time.time() < stop_at:
+                r = c.post("/auth/login", json={"email": USER["email"], "password": USER["password"]})
+                if r.status_code == 200:
+                    done[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(done)
+
+
+def run(workers: int, port: int, seconds: float, concurrency: int) -> float:
+    db_file = Path(tempfile.mkdtemp()) / "bench.db"
+    env = dict(os.environ,
+               WEB_CONCURRENCY=str(workers),
+               PORT=str(port),
+               SQL_ECHO="false",
+               LOGIN_THROTTLE_ENABLED="false",  # all requests come from one address
+               SQLALCHEMY_DATABASE_URL=f"sqlite:///{db_file.as_posix()}",
+               MONGODB_SERVER_SELECTION_TIMEOUT_MS="50")
+    proc = subprocess.Popen([sys.executable, "-m", "app.server"], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base)
+        httpx.post(f"{base}/auth/register", json=USER, timeout=30.0)
+        ok = _hammer(base, seconds, concurrency)
+        return ok / seconds
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    for n in range(1, args.max_workers + 1):
+        rps = run(n, args.port, args.seconds, args.concurrency)
+        baseline = baseline or rps
+        print(f"{n:>8} {rps:>10.1f} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
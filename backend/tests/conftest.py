@@ -19,6 +19,10 @@ TEST_DB_URL = f"sqlite:///{(BACKEND_DIR / TEST_DB_NAME).as_posix()}"
 
 # Set env var BEFORE importing the app so app.database reads it
 os.environ["SQLALCHEMY_DATABASE_URL"] = TEST_DB_URL
+# Audit logs go to the in-process Mongo stand-in
+os.environ["MONGODB_URL"] = "memory://"
+# Every test logs in from the same client address; tests/test_login_throttle.py turns it on
+os.environ["LOGIN_THROTTLE_ENABLED"] = "false"
 
 from app.main import app  # import after env override
 from app.database import Base, engine
@@ -0,0 +1,91 @@
+# backend/tests/test_amortization.py
+import numpy as np
+import pytest
+from fastapi import status
+
+from app.config import settings
+from app.services import amortization
+from tests.test_loans import _register_and_login
+
+
+def _loop_schedule(amount, annual_rate, term):
+    """
+    Month-by-month reference implementation.
+    """
+    r = annual_rate / 12
+    payment = amount / term if r == 0 else amount * r / (1 - (1 + r) ** -term)
+    balance, rows = amount, []
+    for _ in range(term):
+        interest = balance * r
+        balance = balance + interest - payment
+        rows.append((payment, payment - interest, interest, balance))
+    return payment, np.array(rows)
+
+
+@pytest.mark.parametrize("amount,rate,term", [(10000, 0.06, 12), (250000, 0.045, 360), (5000, 0.0, 24)])
+def test_schedule_matches_month_by_month(amount, rate, term):
+    s = amortization.schedule(amount, rate, term)
+    payment, rows = _loop_schedule(amount, rate, term)
+    assert s.monthly_payment == pytest.approx(payment)
+    assert np.allclose(s.payment, rows[:, 0])
+    assert np.allclose(s.principal, rows[:, 1])
+    assert np.allclose(s.interest, rows[:, 2])
+    assert np.allclose(s.balance, rows[:, 3], atol=1e-6)
+    assert s.principal.sum() == pytest.approx(amount)
+    assert s.total_interest == pytest.approx(rows[:, 2].sum())
+
+
+def test_schedule_cache_and_portfolio():
+    amortization.clear_cache()
+    first = amortization.schedule(10000, 0.06, 36)
+    assert amortization.schedule(10000.0, 0.06, 36) is first
+    assert amortization.cache_info().hits == 1
+    with pytest.raises(ValueError):
+        first.balance[0] = 0  # shared between callers
+
+    amounts, incomes, terms = [10000, 20000, 5000], [60000, 90000, 30000], [36, 36, 12]
+    p = amortization.portfolio(amounts, incomes, terms, 0.06)
+    singles = [amortization.schedule(a, 0.06, t) for a, t in zip(amounts, terms)]
+    assert np.allclose(p.monthly_payment, [s.monthly_payment for s in singles])
+    assert len(p.payment) == 36
+    assert p.payment[0] == pytest.approx(sum(s.payment[0] for s in singles))
+    assert p.payment[12] == pytest.approx(singles[0].payment[12] + singles[1].payment[12])
+    assert p.balance[-1] == pytest.approx(0, abs=1e-6)
+    assert np.allclose(p.payment_to_income, p.monthly_payment / (np.array(incomes) / 12))
+
+
+def test_schedule_endpoints(client):
+    headers = _register_and_login(client, "Schedule User", "scheduleuser@example.com", "secret123")
+    other = _register_and_login(client, "Schedule Other", "scheduleother@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Schedule Admin", "scheduleadmin@example.com", "secret123", role="ADMIN")
+    loan = client.post(
+        "/loans/", json={"amount": 12000, "income": 48000, "credit_score": 700, "term_months": 24}, headers=headers
+    ).json()
+
+    r = client.get(f"/loans/{loan['id']}/schedule", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert body["annual_rate"] == settings.ANNUAL_INTEREST_RATE
+    assert len(body["schedule"]) == 24
+    assert body["schedule"][-1]["month"] == 24 and body["schedule"][-1]["balance"] == 0
+    assert body["payment_to_income"] == pytest.approx(body["monthly_payment"] / 4000)
+
+    r = client.get(f"/loans/{loan['id']}/schedule", headers=headers, params={"annual_rate": 0})
+    assert r.json()["monthly_payment"] == pytest.approx(500)
+    assert client.get(f"/loans/{loan['id']}/schedule", headers=other).status_code == status.HTTP_404_NOT_FOUND
+    assert client.get(f"/loans/{loan['id']}/schedule", headers=admin_headers).status_code == status.HTTP_200_OK
+
+    r = client.get("/loans/portfolio/schedule", headers=admin_headers, params={"loan_id": [loan["id"]], "annual_rate": 0})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert body["loan_count"] == 1
+    assert body["loans"] == [{"loan_id": loan["id"], "monthly_payment": 500.0, "total_interest": 0.0,
+                              "payment_to_income": 0.125}]
+    assert len(body["cash_flow"]) == 24
+    assert client.get("/loans/portfolio/schedule", headers=headers).status_code == status.HTTP_403_FORBIDDEN
+
+    calc = client.get("/logs/user/calculations", headers=headers).json()["calculations"][0]
+    # Logged at the default rate for the risk model
+    assert calc["payment_to_income"] == pytest.approx(
+        amortization.schedule(12000, settings.ANNUAL_INTEREST_RATE, 24).monthly_payment / 4000
+    )
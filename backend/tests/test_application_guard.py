@@ -0,0 +1,122 @@
+# backend/tests/test_application_guard.py
+from fastapi import status
+
+from app.config import settings
+from app.services import application_guard
+from app.services.application_guard import ApplicationGuard, fingerprint
+from tests.test_loans import _register_and_login
+
+LOAN = {"amount": 12000, "income": 60000, "credit_score": 700, "term_months": 24}
+
+
+def test_duplicate_application_rejected(client):
+    headers = _register_and_login(client, "Dup User", "dupuser@example.com", "secret123")
+    assert client.post("/loans/", json=LOAN, headers=headers).status_code == status.HTTP_200_OK
+
+    r = client.post("/loans/", json=LOAN, headers=headers)
+    assert r.status_code == status.HTTP_409_CONFLICT, r.text
+    assert 0 < int(r.headers["retry-after"]) <= settings.DUPLICATE_WINDOW_SECONDS
+    assert len(client.get("/loans/my", headers=headers).json()) == 1
+
+    # Same numbers from another user are not a duplicate
+    other = _register_and_login(client, "Dup Other", "dupother@example.com", "secret123")
+    assert client.post("/loans/", json=LOAN, headers=other).status_code == status.HTTP_200_OK
+
+
+def test_velocity_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    monkeypatch.setattr(application_guard.guard, "velocity_max", 2)
+    headers = _register_and_login(client, "Fast User", "fastuser@example.com", "secret123")
+
+    for amount in (1000, 2000):
+        assert client.post("/loans/", json={**LOAN, "amount": amount}, headers=headers).status_code == status.HTTP_200_OK
+    r = client.post("/loans/", json={**LOAN, "amount": 3000}, headers=headers)
+    assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS, r.text
+    assert "retry-after" in r.headers
+
+
+def test_velocity_refusal_is_not_replayed(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    monkeypatch.setattr(application_guard.guard, "velocity_max", 1)
+    headers = _register_and_login(client, "Retry User", "retryuser@example.com", "secret123")
+    assert client.post("/loans/", json={**LOAN, "amount": 1000}, headers=headers).status_code == status.HTTP_200_OK
+
+    keyed = {**headers, "Idempotency-Key": "velocity-retry"}
+    r = client.post("/loans/", json={**LOAN, "amount": 2000}, headers=keyed)
+    assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS, r.text
+    assert "retry-after" in r.headers
+
+    # Once the window has passed, the same key goes through
+    application_guard.guard.clear()
+    r = client.post("/loans/", json={**LOAN, "amount": 2000}, headers=keyed)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert "idempotent-replayed" not in r.headers
+
+
+def test_flag_mode_accepts_and_marks_audit_event(client, monkeypatch):
+    monkeypatch.setattr(settings, "APPLICATION_GUARD_MODE", "flag")
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    headers = _register_and_login(client, "Flag User", "flaguser@example.com", "secret123")
+
+    for _ in range(2):
+        assert client.post("/loans/", json=LOAN, headers=headers).status_code == status.HTTP_200_OK
+    activities = client.get("/logs/user/activities", headers=headers).json()["activities"]
+    applied = [a["details"] for a in activities if a["action"] == "apply_loan"]
+    assert [d.get("flags") for d in applied] == [["duplicate"], None]
+
+
+def test_failed_application_is_not_counted(client):
+    headers = _register_and_login(client, "Limit User", "limituser@example.com", "secret123")
+    for amount in (1000, 2000):
+        client.post("/loans/", json={**LOAN, "amount": amount}, headers=headers)
+    # Over the pending-loan limit: refused, and the retry later isn't a "duplicate"
+    r = client.post("/loans/", json=LOAN, headers=headers)
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+    r = client.post("/loans/", json=LOAN, headers=headers)
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+
+
+def test_guard_windows_and_bounded_memory(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(application_guard.time, "monotonic", lambda: now[0])
+    guard = ApplicationGuard(duplicate_window=60, velocity_window=600, velocity_max=3, max_keys=4)
+
+    digest = fingerprint(1, 100, 1000, 700, 12)
+    assert guard.admit(1, digest, reject=True).flags == ()
+    rejected = guard.admit(1, digest, reject=True)
+    assert rejected.flags == (application_guard.DUPLICATE,) and rejected.retry_after == 61
+    now[0] += 61
+    assert guard.admit(1, digest, reject=True).flags == ()
+
+    # Velocity: two counted so far (the rejected duplicate isn't), the 4th is flagged
+    assert guard.admit(1, fingerprint(1, 200, 1000, 700, 12), reject=True).flags == ()
+    assert guard.admit(1, fingerprint(1, 300, 1000, 700, 12), reject=True).flags == (application_guard.VELOCITY,)
+
+    for user_id in range(2, 12):
+        guard.admit(user_id, fingerprint(user_id, 100, 1000, 700, 12), reject=True)
+    assert len(guard._recent) <= 4 and len(guard._users) <= 4
+
+
+def test_release_undoes_only_its_own_admission(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(application_guard.time, "monotonic", lambda: now[0])
+    guard = ApplicationGuard(duplicate_window=60, velocity_window=600, velocity_max=2, max_keys=10)
+
+    first = guard.admit(1, fingerprint(1, 100, 1000, 700, 12), reject=True)
+    now[0] += 1
+    second = guard.admit(1, fingerprint(1, 200, 1000, 700, 12), reject=True)
+    # The first request fails after the second was admitted
+    guard.release(first)
+    assert list(guard._users[1]) == [second.admitted_at]
+    assert guard.admit(1, fingerprint(1, 100, 1000, 700, 12), reject=True).flags == ()
+    assert guard.admit(1, fingerprint(1, 200, 1000, 700, 12), reject=True).flags == (
+        application_guard.DUPLICATE, application_guard.VELOCITY,
+    )
+
+    # Releasing a superseded duplicate keeps the newer sighting
+    digest = fingerprint(2, 100, 1000, 700, 12)
+    stale = guard.admit(2, digest, reject=False)
+    now[0] += 1
+    guard.admit(2, digest, reject=False)
+    guard.release(stale)
+    assert guard._recent[digest] == now[0]
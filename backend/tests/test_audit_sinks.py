@@ -0,0 +1,133 @@
+# backend/tests/test_audit_sinks.py
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import audit
+from app.services.audit_sqlite import SQLiteAuditSink
+from app.services.segment_store import SegmentStore, SegmentAuditSink
+from tests.test_loans import _register_and_login
+
+
+@pytest.fixture(params=["sqlite", "segment"])
+def sink_client(request, monkeypatch, tmp_path):
+    """
+    TestClient with the audit log on a local backend instead of Mongo.
+    """
+    monkeypatch.setattr(settings, "AUDIT_BACKEND", request.param)
+    monkeypatch.setattr(settings, "AUDIT_SQLITE_PATH", str(tmp_path / "audit.db"))
+    monkeypatch.setattr(settings, "AUDIT_SEGMENT_DIR", str(tmp_path / "segments"))
+    with TestClient(app) as c:
+        assert type(audit.get_sink()).__name__.lower().startswith(request.param)
+        yield c, request.param
+    # Lifespan shutdown closed the sink; the next test gets a fresh one
+
+
+def test_local_sink_pagination(sink_client):
+    client, backend = sink_client
+    headers = _register_and_login(client, "Sink Pager", f"sinkpager-{backend}@example.com", "secret123")
+    r = client.post("/logs/activities/batch", json=[{"action": f"event_{i}"} for i in range(5)], headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["before"] = cursor
+        r = client.get("/logs/user/activities", headers=headers, params=params)
+        assert r.status_code == status.HTTP_200_OK, r.text
+        seen += [a["action"] for a in r.json()["activities"]]
+        cursor = r.json()["next_cursor"]
+        if not cursor:
+            break
+    assert seen == ["event_4", "event_3", "event_2", "event_1", "event_0", "login"]
+
+    r = client.get("/logs/user/activities", headers=headers, params={"before": "2026-01-01T00:00:00|nope"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+
+
+def test_local_sink_calculations_and_stats(sink_client):
+    client, backend = sink_client
+    headers = _register_and_login(client, "Sink Stats", f"sinkstats-{backend}@example.com", "secret123")
+    r = client.post(
+        "/loans/",
+        json={"amount": 10000, "income": 50000, "credit_score": 750, "term_months": 12},
+        headers=headers
+    )
+    loan_id = r.json()["id"]
+
+    r = client.get("/logs/user/calculations", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    calc = r.json()["calculations"][0]
+    assert calc["loan_id"] == loan_id
+    assert calc["email"] == f"sinkstats-{backend}@example.com"
+
+    admin_headers = _register_and_login(client, "Sink Admin", f"sinkadmin-{backend}@example.com", "secret123", role="ADMIN")
+    r = client.get("/logs/stats", headers=admin_headers, params={"granularity": "hour"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    counts = Counter()
+    for b in r.json()["buckets"]:
+        counts[(b["action"], b["role"])] += b["count"]
+    assert counts[("apply_loan", "USER")] == 1
+    assert counts[("login", "ADMIN")] == 1
+
+
+def test_segment_rotation_and_reopen(tmp_path):
+    start = datetime(2026, 1, 1)
+    store = SegmentStore(tmp_path, max_bytes=512)
+    for i in range(30):
+        store.append([{"user_id": i % 3, "action": "ui_click", "details": {"n": i}, "timestamp": start + timedelta(seconds=i)}])
+    newest = [d["details"]["n"] for d in store.user_events(1, None, 5)]
+    store.close()
+    assert len(list(tmp_path.glob("*.seg"))) > 1
+
+    # Lose the tail of the active index; reopening rescans the segment
+    idx = sorted(tmp_path.glob("*.idx"))[-1]
+    idx.write_bytes(idx.read_bytes()[:-40])
+    store = SegmentStore(tmp_path, max_bytes=512)
+    assert [d["details"]["n"] for d in store.user_events(1, None, 5)] == newest == [28, 25, 22, 19, 16]
+    assert store.next_seq == 31
+    store.close()
+
+
+def test_segment_store_single_writer(tmp_path):
+    first = SegmentAuditSink(str(tmp_path), 1024)
+    with pytest.raises(RuntimeError):
+        SegmentAuditSink(str(tmp_path), 1024)
+    asyncio.run(first.close())
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "segment"])
+def test_local_sink_concurrent_writes(tmp_path, backend):
+    start = datetime(2026, 1, 1)
+
+    async def run():
+        if backend == "sqlite":
+            sink = SQLiteAuditSink(str(tmp_path / "audit.db"))
+        else:
+            sink = SegmentAuditSink(str(tmp_path), 1 << 20)
+        batches = [
+            [{"user_id": 7, "action": "ui_click", "details": {"b": b}, "timestamp": start + timedelta(seconds=i)}
+             for i in range(20)]
+            for b in range(10)
+        ]
+        ids = await asyncio.gather(*(sink.insert("activities", batch) for batch in batches))
+        await asyncio.gather(*(sink.bump_rollups({("hour", start, "ui_click", "USER"): 1}) for _ in range(10)))
+        events = await sink.user_events("activities", 7, None, 500, ("details",))
+        rollups = await sink.read_rollups("hour", start, start + timedelta(days=1))
+        await sink.close()
+        return ids, events, rollups
+
+    ids, events, rollups = asyncio.run(run())
+    # Each batch was written without another one interleaving
+    for batch_ids in ids:
+        seqs = [int(i) for i in batch_ids]
+        assert seqs == list(range(seqs[0], seqs[0] + 20))
+    assert len(events) == 200
+    assert [r["count"] for r in rollups] == [10]
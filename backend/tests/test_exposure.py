@@ -0,0 +1,128 @@
+# backend/tests/test_exposure.py
+from fastapi import status
+from sqlalchemy import delete, insert, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models import LoanApplication, User, UserExposure
+from app.services import exposure
+from tests.test_loans import _register_and_login
+
+
+def _apply(client, headers, amount):
+    return client.post(
+        "/loans/",
+        json={"amount": amount, "income": 80000, "credit_score": 720, "term_months": 24},
+        headers=headers
+    )
+
+
+def test_pending_count_limit_and_summary(client):
+    headers = _register_and_login(client, "Exposure User", "exposure@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Exposure Admin", "exposureadmin@example.com", "secret123", role="ADMIN")
+
+    r = client.get("/loans/my/summary", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.json() == {"pending_count": 0, "pending_total": 0.0, "approved_total": 0.0,
+                        "max_pending_loans": settings.MAX_PENDING_LOANS, "max_pending_amount": None}
+
+    first = _apply(client, headers, 10000).json()["id"]
+    second = _apply(client, headers, 5000).json()["id"]
+    r = _apply(client, headers, 1000)
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+    assert "Exposure limit" in r.json()["detail"]
+    assert len(client.get("/loans/my", headers=headers).json()) == 2
+
+    client.post(f"/loans/{first}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+    client.post(f"/loans/{second}/decision", json={"action": "REJECTED"}, headers=admin_headers)
+    # Re-deciding doesn't move the totals again
+    r = client.post(f"/loans/{first}/decision", json={"action": "REJECTED"}, headers=admin_headers)
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    summary = client.get("/loans/my/summary", headers=headers).json()
+    assert (summary["pending_count"], summary["pending_total"], summary["approved_total"]) == (0, 0.0, 10000.0)
+
+    # Room again
+    assert _apply(client, headers, 1000).status_code == status.HTTP_200_OK
+
+
+def test_pending_amount_cap(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    monkeypatch.setattr(settings, "MAX_PENDING_AMOUNT", 50000)
+    headers = _register_and_login(client, "Exposure Cap", "exposurecap@example.com", "secret123")
+
+    assert _apply(client, headers, 30000).status_code == status.HTTP_200_OK
+    assert _apply(client, headers, 20000).status_code == status.HTTP_200_OK
+    assert _apply(client, headers, 1).status_code == status.HTTP_400_BAD_REQUEST
+    summary = client.get("/loans/my/summary", headers=headers).json()
+    assert summary["pending_total"] == 50000.0
+    assert summary["max_pending_loans"] is None
+    assert summary["max_pending_amount"] == 50000
+
+
+def test_missing_aggregate_is_rebuilt_from_loans(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 3)
+    headers = _register_and_login(client, "Exposure Legacy", "exposurelegacy@example.com", "secret123")
+    user_id = _apply(client, headers, 7000).json()["user_id"]
+    _apply(client, headers, 3000)
+
+    # As if the loans predate the user_exposure table
+    with SessionLocal() as db:
+        db.execute(delete(UserExposure).where(UserExposure.user_id == user_id))
+        db.commit()
+
+    assert _apply(client, headers, 2000).status_code == status.HTTP_200_OK
+    assert _apply(client, headers, 1000).status_code == status.HTTP_400_BAD_REQUEST
+    summary = client.get("/loans/my/summary", headers=headers).json()
+    assert (summary["pending_count"], summary["pending_total"]) == (3, 12000.0)
+
+
+def test_reserve_after_losing_the_row_creation_race(client):
+    _register_and_login(client, "Race User", "exposurerace@example.com", "secret123")
+    with SessionLocal() as db:
+        user_id = db.execute(select(User.id).where(User.email == "exposurerace@example.com")).scalar_one()
+        db.execute(delete(UserExposure).where(UserExposure.user_id == user_id))
+        db.commit()
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            real_get = db.get
+            first_get = True
+
+            async def racing_get(model, ident, **kw):
+                nonlocal first_get
+                if model is UserExposure and first_get:
+                    # Another request inserts the row right after we looked for it
+                    first_get = False
+                    await db.execute(insert(UserExposure).values(
+                        user_id=ident, pending_count=0, pending_total=0.0, approved_total=0.0,
+                    ))
+                    return None
+                return await real_get(model, ident, **kw)
+
+            db.get = racing_get
+            await exposure.reserve(db, user_id, 500.0)
+            await db.commit()
+
+    client.portal.call(scenario)
+    with SessionLocal() as db:
+        row = db.get(UserExposure, user_id)
+        assert (row.pending_count, row.pending_total) == (1, 500.0)
+
+
+def test_summary_without_aggregate_row(client):
+    headers = _register_and_login(client, "Presummary User", "exposurepresummary@example.com", "secret123")
+    with SessionLocal() as db:
+        user_id = db.execute(select(User.id).where(User.email == "exposurepresummary@example.com")).scalar_one()
+        # Loans written before user_exposure existed
+        db.add_all([
+            LoanApplication(user_id=user_id, amount=amount, income=50000, credit_score=700, term_months=12,
+                            status=loan_status, risk_score=0.2)
+            for amount, loan_status in ((3000, "PENDING"), (2000, "PENDING"), (7000, "APPROVED"))
+        ])
+        db.commit()
+        assert db.get(UserExposure, user_id) is None
+
+    r = client.get("/loans/my/summary", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert (body["pending_count"], body["pending_total"], body["approved_total"]) == (2, 5000.0, 7000.0)
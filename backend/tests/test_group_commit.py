@@ -0,0 +1,101 @@
+# backend/tests/test_group_commit.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.services import group_commit, response_cache
+from tests.test_loans import _register_and_login
+
+
+def test_coalescer_commits_concurrent_writes_once(client):
+    coalescer = group_commit.WriteCoalescer(window_seconds=0.05, max_batch=10)
+
+    async def bump(db):
+        return await response_cache.bump_version(db)
+
+    async def bump_then_fail(db):
+        await response_cache.bump_version(db)
+        raise ValueError("rejected")
+
+    async def scenario():
+        runner = asyncio.create_task(coalescer.run())
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            *(coalescer.submit(w) for w in (bump, bump_then_fail, bump, bump)), return_exceptions=True
+        )
+        runner.cancel()
+        return results
+
+    async def version():
+        async with AsyncSessionLocal() as db:
+            return await response_cache.current_version(db)
+
+    start = client.portal.call(version)
+    first, failed, *rest = client.portal.call(scenario)
+    assert isinstance(failed, ValueError)
+    # One version per successful write; the failed one's savepoint was rolled back
+    assert [first, *rest] == [start + 1, start + 2, start + 3]
+    assert client.portal.call(version) == start + 3
+    assert (coalescer.batches, coalescer.writes) == (1, 3)
+    assert not coalescer.running
+
+
+def test_apply_loan_with_group_commit(monkeypatch):
+    monkeypatch.setattr(settings, "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 2)
+    monkeypatch.setattr(group_commit.coalescer, "window_seconds", 0.05)
+    with TestClient(app) as client:
+        assert group_commit.coalescer.running
+        users = [
+            _register_and_login(client, f"Batch User {i}", f"batchuser{i}@example.com", "secret123") for i in range(4)
+        ]
+        batches = group_commit.coalescer.batches
+        payload = {"amount": 5000, "income": 80000, "credit_score": 700, "term_months": 36}
+
+        def apply(i):
+            return client.post("/loans/", json={**payload, "amount": 5000 + i}, headers=users[i % 4])
+
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            responses = list(pool.map(apply, range(12)))
+
+        ok = [r.json() for r in responses if r.status_code == status.HTTP_200_OK]
+        limited = [r for r in responses if r.status_code == status.HTTP_400_BAD_REQUEST]
+        # Two per user fit under MAX_PENDING_LOANS; the rest hit the exposure limit on their own
+        assert len(ok) == 8 and len(limited) == 4
+        assert all("Exposure limit" in r.json()["detail"] for r in limited)
+        assert len({loan["id"] for loan in ok}) == 8
+        assert group_commit.coalescer.batches - batches < 12
+
+        r = client.get("/loans/my", headers=users[0])
+        assert len(r.json()) == 2
+    assert not group_commit.coalescer.running
+
+
+def test_cancelled_coalescer_fails_in_flight_batch(client):
+    coalescer = group_commit.WriteCoalescer(window_seconds=0.01, max_batch=10)
+    started = None
+
+    async def slow(db):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def scenario():
+        nonlocal started
+        started = asyncio.Event()
+        runner = asyncio.create_task(coalescer.run())
+        await asyncio.sleep(0)
+        writes = [asyncio.create_task(coalescer.submit(slow)) for _ in range(2)]
+        await started.wait()
+        late = asyncio.create_task(coalescer.submit(slow))
+        await asyncio.sleep(0)
+        runner.cancel()
+        return await asyncio.wait_for(asyncio.gather(*writes, late, return_exceptions=True), 2)
+
+    results = client.portal.call(scenario)
+    assert len(results) == 3 and all(isinstance(r, RuntimeError) for r in results)
+    assert not coalescer.running
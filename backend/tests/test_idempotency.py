@@ -0,0 +1,117 @@
+# backend/tests/test_idempotency.py
+import asyncio
+
+import httpx
+from fastapi import status
+
+from app.main import app
+from app.services import idempotency
+from app.services.idempotency import IdempotencyStore
+from tests.test_loans import _register_and_login
+
+LOAN = {"amount": 25000, "income": 90000, "credit_score": 705, "term_months": 36}
+
+
+def _apply_count(client, headers) -> int:
+    r = client.get("/logs/user/activities", headers=headers, params={"fields": "action"})
+    return sum(a["action"] == "apply_loan" for a in r.json()["activities"])
+
+
+def test_apply_loan_replay(client):
+    headers = _register_and_login(client, "Idem User", "idemuser@example.com", "secret123")
+    keyed = {**headers, "Idempotency-Key": "apply-1"}
+
+    first = client.post("/loans/", json=LOAN, headers=keyed)
+    assert first.status_code == status.HTTP_200_OK, first.text
+    assert "idempotent-replayed" not in first.headers
+    retry = client.post("/loans/", json=LOAN, headers=keyed)
+    assert retry.status_code == status.HTTP_200_OK, retry.text
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.content == first.content
+
+    assert len(client.get("/loans/my", headers=headers).json()) == 1
+    assert _apply_count(client, headers) == 1
+
+    # Same key, different body
+    r = client.post("/loans/", json={**LOAN, "amount": 1}, headers=keyed)
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, r.text
+    # Keys are per user
+    other = _register_and_login(client, "Idem Other", "idemother@example.com", "secret123")
+    r = client.post("/loans/", json=LOAN, headers={**other, "Idempotency-Key": "apply-1"})
+    assert r.status_code == status.HTTP_200_OK
+    assert r.json()["id"] != first.json()["id"]
+
+
+def test_concurrent_duplicates_are_coalesced(client):
+    headers = _register_and_login(client, "Idem Storm", "idemstorm@example.com", "secret123")
+    keyed = {**headers, "Idempotency-Key": "storm-1"}
+
+    async def storm():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post("/loans/", json=LOAN, headers=keyed) for _ in range(5)))
+
+    responses = client.portal.call(storm)
+    assert all(r.status_code == status.HTTP_200_OK for r in responses)
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum("idempotent-replayed" not in r.headers for r in responses) == 1
+    assert len(client.get("/loans/my", headers=headers).json()) == 1
+
+
+def test_decision_and_auth_replay(client):
+    user_headers = _register_and_login(client, "Idem Dec User", "idemdecuser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Idem Dec Admin", "idemdecadmin@example.com", "secret123", role="ADMIN")
+    loan_id = client.post("/loans/", json=LOAN, headers=user_headers).json()["id"]
+
+    keyed = {**admin_headers, "Idempotency-Key": "decide-1"}
+    first = client.post(f"/loans/{loan_id}/decision", json={"action": "APPROVED"}, headers=keyed)
+    retry = client.post(f"/loans/{loan_id}/decision", json={"action": "APPROVED"}, headers=keyed)
+    # The retry gets the original result, not "Loan already APPROVED"
+    assert retry.status_code == status.HTTP_200_OK, retry.text
+    assert retry.json() == first.json()
+    r = client.post(f"/loans/{loan_id}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Register: a retried request isn't "Email already registered"
+    body = {"full_name": "Idem Reg", "email": "idemreg@example.com", "password": "secret123",
+            "confirm_password": "secret123", "role": "USER"}
+    first = client.post("/auth/register", json=body, headers={"Idempotency-Key": "reg-1"})
+    retry = client.post("/auth/register", json=body, headers={"Idempotency-Key": "reg-1"})
+    assert first.status_code == retry.status_code == status.HTTP_200_OK, retry.text
+    assert retry.json() == first.json()
+
+    # Another client registering a different email may pick the same key
+    other = {**body, "email": "idemreg2@example.com"}
+    r = client.post("/auth/register", json=other, headers={"Idempotency-Key": "reg-1"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert "idempotent-replayed" not in r.headers
+
+    r = client.post("/auth/register", json=other, headers={"Idempotency-Key": "x" * 300})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Login isn't keyed: each call issues a fresh token and nothing is stored
+    login = {"email": "idemreg@example.com", "password": "secret123"}
+    r = client.post("/auth/login", json=login, headers={"Idempotency-Key": "login-1"})
+    assert r.status_code == status.HTTP_200_OK and "idempotent-replayed" not in r.headers
+    r = client.post("/auth/login", json=login, headers={"Idempotency-Key": "login-1"})
+    assert r.status_code == status.HTTP_200_OK and "idempotent-replayed" not in r.headers
+
+
+def test_store_ttl_and_bound(monkeypatch):
+    async def run():
+        clock = [0.0]
+        monkeypatch.setattr(idempotency.time, "monotonic", lambda: clock[0])
+        store = IdempotencyStore(ttl_seconds=10, max_keys=3)
+        for i in range(5):
+            entry, owner = store.claim(("k", i), b"fp")
+            assert owner
+            store.complete(entry, 200, b"{}")
+        # Bounded: only the 3 newest keys remain
+        assert len(store) == 3
+        assert store.claim(("k", 4), b"fp")[1] is False
+        clock[0] = 11
+        # Expired keys are dropped and can be reused
+        assert store.claim(("k", 4), b"fp")[1] is True
+        assert len(store) == 1
+
+    asyncio.run(run())
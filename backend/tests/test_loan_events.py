@@ -0,0 +1,87 @@
+# backend/tests/test_loan_events.py
+import json
+
+from fastapi import status
+
+from app.config import settings
+from app.services import loan_events, loan_snapshot
+from app.services.loan_events import LoanEventBroadcaster
+from tests.test_loans import _register_and_login
+
+
+def _parse_sse(body: str) -> list[dict]:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append({"id": fields["id"], "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+def test_broadcaster_resume_and_reset():
+    b = LoanEventBroadcaster(buffer_size=3, queue_size=10)
+    ids = [b.publish(loan_events.LOAN_CREATED, {"n": i}).id for i in range(5)]
+
+    # Resume after the 3rd event: the 4th and 5th are replayed
+    _, first = b.subscribe(ids[2])
+    assert [e.data["n"] for e in first] == [3, 4]
+    # Up to date: nothing to replay
+    _, first = b.subscribe(ids[4])
+    assert first == []
+    # The 2nd event was evicted, so resuming after the 1st can't be served; unknown epoch and garbage ids reset too
+    for stale in (ids[0], "deadbeef-1", "nope"):
+        _, first = b.subscribe(stale)
+        assert [e.type for e in first] == [loan_events.RESET]
+        assert first[0].id == ids[4]
+    # A fresh subscriber learns the current id
+    sub, first = b.subscribe()
+    assert [(e.type, e.id) for e in first] == [(loan_events.READY, ids[4])]
+
+    event = b.publish(loan_events.LOAN_DECIDED, {"n": 5})
+    assert sub.queue.get_nowait() == event
+
+
+def test_broadcaster_drops_slow_subscriber():
+    b = LoanEventBroadcaster(buffer_size=10, queue_size=2)
+    sub, _ = b.subscribe()
+    for i in range(3):
+        b.publish(loan_events.LOAN_CREATED, {"n": i})
+    # Queue overflowed: stream ends and the client resumes from its last id
+    assert sub.queue.get_nowait() is None
+    assert sub not in b._subscribers
+
+
+def test_loan_event_stream_resumes_from_last_event_id(client, monkeypatch):
+    monkeypatch.setattr(settings, "LOAN_EVENTS_MAX_STREAM_SECONDS", 0.2)
+    admin_headers = _register_and_login(client, "Event Admin", "eventadmin@example.com", "secret123", role="ADMIN")
+    user_headers = _register_and_login(client, "Event User", "eventuser@example.com", "secret123")
+
+    r = client.get("/loans/events", headers=admin_headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.headers["content-type"].startswith("text/event-stream")
+    ready = _parse_sse(r.text)
+    assert [e["event"] for e in ready] == ["ready"]
+
+    r = client.post(
+        "/loans/",
+        json={"amount": 20000, "income": 80000, "credit_score": 720, "term_months": 36},
+        headers=user_headers
+    )
+    loan_id = r.json()["id"]
+    # Applicant not in the snapshot (e.g. it is being reloaded): looked up instead
+    monkeypatch.setattr(loan_snapshot.snapshot, "users", {})
+    client.post(f"/loans/{loan_id}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+
+    # Reconnect from the ready id: both deltas are replayed in order
+    r = client.get("/loans/events", headers={**admin_headers, "Last-Event-ID": ready[0]["id"]})
+    events = [e for e in _parse_sse(r.text) if e["data"]["loan"]["id"] == loan_id]
+    assert [e["event"] for e in events] == ["loan_created", "loan_decided"]
+    assert events[0]["data"]["loan"]["user_email"] == "eventuser@example.com"
+    assert events[0]["data"]["loan"]["status"] == "PENDING"
+    assert events[1]["data"]["loan"]["status"] == "APPROVED"
+    # Decisions carry the applicant too, as loan_created does
+    assert events[1]["data"]["loan"]["user_email"] == "eventuser@example.com"
+    assert events[1]["data"]["loan"]["user_name"] == events[0]["data"]["loan"]["user_name"]
+
+    r = client.get("/loans/events", headers=user_headers)
+    assert r.status_code == status.HTTP_403_FORBIDDEN, r.text
@@ -0,0 +1,149 @@
+# backend/tests/test_loan_snapshot.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import status
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import DataVersion, LoanApplication, LoanStatusHistory, User
+from app.services import loan_snapshot
+from app.services.loan_snapshot import LoanSnapshot
+from tests.test_loans import _register_and_login
+
+T0 = datetime(2026, 1, 1)
+ROWS = [
+    (3, 1, 5000.0, 40000.0, 700, 12, "PENDING", 0.3, T0, None),
+    (1, 1, 20000.0, 90000.0, 650, 36, "APPROVED", 0.4, None, None),
+    (2, 2, 1000.0, 30000.0, 800, 24, "REJECTED", 0.1, T0, T0 + timedelta(hours=5)),
+]
+
+
+def test_select_insert_and_staleness():
+    snap = LoanSnapshot()
+    snap.load(ROWS, {1: ("a@example.com", "A"), 2: ("b@example.com", "B")}, version=10)
+    assert snap.column("id").tolist() == [1, 2, 3]
+    assert snap.column("credit_score").dtype.itemsize == 2
+
+    positions = snap.select(ranges={"amount": (1000, 10000)}, sort="risk_score", descending=True)
+    assert snap.values("id", positions) == [3, 2]
+    positions = snap.select(status="APPROVED")
+    assert snap.values("user_email", positions) == ["a@example.com"]
+    row = snap.row(3)
+    assert (row.id, row.status, row.risk_score, row.created_at, row.decided_at) == (3, "PENDING", 0.3, T0, None)
+    with pytest.raises(AttributeError):
+        row.nope
+
+    # Local writes in version order keep it current (and grow the arrays)
+    for i in range(20):
+        loan = SimpleNamespace(id=4 + i, user_id=2, amount=1.0, income=2.0, credit_score=700,
+                               term_months=12, status="PENDING", risk_score=0.2, created_at=T0, decided_at=None)
+        snap.inserted(loan, "b@example.com", "B", version=11 + i)
+    snap.decided(1, "REJECTED", T0, version=31)
+    assert len(snap) == 23 and snap.version == 31
+    assert (snap.row(1).status, snap.row(1).decided_at) == ("REJECTED", T0)
+    assert snap.values("decided_at", snap.select(sort="id", descending=False))[:3] == [T0, T0 + timedelta(hours=5), None]
+
+    # A write from elsewhere in between: stale until reloaded
+    snap.decided(3, "APPROVED", T0, version=33)
+    assert snap.version is None
+
+
+def test_catch_up_merges_rows():
+    snap = LoanSnapshot()
+    snap.load(ROWS, {1: ("a@example.com", "A"), 2: ("b@example.com", "B")}, version=10)
+    assert snap.last_id == 3
+    assert snap.decided_through() == T0 + timedelta(hours=5)
+
+    changed = [
+        (5, 3, 700.0, 10000.0, 600, 12, "PENDING", 0.6, T0, None),
+        (3, 1, 5000.0, 40000.0, 700, 12, "APPROVED", 0.3, T0, T0 + timedelta(hours=6)),
+        (4, 2, 900.0, 20000.0, 720, 24, "PENDING", 0.2, T0, None),
+    ]
+    assert snap.catch_up(changed, {3: ("c@example.com", "C")}, version=13)
+    assert snap.column("id").tolist() == [1, 2, 3, 4, 5] and snap.version == 13
+    assert (snap.row(3).status, snap.row(3).decided_at) == ("APPROVED", T0 + timedelta(hours=6))
+    assert snap.values("user_email", snap.select(sort="id"))[0] == "c@example.com"
+    assert snap.decided_through() == T0 + timedelta(hours=6)
+
+    # An id below the newest that the snapshot never saw can't be merged
+    snap.load(ROWS[:1], {}, version=20)
+    assert not snap.catch_up([ROWS[2]], {}, version=21)
+    assert snap.version is None
+
+
+def test_all_loans_filters_and_sorts(client, monkeypatch):
+    headers = _register_and_login(client, "Snap User", "snapuser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Snap Admin", "snapadmin@example.com", "secret123", role="ADMIN")
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    for amount, score in ((4000, 780), (15000, 640), (60000, 560)):
+        client.post("/loans/", json={"amount": amount, "income": 70000, "credit_score": score, "term_months": 24},
+                    headers=headers)
+    first = client.get("/loans/my", headers=headers).json()[-1]
+    client.post(f"/loans/{first['id']}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+    # Local writes kept it current: no reload needed
+    assert loan_snapshot.snapshot.version is not None
+
+    queries = [
+        {"min_amount": 4000, "max_amount": 20000, "sort": "-credit_score"},
+        {"min_credit_score": 600, "max_risk": 0.5, "sort": "amount"},
+        {"status_filter": "APPROVED", "sort": "status"},
+        {"sort": "-risk_score", "fields": "id,user_email,risk_percentile"},
+    ]
+    for params in queries:
+        r = client.get("/loans/all", headers=admin_headers, params=params)
+        assert r.status_code == status.HTTP_200_OK, r.text
+        from_snapshot = r.json()
+        monkeypatch.setattr(settings, "LOAN_SNAPSHOT_ENABLED", False)
+        assert client.get("/loans/all", headers=admin_headers, params=params).json() == from_snapshot
+        monkeypatch.setattr(settings, "LOAN_SNAPSHOT_ENABLED", True)
+
+    mine = [l for l in from_snapshot if l["user_email"] == "snapuser@example.com"]
+    assert len(mine) == 3
+    r = client.get("/loans/all", headers=admin_headers, params={"sort": "password"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_snapshot_reloads_after_foreign_write(client):
+    admin_headers = _register_and_login(client, "Snap Admin2", "snapadmin2@example.com", "secret123", role="ADMIN")
+    client.get("/loans/all", headers=admin_headers)
+    # Another worker's write: only the shared version moves
+    with SessionLocal() as db:
+        db.execute(update(DataVersion).values(version=DataVersion.version + 1))
+        db.commit()
+    client.get("/loans/all", headers=admin_headers)
+    with SessionLocal() as db:
+        assert loan_snapshot.snapshot.version == db.query(DataVersion.version).scalar()
+
+
+def test_snapshot_catches_up_without_reloading(client, monkeypatch):
+    headers = _register_and_login(client, "Snap User3", "snapuser3@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Snap Admin3", "snapadmin3@example.com", "secret123", role="ADMIN")
+    client.post("/loans/", json={"amount": 3000, "income": 50000, "credit_score": 720, "term_months": 12},
+                headers=headers)
+    client.get("/loans/all", headers=admin_headers)
+    loads = []
+    monkeypatch.setattr(LoanSnapshot, "load", lambda self, *args: loads.append(args))
+
+    # Another worker inserts one loan and decides another
+    with SessionLocal() as db:
+        user_id = db.scalar(select(User.id).where(User.email == "snapuser3@example.com"))
+        pending = db.scalar(select(LoanApplication.id).where(LoanApplication.user_id == user_id))
+        loan = LoanApplication(user_id=user_id, amount=8000, income=50000, credit_score=690, term_months=24,
+                               status="PENDING", risk_score=0.4, created_at=datetime.utcnow())
+        db.add(loan)
+        db.flush()
+        db.add(LoanStatusHistory(loan_id=loan.id, status="PENDING", valid_from=loan.created_at, changed_by=user_id))
+        db.execute(update(LoanApplication).where(LoanApplication.id == pending)
+                   .values(status="REJECTED", decided_at=datetime.utcnow()))
+        db.execute(update(DataVersion).values(version=DataVersion.version + 1))
+        db.commit()
+
+    from_snapshot = client.get("/loans/all", headers=admin_headers).json()
+    assert loads == []
+    mine = {l["id"]: l["status"] for l in from_snapshot if l["user_email"] == "snapuser3@example.com"}
+    assert sorted(mine.values()) == ["PENDING", "REJECTED"] and mine[pending] == "REJECTED"
+    monkeypatch.setattr(settings, "LOAN_SNAPSHOT_ENABLED", False)
+    assert client.get("/loans/all", headers=admin_headers).json() == from_snapshot
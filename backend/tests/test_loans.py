@@ -2,6 +2,9 @@
 # backend/tests/test_loans.py
 from fastapi import status
 from typing import Dict
+from sqlalchemy import event
+
+from app.database import async_engine
 
 def _register_and_login(client, full_name: str, email: str, password: str, role: str = "USER") -> Dict[str, str]:
     """
@@ -113,3 +116,49 @@ def test_security_unauthorized_forbidden(client):
     user_headers = _register_and_login(client, "User C", "userc@example.com", "secret123", role="USER")
     r = client.get("/loans/pending", headers=user_headers)
     assert r.status_code == status.HTTP_403_FORBIDDEN, r.text
+
+
+def test_admin_all_loans_includes_applicant(client):
+    user_headers = _register_and_login(client, "User D", "userd@example.com", "secret123", role="USER")
+    r = client.post(
+        "/loans/",
+        json={"amount": 15000, "income": 40000, "credit_score": 710, "term_months": 36},
+        headers=user_headers
+    )
+    assert r.status_code == status.HTTP_200_OK, r.text
+    loan_id = r.json()["id"]
+
+    admin_headers = _register_and_login(client, "Admin Two", "admin2@example.com", "secret123", role="ADMIN")
+    r = client.get("/loans/all", headers=admin_headers, params={"status_filter": "PENDING"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    row = next(it for it in r.json() if it["id"] == loan_id)
+    assert row["user_email"] == "userd@example.com"
+    assert row["user_name"] == "User D"
+
+
+def test_apply_writes_loan_in_one_round_trip(client):
+    user_headers = _register_and_login(client, "User E", "usere@example.com", "secret123", role="USER")
+    payload = {"amount": 12000, "income": 60000, "credit_score": 700, "term_months": 24}
+    # The first application also creates the user's exposure row
+    assert client.post("/loans/", json=payload, headers=user_headers).status_code == status.HTTP_200_OK
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        r = client.post("/loans/", json={**payload, "amount": 13000}, headers=user_headers)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.json()["id"] and r.json()["created_at"] and r.json()["risk_score"] > 0
+
+    loan_statements = [s for s in statements if "loan_applications" in s]
+    assert len(loan_statements) == 1, loan_statements
+    assert loan_statements[0].startswith("INSERT INTO loan_applications") and "RETURNING" in loan_statements[0]
+    # Nothing is read back: the only SELECT is the token's user lookup
+    assert [s for s in statements if s.startswith("SELECT")] == [
+        s for s in statements if s.startswith("SELECT") and "FROM users" in s
+    ]
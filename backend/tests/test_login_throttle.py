@@ -0,0 +1,55 @@
+# backend/tests/test_login_throttle.py
+import pytest
+from fastapi import status
+
+from app.config import settings
+from app.services import login_throttle
+from app.services.login_throttle import LoginThrottle, TokenBuckets
+from tests.test_loans import _register_and_login
+
+
+def test_token_bucket_refill_and_lru_bound():
+    buckets = TokenBuckets(burst=2, per_minute=60, max_keys=2)
+    assert buckets.take("a", now=0.0) is None
+    assert buckets.take("a", now=0.0) is None
+    assert buckets.take("a", now=0.0) == pytest.approx(1.0)
+    # One token per second
+    assert buckets.take("a", now=1.5) is None
+    assert buckets.take("a", now=1.5) == pytest.approx(0.5)
+
+    buckets.take("b", now=2.0)
+    buckets.take("c", now=2.0)
+    assert len(buckets) == 2
+    # "a" was least recently used, so it was dropped and starts full again
+    assert buckets.take("a", now=2.0) is None
+
+
+def test_login_throttled_per_email_and_ip(client, monkeypatch):
+    admin_headers = _register_and_login(client, "Throttle Admin", "throttleadmin@example.com", "secret123", role="ADMIN")
+    monkeypatch.setattr(settings, "LOGIN_THROTTLE_ENABLED", True)
+    monkeypatch.setattr(login_throttle, "throttle", LoginThrottle(
+        TokenBuckets(burst=6, per_minute=1, max_keys=100), TokenBuckets(burst=2, per_minute=1, max_keys=100),
+    ))
+
+    wrong = {"email": "Throttle.Target@example.com", "password": "wrong-password"}
+    for _ in range(2):
+        assert client.post("/auth/login", json=wrong).status_code == status.HTTP_401_UNAUTHORIZED
+    # Same email in another case counts against the same bucket
+    r = client.post("/auth/login", json={**wrong, "email": "throttle.target@example.com"})
+    assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 0 < int(r.headers["Retry-After"]) <= 60
+    assert "account" in r.json()["detail"]
+
+    # Other emails from the same address until the address runs out
+    r = client.post("/auth/login", json={"email": "throttleadmin@example.com", "password": "secret123"})
+    assert r.status_code == status.HTTP_200_OK
+    for i in range(2):
+        assert client.post("/auth/login", json={**wrong, "email": f"other{i}@example.com"}).status_code == 401
+    r = client.post("/auth/login", json={"email": "throttleadmin@example.com", "password": "secret123"})
+    assert r.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "address" in r.json()["detail"] and int(r.headers["Retry-After"]) > 0
+
+    stats = client.get("/auth/login-throttle", headers=admin_headers).json()
+    assert stats == {
+        "enabled": True, "allowed": 5, "throttled_ip": 1, "throttled_email": 1, "tracked_ips": 1, "tracked_emails": 4,
+    }
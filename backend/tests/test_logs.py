@@ -0,0 +1,159 @@
+# backend/tests/test_logs.py
+from collections import Counter
+from fastapi import status
+from tests.test_loans import _register_and_login
+
+
+def test_login_and_apply_are_audited(client):
+    headers = _register_and_login(client, "Log User", "loguser@example.com", "secret123")
+    r = client.post(
+        "/loans/",
+        json={"amount": 30000, "income": 60000, "credit_score": 700, "term_months": 24},
+        headers=headers
+    )
+    assert r.status_code == status.HTTP_200_OK, r.text
+    loan_id = r.json()["id"]
+
+    r = client.get("/logs/user/activities", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    actions = [a["action"] for a in r.json()["activities"]]
+    # Newest first
+    assert actions[:2] == ["apply_loan", "login"]
+
+    r = client.get("/logs/user/calculations", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    calcs = r.json()["calculations"]
+    assert calcs[0]["loan_id"] == loan_id
+    assert set(calcs[0]) <= {
+        "_id", "user_id", "email", "full_name", "loan_id", "amount", "income", "credit_score",
+        "term_months", "debt_ratio", "credit_factor", "term_factor", "risk_score", "payment_to_income",
+        "timestamp", "action",
+    }
+
+
+def test_log_activity_endpoint(client):
+    headers = _register_and_login(client, "Log User Two", "loguser2@example.com", "secret123")
+    r = client.post("/logs/activity", json={"action": "view_dashboard", "details": {"tab": "pending"}}, headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.json()["success"] is True
+
+    r = client.get("/logs/user/activities", headers=headers)
+    latest = r.json()["activities"][0]
+    assert latest["action"] == "view_dashboard"
+    assert latest["details"] == {"tab": "pending"}
+
+
+def test_activities_cursor_pagination(client):
+    headers = _register_and_login(client, "Pager", "pager@example.com", "secret123")
+    for i in range(5):
+        r = client.post("/logs/activity", json={"action": f"event_{i}"}, headers=headers)
+        assert r.status_code == status.HTTP_200_OK, r.text
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["before"] = cursor
+        r = client.get("/logs/user/activities", headers=headers, params=params)
+        assert r.status_code == status.HTTP_200_OK, r.text
+        body = r.json()
+        assert body["count"] <= 2
+        seen += [a["action"] for a in body["activities"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    # 5 events + login, newest first, no duplicates or gaps
+    assert seen == ["event_4", "event_3", "event_2", "event_1", "event_0", "login"]
+
+
+def test_activities_invalid_cursor(client):
+    headers = _register_and_login(client, "Bad Cursor", "badcursor@example.com", "secret123")
+    r = client.get("/logs/user/activities", headers=headers, params={"before": "nope"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+
+
+def test_indexes_bootstrapped(client):
+    from app import mongo
+
+    async def index_names(collection):
+        await mongo.ensure_indexes()
+        return set((await mongo.get_mongo_db()[collection].index_information()).keys())
+
+    for collection in ("activities", "calculations", "risk_logs"):
+        assert "user_id_1_timestamp_-1__id_-1" in client.portal.call(index_names, collection)
+
+
+def test_batch_activity_ingestion(client):
+    headers = _register_and_login(client, "Batcher", "batcher@example.com", "secret123")
+    events = [{"action": "ui_click", "details": {"n": i}} for i in range(40)]
+    r = client.post("/logs/activities/batch", json=events, headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.json()["count"] == 40
+
+    r = client.get("/logs/user/activities", headers=headers, params={"limit": 40})
+    # Newest first, original order preserved within the batch
+    assert [a["details"]["n"] for a in r.json()["activities"]] == list(range(39, -1, -1))
+
+
+def test_batch_calculation_validation(client):
+    headers = _register_and_login(client, "Batcher Two", "batcher2@example.com", "secret123")
+    calc = {"loan_id": 1, "amount": 1000, "income": 2000, "credit_score": 700, "term_months": 12,
+            "debt_ratio": 0.5, "credit_factor": 0.27, "term_factor": 0.03, "risk_score": 0.36}
+    r = client.post("/logs/calculations/batch", json=[calc, calc], headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert len(r.json()["log_ids"]) == 2
+
+    # Typed schema rejects malformed events and empty batches
+    r = client.post("/logs/calculations/batch", json=[{"amount": "lots"}], headers=headers)
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, r.text
+    r = client.post("/logs/calculations/batch", json=[], headers=headers)
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, r.text
+
+
+def test_activity_stats_rollups(client):
+    user_headers = _register_and_login(client, "Stats User", "statsuser@example.com", "secret123")
+    r = client.post(
+        "/loans/",
+        json={"amount": 10000, "income": 50000, "credit_score": 750, "term_months": 12},
+        headers=user_headers
+    )
+    loan_id = r.json()["id"]
+    admin_headers = _register_and_login(client, "Stats Admin", "statsadmin@example.com", "secret123", role="ADMIN")
+    client.post(f"/loans/{loan_id}/decision", json={}, headers=admin_headers)
+
+    r = client.get("/logs/stats", headers=admin_headers, params={"granularity": "hour"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    counts = Counter()
+    for b in r.json()["buckets"]:
+        counts[(b["action"], b["role"])] += b["count"]
+    assert counts[("apply_loan", "USER")] >= 1
+    assert counts[("loan_decision", "ADMIN")] >= 1
+    assert counts[("login", "ADMIN")] >= 1
+
+    # Daily rollups agree with hourly ones for a single action/role
+    r = client.get("/logs/stats", headers=admin_headers, params={"action": "loan_decision", "role": "ADMIN"})
+    assert sum(b["count"] for b in r.json()["buckets"]) == counts[("loan_decision", "ADMIN")]
+
+    # Users can't read ops stats
+    r = client.get("/logs/stats", headers=user_headers)
+    assert r.status_code == status.HTTP_403_FORBIDDEN, r.text
+
+
+def test_client_activities_skip_rollups(client):
+    user_headers = _register_and_login(client, "Spoof User", "spoofstats@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Spoof Admin", "spoofadmin@example.com", "secret123", role="ADMIN")
+    params = {"action": "apply_loan", "role": "USER", "granularity": "hour"}
+
+    def applied():
+        r = client.get("/logs/stats", headers=admin_headers, params=params)
+        assert r.status_code == status.HTTP_200_OK, r.text
+        return sum(b["count"] for b in r.json()["buckets"])
+
+    before = applied()
+    for _ in range(5):
+        r = client.post("/logs/activity", json={"action": "apply_loan"}, headers=user_headers)
+        assert r.status_code == status.HTTP_200_OK, r.text
+    r = client.post("/logs/activities/batch", json=[{"action": "apply_loan"}] * 3, headers=user_headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert applied() == before
@@ -0,0 +1,71 @@
+# backend/tests/test_response_cache.py
+from fastapi import status
+
+from app.config import settings
+from tests.test_loans import _register_and_login
+
+LOAN = {"amount": 15000, "income": 70000, "credit_score": 710, "term_months": 24}
+
+
+def test_loan_lists_etag_and_invalidation(client):
+    user_headers = _register_and_login(client, "Etag User", "etaguser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Etag Admin", "etagadmin@example.com", "secret123", role="ADMIN")
+    loan_id = client.post("/loans/", json=LOAN, headers=user_headers).json()["id"]
+
+    r = client.get("/loans/pending", headers=admin_headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    etag = r.headers["etag"]
+    assert loan_id in [l["id"] for l in r.json()]
+
+    # Unchanged: 304 with no body
+    r = client.get("/loans/pending", headers={**admin_headers, "If-None-Match": etag})
+    assert r.status_code == status.HTTP_304_NOT_MODIFIED
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+    # A decision bumps the data version: new ETag and fresh content
+    client.post(f"/loans/{loan_id}/decision", json={"action": "REJECTED"}, headers=admin_headers)
+    r = client.get("/loans/pending", headers={**admin_headers, "If-None-Match": etag})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert r.headers["etag"] != etag
+    assert loan_id not in [l["id"] for l in r.json()]
+
+    r = client.get("/loans/all", headers=admin_headers, params={"status_filter": "REJECTED"})
+    row = next(l for l in r.json() if l["id"] == loan_id)
+    assert row["user_email"] == "etaguser@example.com"
+    assert row["status"] == "REJECTED"
+
+
+def test_loan_lists_keyed_per_user_and_filter(client):
+    a = _register_and_login(client, "Etag A", "etaga@example.com", "secret123")
+    b = _register_and_login(client, "Etag B", "etagb@example.com", "secret123")
+    client.post("/loans/", json=LOAN, headers=a)
+
+    ra = client.get("/loans/my", headers=a)
+    rb = client.get("/loans/my", headers=b)
+    assert ra.headers["etag"] != rb.headers["etag"]
+    assert len(ra.json()) == 1 and rb.json() == []
+    # Another user's ETag never matches
+    r = client.get("/loans/my", headers={**b, "If-None-Match": ra.headers["etag"]})
+    assert r.status_code == status.HTTP_200_OK
+
+    r = client.get("/loans/my", headers=a, params={"status_filter": "APPROVED"})
+    assert r.json() == []
+    assert r.headers["etag"] != ra.headers["etag"]
+    # The alias shares the cache entry
+    assert client.get("/loans/my-loans", headers=a).headers["etag"] == ra.headers["etag"]
+
+
+def test_large_loan_lists_are_gzipped(client, monkeypatch):
+    monkeypatch.setattr(settings, "GZIP_MIN_BYTES", 200)
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    headers = _register_and_login(client, "Gzip User", "gzipuser@example.com", "secret123")
+    for i in range(3):
+        client.post("/loans/", json={**LOAN, "amount": LOAN["amount"] + i}, headers=headers)
+
+    r = client.get("/loans/my", headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()) == 3
+    r = client.get("/loans/my", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert len(r.json()) == 3
@@ -0,0 +1,74 @@
+# backend/tests/test_retention.py
+from datetime import datetime, timedelta
+
+from app import mongo
+from app.config import settings
+from app.services import retention
+
+NOW = datetime(2026, 3, 31, 12, 0, 0)
+
+
+def _seed(client, collection: str, user_id: int):
+    old = NOW - timedelta(days=settings.AUDIT_COMPACT_AFTER_DAYS + 2)
+    docs = [
+        {"user_id": user_id, "action": "ui_click", "details": {"n": i}, "timestamp": old + timedelta(minutes=i)}
+        for i in range(10)
+    ] + [{"user_id": user_id, "action": "recent", "timestamp": NOW}]
+
+    async def insert():
+        await mongo.get_mongo_db()[collection].insert_many(docs)
+
+    client.portal.call(insert)
+
+
+def test_compaction_archives_old_events_in_mongo(client):
+    _seed(client, "activities", 9001)
+
+    async def run():
+        moved = await retention.compact(now=NOW)
+        db = mongo.get_mongo_db()
+        raw = await db.activities.find({"user_id": 9001}).to_list(None)
+        batches = await db.activities_archive.find({"user_ids": 9001}).to_list(None)
+        return moved, raw, batches
+
+    moved, raw, batches = client.portal.call(run)
+    assert moved["activities"] >= 10
+    assert [d["action"] for d in raw] == ["recent"]
+    archived = [d for b in batches for d in retention.decode_batch(b["payload"])]
+    assert sorted(d["details"]["n"] for d in archived if d["user_id"] == 9001) == list(range(10))
+    assert sum(b["count"] for b in batches) >= 10
+
+
+def test_compaction_to_archive_dir(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_ARCHIVE_DIR", str(tmp_path))
+    _seed(client, "calculations", 9002)
+
+    client.portal.call(retention.compact_collection, "calculations",
+                       NOW - timedelta(days=settings.AUDIT_COMPACT_AFTER_DAYS))
+
+    files = list((tmp_path / "calculations").glob("*.bson.z"))
+    assert files
+    archived = [d for f in files for d in retention.decode_batch(f.read_bytes())]
+    assert len([d for d in archived if d["user_id"] == 9002]) == 10
+
+
+def test_archived_events_read_back(client):
+    _seed(client, "risk_logs", 9003)
+    client.portal.call(retention.compact_collection, "risk_logs",
+                       NOW - timedelta(days=settings.AUDIT_COMPACT_AFTER_DAYS))
+
+    archived = client.portal.call(retention.archived_events, "risk_logs", 9003)
+    assert [d["details"]["n"] for d in archived] == list(range(10))
+
+
+def test_compaction_lease_has_one_holder(client):
+    async def run():
+        first = await retention.acquire_lease("worker-a", 60, now=NOW)
+        second = await retention.acquire_lease("worker-b", 60, now=NOW)
+        renewed = await retention.acquire_lease("worker-a", 60, now=NOW + timedelta(seconds=30))
+        # worker-a stopped renewing; the lease lapses and worker-b takes over
+        taken = await retention.acquire_lease("worker-b", 60, now=NOW + timedelta(seconds=120))
+        lost = await retention.acquire_lease("worker-a", 60, now=NOW + timedelta(seconds=130))
+        return first, second, renewed, taken, lost
+
+    assert client.portal.call(run) == (True, False, True, True, False)
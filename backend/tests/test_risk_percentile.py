@@ -0,0 +1,87 @@
+# backend/tests/test_risk_percentile.py
+import random
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models import LoanApplication
+from app.services import risk_index
+from app.services.risk_index import RiskPercentiles
+from tests.test_loans import _register_and_login
+
+
+def test_percentiles_match_brute_force():
+    rng = random.Random(7)
+    scores = [round(rng.random(), 2) for _ in range(500)]
+    book = RiskPercentiles(100)
+    book.rebuild(scores[:300])
+    for s in scores[300:]:
+        book.add(s)
+
+    probes = [0.0, 0.05, 0.37, 0.5, 0.99, 1.0]
+    expected = [
+        round(100 * (sum(book.bucket(s) < book.bucket(p) for s in scores)
+                     + sum(book.bucket(s) == book.bucket(p) for s in scores) / 2) / len(scores), 2)
+        for p in probes
+    ]
+    assert [book.percentile(p) for p in probes] == expected
+    assert book.percentiles(probes).tolist() == pytest.approx(expected)
+    assert sum(book.histogram(10)) == book.total == 500
+    assert book.quantile(0.5) == pytest.approx(sorted(scores)[249], abs=0.01)
+
+    assert RiskPercentiles(100).percentile(0.5) is None
+
+
+def test_percentile_on_loans_and_distribution(client):
+    headers = _register_and_login(client, "Pct User", "pctuser@example.com", "secret123")
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count()).select_from(LoanApplication))
+    assert risk_index.book.total == stored  # built at startup
+
+    r = client.post(
+        "/loans/", json={"amount": 1000, "income": 200000, "credit_score": 840, "term_months": 6}, headers=headers
+    )
+    assert r.status_code == status.HTTP_200_OK, r.text
+    loan = r.json()
+    assert risk_index.book.total == stored + 1
+    assert loan["risk_percentile"] == risk_index.book.percentile(loan["risk_score"])
+    assert 0 <= loan["risk_percentile"] <= 50  # very low risk (50 if it is the only loan)
+
+    listed = client.get("/loans/my", headers=headers).json()
+    assert listed[0]["risk_percentile"] == loan["risk_percentile"]
+    r = client.get("/loans/my", headers=headers, params={"fields": "id,risk_percentile"})
+    assert r.json() == [{"id": loan["id"], "risk_percentile": loan["risk_percentile"]}]
+    r = client.get(f"/loans/my/{loan['id']}", headers=headers)
+    assert r.json()["risk_percentile"] == loan["risk_percentile"]
+
+    r = client.get("/loans/risk-distribution", headers=headers, params={"bins": 4})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert body["loan_count"] == stored + 1
+    assert [(b["lower"], b["upper"]) for b in body["bins"]] == [(0, 0.25), (0.25, 0.5), (0.5, 0.75), (0.75, 1.0)]
+    assert sum(b["count"] for b in body["bins"]) == stored + 1
+    assert set(body["quantiles"]) == {"p10", "p25", "p50", "p75", "p90"}
+
+
+def test_cached_lists_follow_the_book(client):
+    headers = _register_and_login(client, "Pct Cache", "pctcache@example.com", "secret123")
+    client.post("/loans/", json={"amount": 4000, "income": 80000, "credit_score": 750, "term_months": 12}, headers=headers)
+    first = client.get("/loans/my", headers=headers)
+    etag = first.headers["etag"]
+    assert client.get("/loans/my", headers={**headers, "If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Another worker's loans arrive with a rebuild, without a data version bump
+    tag = risk_index.book.tag
+    client.portal.call(risk_index.refresh_book)
+    risk_index.book.add(0.0)
+    assert risk_index.book.tag != tag
+    r = client.get("/loans/my", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == status.HTTP_200_OK and r.headers["etag"] != etag
+    assert r.json()[0]["risk_percentile"] > first.json()[0]["risk_percentile"]
+    # Without percentiles the body doesn't depend on the book
+    plain = client.get("/loans/my", headers=headers, params={"fields": "id,risk_score"}).headers["etag"]
+    risk_index.book.add(0.0)
+    assert client.get("/loans/my", headers=headers, params={"fields": "id,risk_score"}).headers["etag"] == plain
+    client.portal.call(risk_index.refresh_book)
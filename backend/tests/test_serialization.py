@@ -0,0 +1,39 @@
+# backend/tests/test_serialization.py
+from pydantic import TypeAdapter
+
+from app.routers.loan_routes import LOAN_KEYS, LOAN_WITH_USER_KEYS
+from app.schemas import LoanOut, LoanOutWithUser
+from tests.test_loans import _register_and_login
+
+
+def test_list_columns_match_response_schemas():
+    # The fast path skips response_model validation, so the columns must line up
+    assert LOAN_KEYS == tuple(LoanOut.model_fields)
+    assert LOAN_WITH_USER_KEYS == tuple(LoanOutWithUser.model_fields)
+
+
+def test_list_bodies_validate_against_schemas(client):
+    user_headers = _register_and_login(client, "Ser User", "seruser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Ser Admin", "seradmin@example.com", "secret123", role="ADMIN")
+    client.post(
+        "/loans/",
+        json={"amount": 12345.5, "income": 54321, "credit_score": 680, "term_months": 48},
+        headers=user_headers
+    )
+
+    for path, headers, schema in (
+        ("/loans/my", user_headers, LoanOut),
+        ("/loans/pending", admin_headers, LoanOut),
+        ("/loans/all", admin_headers, LoanOutWithUser),
+    ):
+        r = client.get(path, headers=headers)
+        assert r.status_code == 200, r.text
+        adapter = TypeAdapter(list[schema])
+        items = adapter.validate_json(r.content)
+        assert items
+        # Same JSON as the response_model path would produce
+        assert r.json() == adapter.dump_python(items, mode="json")
+
+    r = client.get("/loans/my", headers=user_headers)
+    assert r.json()[0]["amount"] == 12345.5
+    assert r.json()[0]["status"] == "PENDING"
@@ -0,0 +1,27 @@
+# backend/tests/test_server.py
+import os
+import pytest
+
+from app import mongo
+from app.database import engine
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_pools_are_recreated_in_forked_worker():
+    parent_pool = engine.pool
+    parent_client = mongo.get_mongo_db().client
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = engine.pool is not parent_pool and mongo.get_mongo_db().client is not parent_client
+        os.write(w, b"1" if ok else b"0")
+        os._exit(0)
+
+    os.close(w)
+    result = os.read(r, 1)
+    os.close(r)
+    os.waitpid(pid, 0)
+    assert result == b"1"
+    # Parent keeps its own pools untouched
+    assert engine.pool is parent_pool
@@ -0,0 +1,96 @@
+# backend/tests/test_sla.py
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, inspect, text, update
+
+from app import migrations
+from app.config import settings
+from app.database import SessionLocal
+from app.models import LoanApplication
+from tests.test_loans import _register_and_login
+
+
+def _apply(client, headers, amount):
+    return client.post(
+        "/loans/", json={"amount": amount, "income": 90000, "credit_score": 760, "term_months": 24}, headers=headers
+    ).json()
+
+
+def test_timestamps_and_sla(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    headers = _register_and_login(client, "Sla User", "slauser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Sla Admin", "slaadmin@example.com", "secret123", role="ADMIN")
+    since = (datetime.utcnow() - timedelta(minutes=5)).isoformat()
+    before = client.get("/loans/sla", headers=admin_headers, params={"since": since}).json()["queue_time"]["count"]
+    loans = [_apply(client, headers, amount) for amount in (1000, 2000, 3000)]
+    assert loans[0]["created_at"] and loans[0]["decided_at"] is None
+
+    decided = client.post(f"/loans/{loans[0]['id']}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+    assert decided.json()["decided_at"] >= decided.json()["created_at"]
+    client.post(f"/loans/{loans[1]['id']}/decision", json={"action": "REJECTED"}, headers=admin_headers)
+    # Pretend the first one waited 10 hours
+    with SessionLocal() as db:
+        first = db.get(LoanApplication, loans[0]["id"])
+        first.created_at = first.decided_at - timedelta(hours=10)
+        db.commit()
+
+    r = client.get("/loans/sla", headers=admin_headers, params={"since": since})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert body["queue_time"]["count"] == before + 2
+    assert body["queue_time"]["max_hours"] == pytest.approx(10, abs=0.01)
+    assert body["pending_age"]["count"] >= 1
+    today = body["throughput"][-1]
+    assert today["day"] == datetime.utcnow().date().isoformat()
+    assert (today["approved"], today["rejected"]) >= (1, 1) and today["applied"] >= 2
+
+    r = client.get("/loans/sla", headers=admin_headers, params={"since": since, "until": since})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/loans/sla", headers=headers).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_backfill_from_audit_log(client):
+    headers = _register_and_login(client, "Backfill User", "backfilluser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Backfill Admin", "backfilladmin@example.com", "secret123", role="ADMIN")
+    loan = _apply(client, headers, 4000)
+    client.post(f"/loans/{loan['id']}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+    # A loan from before the columns existed
+    with SessionLocal() as db:
+        db.execute(update(LoanApplication).where(LoanApplication.id == loan["id"])
+                   .values(created_at=None, decided_at=None))
+        db.commit()
+
+    assert client.portal.call(migrations.backfill_timestamps, loan["user_id"]) == 1
+    with SessionLocal() as db:
+        row = db.get(LoanApplication, loan["id"])
+        assert row.created_at is not None and row.decided_at >= row.created_at
+    assert client.portal.call(migrations.backfill_timestamps, loan["user_id"]) == 0
+
+
+def test_upgrade_adds_columns_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE loan_applications (id INTEGER PRIMARY KEY, user_id INTEGER, amount FLOAT, income FLOAT,"
+            " credit_score INTEGER, term_months INTEGER, status VARCHAR, risk_score FLOAT)"
+        ))
+    added = migrations.upgrade(engine)
+    assert "loan_applications.created_at" in added and "ix_loan_applications_decided_at" in added
+    columns = {c["name"] for c in inspect(engine).get_columns("loan_applications")}
+    assert {"created_at", "decided_at"} <= columns
+    assert migrations.upgrade(engine) == []
+    engine.dispose()
+
+
+def test_upgrade_step_raced_by_another_worker(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'raced.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, created_at DATETIME)"))
+    # Another worker added the column between our inspection and our ALTER
+    add_again = lambda conn: conn.exec_driver_sql("ALTER TABLE t ADD COLUMN created_at DATETIME")  # noqa: E731
+    assert migrations._apply(engine, add_again, lambda: True) is False
+    with pytest.raises(Exception):
+        migrations._apply(engine, add_again, lambda: False)
+    engine.dispose()
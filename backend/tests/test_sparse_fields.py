@@ -0,0 +1,87 @@
+# backend/tests/test_sparse_fields.py
+import contextlib
+
+from fastapi import status
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import async_engine
+from tests.test_loans import _register_and_login
+
+
+@contextlib.contextmanager
+def _capture_sql():
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before)
+
+
+def _loan_selects(statements):
+    return [s for s in statements if s.lstrip().startswith("SELECT") and "FROM loan_applications" in s]
+
+
+def test_loan_lists_sparse_fields(client, monkeypatch):
+    user_headers = _register_and_login(client, "Sparse User", "sparseuser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Sparse Admin", "sparseadmin@example.com", "secret123", role="ADMIN")
+    client.post(
+        "/loans/",
+        json={"amount": 9000, "income": 40000, "credit_score": 690, "term_months": 12},
+        headers=user_headers
+    )
+
+    full = client.get("/loans/my", headers=user_headers)
+    with _capture_sql() as statements:
+        r = client.get("/loans/my", headers=user_headers, params={"fields": "status,id,amount"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    # Schema order, only what was asked for, and fewer bytes
+    assert list(r.json()[0]) == ["id", "amount", "status"]
+    assert len(r.content) < len(full.content)
+    [select] = _loan_selects(statements)
+    assert "credit_score" not in select and "income" not in select
+
+    # No user fields requested: /all doesn't join users (SQL path; the snapshot has no join at all)
+    monkeypatch.setattr(settings, "LOAN_SNAPSHOT_ENABLED", False)
+    with _capture_sql() as statements:
+        r = client.get("/loans/all", headers=admin_headers, params={"fields": "id,status"})
+    assert set(r.json()[0]) == {"id", "status"}
+    [select] = _loan_selects(statements)
+    assert "JOIN users" not in select
+
+    r = client.get("/loans/all", headers=admin_headers, params={"fields": "id,user_email"})
+    row = next(l for l in r.json() if l["user_email"] == "sparseuser@example.com")
+    assert set(row) == {"id", "user_email"}
+
+    # Sparse responses get their own cache entry / ETag
+    assert r.headers["etag"] != client.get("/loans/all", headers=admin_headers).headers["etag"]
+
+
+def test_sparse_fields_validation(client):
+    headers = _register_and_login(client, "Sparse Bad", "sparsebad@example.com", "secret123")
+    for fields in ("id,password", "user_email", ","):
+        r = client.get("/loans/my", headers=headers, params={"fields": fields})
+        assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+    r = client.get("/logs/user/activities", headers=headers, params={"fields": "hashed_password"})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST, r.text
+
+
+def test_log_lists_sparse_fields(client):
+    headers = _register_and_login(client, "Sparse Logs", "sparselogs@example.com", "secret123")
+    client.post("/logs/activity", json={"action": "ui_click", "details": {"big": "x" * 200}}, headers=headers)
+
+    r = client.get("/logs/user/activities", headers=headers, params={"fields": "action,email"})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    docs = r.json()["activities"]
+    # _id and timestamp always come back (cursor)
+    assert all(set(d) == {"_id", "timestamp", "action", "email"} for d in docs)
+    assert docs[0]["email"] == "sparselogs@example.com"
+
+    r = client.get("/logs/user/activities", headers=headers, params={"fields": "action", "limit": 1})
+    assert set(r.json()["activities"][0]) == {"_id", "timestamp", "action"}
+    assert r.json()["next_cursor"]
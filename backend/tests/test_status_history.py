@@ -0,0 +1,76 @@
+# backend/tests/test_status_history.py
+from datetime import datetime, timedelta
+
+from fastapi import status
+from sqlalchemy import delete, select
+
+from app import migrations
+from app.config import settings
+from app.database import SessionLocal
+from app.models import LoanApplication, LoanStatusHistory
+from tests.test_loans import _register_and_login
+
+
+def _apply(client, headers, amount):
+    return client.post(
+        "/loans/", json={"amount": amount, "income": 90000, "credit_score": 760, "term_months": 24}, headers=headers
+    ).json()
+
+
+def test_history_written_with_each_transition(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_PENDING_LOANS", 0)
+    headers = _register_and_login(client, "History User", "historyuser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "History Admin", "historyadmin@example.com", "secret123", role="ADMIN")
+    approved, pending = _apply(client, headers, 1000), _apply(client, headers, 2000)
+    decided = client.post(f"/loans/{approved['id']}/decision", json={"action": "APPROVED"}, headers=admin_headers).json()
+
+    r = client.get(f"/loans/{approved['id']}/history", headers=headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    first, second = r.json()
+    assert (first["status"], second["status"]) == ("PENDING", "APPROVED")
+    assert first["changed_by"] == approved["user_id"] and second["changed_by"] != approved["user_id"]
+    assert first["valid_to"] == second["valid_from"] == decided["decided_at"]
+    assert second["valid_to"] is None
+
+    # State of one loan at a point in time
+    before_decision = datetime.fromisoformat(decided["decided_at"]) - timedelta(microseconds=1)
+    r = client.get(f"/loans/{approved['id']}/history", headers=headers, params={"at": before_decision.isoformat()})
+    assert [h["status"] for h in r.json()] == ["PENDING"]
+    r = client.get(f"/loans/{approved['id']}/history", headers=headers, params={"at": "2000-01-01T00:00:00"})
+    assert r.json() == []
+
+    # Whole pending queue at a point in time
+    r = client.get("/loans/status-at", headers=admin_headers, params={"at": before_decision.isoformat()})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    assert {approved["id"], pending["id"]} <= set(r.json()["loan_ids"])
+    r = client.get("/loans/status-at", headers=admin_headers, params={"at": datetime.utcnow().isoformat()})
+    ids = set(r.json()["loan_ids"])
+    assert pending["id"] in ids and approved["id"] not in ids
+    r = client.get("/loans/status-at", headers=admin_headers,
+                   params={"at": datetime.utcnow().isoformat(), "status_filter": "APPROVED"})
+    assert approved["id"] in r.json()["loan_ids"]
+
+    assert client.get("/loans/status-at", headers=headers, params={"at": "2020-01-01T00:00:00"}).status_code == status.HTTP_403_FORBIDDEN
+    other = _register_and_login(client, "History Other", "historyother@example.com", "secret123")
+    assert client.get(f"/loans/{approved['id']}/history", headers=other).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_backfill_status_history(client):
+    headers = _register_and_login(client, "Seed User", "seeduser@example.com", "secret123")
+    admin_headers = _register_and_login(client, "Seed Admin", "seedadmin@example.com", "secret123", role="ADMIN")
+    loan = _apply(client, headers, 3000)
+    client.post(f"/loans/{loan['id']}/decision", json={"action": "REJECTED"}, headers=admin_headers)
+    # A loan from before the history table existed
+    with SessionLocal() as db:
+        db.execute(delete(LoanStatusHistory).where(LoanStatusHistory.loan_id == loan["id"]))
+        db.commit()
+
+    assert client.portal.call(migrations.backfill_status_history) == 2
+    with SessionLocal() as db:
+        row = db.get(LoanApplication, loan["id"])
+        rows = db.execute(
+            select(LoanStatusHistory.status, LoanStatusHistory.valid_from, LoanStatusHistory.valid_to)
+            .where(LoanStatusHistory.loan_id == loan["id"]).order_by(LoanStatusHistory.valid_from)
+        ).all()
+    assert rows == [("PENDING", row.created_at, row.decided_at), ("REJECTED", row.decided_at, None)]
+    assert client.portal.call(migrations.backfill_status_history) == 0
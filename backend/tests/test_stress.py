@@ -0,0 +1,62 @@
+# backend/tests/test_stress.py
+import numpy as np
+import pytest
+from fastapi import status
+
+from app.services import stress
+from app.services.risk import compute_risk, compute_risk_array
+from tests.test_loans import _register_and_login
+
+LOANS = [(10000, 50000, 750, 12), (40000, 45000, 580, 360), (2500, 90000, 820, 24), (80000, 60000, 300, 60)]
+
+
+def test_batched_scenarios_match_compute_risk():
+    portfolio = stress.to_arrays(LOANS)
+    assert np.allclose(compute_risk_array(*portfolio), [compute_risk(*loan) for loan in LOANS])
+
+    scenarios = [stress.BASELINE, stress.Scenario("scores -50", credit_score_shift=-50),
+                 stress.Scenario("income -10%", income_change=-0.1)]
+    # A chunk smaller than the portfolio exercises the accumulation across chunks
+    results = stress.run(portfolio, scenarios, 0.5, chunk_elements=6)
+    for scenario, result in zip(scenarios, results):
+        pds = [
+            compute_risk(a, i * (1 + scenario.income_change), min(max(c + scenario.credit_score_shift, 300), 850), t)
+            for a, i, c, t in LOANS
+        ]
+        exposure = [a * 0.5 for a, *_ in LOANS]
+        assert result.name == scenario.name
+        assert result.mean_pd == pytest.approx(np.mean(pds))
+        assert result.expected_loss == pytest.approx(sum(e * p for e, p in zip(exposure, pds)))
+        assert result.loss_std == pytest.approx(np.sqrt(sum(e * e * p * (1 - p) for e, p in zip(exposure, pds))))
+        assert result.loss_p95 <= result.loss_p99
+        assert result.would_reject == sum(p >= 0.5 for p in pds)
+        assert sum(result.pd_histogram) == len(LOANS)
+    assert results[1].expected_loss > results[0].expected_loss
+    assert results[2].expected_loss > results[0].expected_loss
+
+
+def test_stress_test_endpoint(client):
+    admin_headers = _register_and_login(client, "Stress Admin", "stressadmin@example.com", "secret123", role="ADMIN")
+    headers = _register_and_login(client, "Stress User", "stressuser@example.com", "secret123")
+    body = {"scenarios": [{"name": "scores -50", "credit_score_shift": -50}]}
+
+    before = client.post("/loans/stress-test", json=body, headers=admin_headers).json()
+    loan = client.post(
+        "/loans/", json={"amount": 30000, "income": 70000, "credit_score": 700, "term_months": 36}, headers=headers
+    ).json()
+    client.post(f"/loans/{loan['id']}/decision", json={"action": "APPROVED"}, headers=admin_headers)
+
+    # Reloaded after the write
+    r = client.post("/loans/stress-test", json=body, headers=admin_headers)
+    assert r.status_code == status.HTTP_200_OK, r.text
+    after = r.json()
+    assert after["loan_count"] == before["loan_count"] + 1
+    assert after["exposure"] == pytest.approx(before["exposure"] + 30000)
+    assert [res["name"] for res in after["results"]] == ["baseline", "scores -50"]
+    baseline, stressed = after["results"]
+    assert stressed["expected_loss"] > baseline["expected_loss"]
+
+    r = client.post("/loans/stress-test", json={"scenarios": []}, headers=admin_headers)
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    r = client.post("/loans/stress-test", json=body, headers=headers)
+    assert r.status_code == status.HTTP_403_FORBIDDEN
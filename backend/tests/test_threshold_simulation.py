@@ -0,0 +1,54 @@
+# backend/tests/test_threshold_simulation.py
+import pytest
+from fastapi import status
+
+from app.services.risk_index import RiskIndex
+from tests.test_loans import _register_and_login
+
+
+def test_index_matches_brute_force():
+    rows = [(0.42, 1000), (0.1, 500), (0.5, 2000), (0.77, 300), (0.42, 700), (0.3, 100)]
+    index = RiskIndex.from_rows(rows)
+    thresholds = [0.0, 0.1, 0.35, 0.42, 0.5, 0.51, 1.0]
+    for point, t in zip(index.simulate(thresholds), thresholds):
+        approved = [(r, a) for r, a in rows if r < t]
+        assert point.approval_count == len(approved)
+        assert point.approval_rate == pytest.approx(len(approved) / len(rows))
+        assert point.approved_amount == pytest.approx(sum(a for _, a in approved))
+        if approved:
+            assert point.mean_risk == pytest.approx(sum(r for r, _ in approved) / len(approved))
+        else:
+            assert point.mean_risk is None
+
+    empty = RiskIndex.from_rows([])
+    assert empty.simulate([0.5])[0].approval_count == 0
+
+
+def test_threshold_simulation_endpoint(client):
+    admin_headers = _register_and_login(client, "Threshold Admin", "thresholdadmin@example.com", "secret123", role="ADMIN")
+    headers = _register_and_login(client, "Threshold User", "thresholduser@example.com", "secret123")
+
+    r = client.get("/loans/threshold-simulation", headers=admin_headers, params={"start": 0, "stop": 1, "step": 0.25})
+    assert r.status_code == status.HTTP_200_OK, r.text
+    body = r.json()
+    assert body["current_threshold"] == 0.5
+    assert [p["threshold"] for p in body["points"]] == [0, 0.25, 0.5, 0.75, 1.0]
+    counts = [p["approval_count"] for p in body["points"]]
+    assert counts == sorted(counts) and counts[0] == 0
+
+    before = body
+    client.post("/loans/", json={"amount": 5000, "income": 100000, "credit_score": 800, "term_months": 12}, headers=headers)
+    r = client.get("/loans/threshold-simulation", headers=admin_headers, params={"start": 0, "stop": 1, "step": 0.25})
+    after = r.json()
+    assert after["loan_count"] == before["loan_count"] + 1
+    # Low-risk loan: counted from the 0.25 threshold up
+    assert after["points"][-1]["approval_count"] == before["points"][-1]["approval_count"] + 1
+    assert after["points"][-1]["approved_amount"] == pytest.approx(before["points"][-1]["approved_amount"] + 5000)
+
+    r = client.get("/loans/threshold-simulation", headers=admin_headers, params={"threshold": [0.6, 0.4]})
+    assert [p["threshold"] for p in r.json()["points"]] == [0.4, 0.6]
+    r = client.get("/loans/threshold-simulation", headers=admin_headers, params={"start": 0.6, "stop": 0.4})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    r = client.get("/loans/threshold-simulation", headers=admin_headers, params={"start": 0, "stop": 1, "step": 0.0001})
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get("/loans/threshold-simulation", headers=headers).status_code == status.HTTP_403_FORBIDDEN